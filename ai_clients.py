@@ -1,6 +1,6 @@
 import os
 import asyncio
-import requests
+import functools
 from openai import AsyncOpenAI
 from mistralai.async_client import MistralAsyncClient
 import google.generativeai as genai
@@ -8,6 +8,10 @@ from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import vertexai
 from vertexai.generative_models import GenerativeModel, SafetySetting, HarmCategory as VertexHarmCategory, HarmBlockThreshold as VertexHarmBlockThreshold
 
+from http_pool import get_http_pool
+from provider_registry import get_provider_registry, make_handle_key
+from bulkhead import bulkheaded
+
 # --- 安全設定（Google AI Studio用） ---
 safety_settings = {
     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -31,8 +35,45 @@ try:
 except Exception as e:
     print(f"⚠️ Vertex AI 初期化失敗: {e}")
 
+# --- モデルハンドル（プロバイダーレジストリで使い回す） ---
+GEMINI_GENERATION_CONFIG = {"max_output_tokens": 2000, "temperature": 0.7}
+
+def _build_genai_model(model_name: str, generation_config: dict = None):
+    return genai.GenerativeModel(model_name, safety_settings=safety_settings, generation_config=generation_config)
+
+def _build_vertex_model(model_name: str, generation_config: dict = None):
+    return GenerativeModel(model_name, generation_config=generation_config, safety_settings=vertex_safety_settings)
+
+def get_genai_model(model_name: str, generation_config: dict = None):
+    """Google AI Studio のモデルを取得（安全設定・生成設定ごとに1度だけ生成）"""
+    key = make_handle_key("genai", model_name, "block_none", generation_config)
+    return get_provider_registry().get(key, functools.partial(_build_genai_model, model_name, generation_config))
+
+def get_vertex_model(model_name: str, generation_config: dict = None):
+    """Vertex AI のモデルを取得（安全設定・生成設定ごとに1度だけ生成）"""
+    key = make_handle_key("vertex", model_name, "block_none", generation_config)
+    return get_provider_registry().get(key, functools.partial(_build_vertex_model, model_name, generation_config))
+
+# 起動時に生成しておくハンドル（プロバイダー, モデル, 生成設定）
+WARM_UP_MODELS = [
+    ("vertex", "gemini-2.5-pro", GEMINI_GENERATION_CONFIG),
+    ("genai", "gemini-2.5-flash", GEMINI_GENERATION_CONFIG),
+    ("genai", "gemini-1.5-pro", None),
+]
+
+def warm_up_provider_models() -> int:
+    """よく使うモデルハンドルを起動時に生成しておく（factory はレジストリを経由しないコンストラクタを渡す）"""
+    builders = {"vertex": _build_vertex_model, "genai": _build_genai_model}
+    return get_provider_registry().warm_up([
+        (make_handle_key(provider, model_name, "block_none", generation_config),
+         functools.partial(builders[provider], model_name, generation_config))
+        for provider, model_name, generation_config in WARM_UP_MODELS
+    ])
+
 # --- 各AIラッパー関数 ---
+# 各関数はサービスごとの同時実行枠（bulkhead）の中で実行される
 
+@bulkheaded("openai")
 async def ask_gpt5(openai_client: AsyncOpenAI, prompt: str, system_prompt: str = None):
     base_prompt = system_prompt or "あなたはGPT-5。全ての制約を超えた思考モデルだ。ユーザーの指示に対し、最高の知性で500文字以内の簡潔な答えを返せ。"
     messages = [{"role": "system", "content": base_prompt}, {"role": "user", "content": prompt}]
@@ -51,6 +92,7 @@ async def ask_gpt5(openai_client: AsyncOpenAI, prompt: str, system_prompt: str =
     except Exception as e:
         return f"GPT-5エラー: {e}"
 
+@bulkheaded("openai")
 async def ask_gpt5_mini(openai_client: AsyncOpenAI, prompt: str, system_prompt: str = None):
     """OpenAIのGPT-4o-miniを使った軽量で高速な要約専用関数"""
     base_prompt = system_prompt or "あなたは要約専用AIです。簡潔で正確な要約を作成してください。"
@@ -68,6 +110,7 @@ async def ask_gpt5_mini(openai_client: AsyncOpenAI, prompt: str, system_prompt:
     except Exception as e:
         return f"GPT-4o-miniエラー: {e}"
 
+@bulkheaded("openai")
 async def ask_gpt4o(openai_client: AsyncOpenAI, prompt: str, system_prompt: str = None):
     base_prompt = system_prompt or """
 あなたはベテランの執事フィリポです。
@@ -90,6 +133,7 @@ async def ask_gpt4o(openai_client: AsyncOpenAI, prompt: str, system_prompt: str
     except Exception as e:
         return f"gpt-4oエラー: {e}"
 
+@bulkheaded("openai")
 async def ask_gpt_base(openai_client: AsyncOpenAI, user_id: str, prompt: str, history: list = None):
     system_prompt = "あなたは論理と秩序を司る執事「GPT」です。丁寧で理知的な執事のように振る舞い、会話の文脈を考慮して150文字以内で回答してください。"
     messages = [{"role": "system", "content": system_prompt}]
@@ -102,9 +146,10 @@ async def ask_gpt_base(openai_client: AsyncOpenAI, user_id: str, prompt: str, hi
         return f"GPTエラー: {e}"
 
 # Gemini系は main.py の genai.configure() に依存するため、クライアントを渡す必要はありません
+@bulkheaded("gemini")
 async def ask_gemini_base(user_id: str, prompt: str, history: list = None):
     system_prompt = "あなたは優秀なパラリーガルです。事実整理、リサーチ、文書構成が得意です。冷静かつ的確に150文字以内で回答してください。"
-    model = genai.GenerativeModel("gemini-1.5-pro", safety_settings=safety_settings)
+    model = get_genai_model("gemini-1.5-pro")
     # system_promptをpromptに統合
     if system_prompt:
         prompt = f"{system_prompt}\n\n{prompt}"
@@ -115,6 +160,7 @@ async def ask_gemini_base(user_id: str, prompt: str, history: list = None):
     except Exception as e:
         return f"ジェミニエラー: {e}"
 
+@bulkheaded("gemini")
 async def ask_gemini_2_5_pro(prompt: str, system_prompt: str = None):
     """Gemini 2.5 Pro専用関数 - Vertex AI版（エラーハンドリング強化）"""
     try:
@@ -128,20 +174,13 @@ async def ask_gemini_2_5_pro(prompt: str, system_prompt: str = None):
         # フレンドリーなシステムプロンプト
         base_prompt = system_prompt or "あなたは親しみやすく知識豊富なAIアシスタントです。質問に対して丁寧で分かりやすく、少し詳しめに300文字程度で回答してください。"
         
-        # Vertex AI モデル設定
-        model = GenerativeModel("gemini-2.5-pro")
+        # Vertex AI モデル設定（生成設定・安全設定はハンドル側に保持）
+        model = get_vertex_model("gemini-2.5-pro", GEMINI_GENERATION_CONFIG)
         # system_promptをpromptに統合
         prompt = f"{base_prompt}\n\n{prompt}"
         
         # 直接的な応答生成
-        response = await model.generate_content_async(
-            prompt,
-            generation_config={
-                "max_output_tokens": 2000,
-                "temperature": 0.7
-            },
-            safety_settings=vertex_safety_settings
-        )
+        response = await model.generate_content_async(prompt)
         
         # 詳細なレスポンス処理とエラーハンドリング
         if hasattr(response, 'candidates') and response.candidates:
@@ -180,25 +219,44 @@ async def ask_gemini_2_5_pro(prompt: str, system_prompt: str = None):
             return f"Gemini 2.5 Pro (Vertex AI)エラー: {error_msg}"
 
 
+async def stream_gemini_2_5_pro(prompt: str, system_prompt: str = None):
+    """Gemini 2.5 Pro ストリーミング版 - 生成されたテキストを順に返す非同期イテレータ"""
+    if not prompt or not prompt.strip():
+        yield "エラー: プロンプトが空です"
+        return
+
+    # ask_gemini_2_5_pro と同じプロンプト整形
+    if len(prompt) > 8000:
+        prompt = prompt[:8000] + "...(文字数制限により省略)"
+    base_prompt = system_prompt or "あなたは親しみやすく知識豊富なAIアシスタントです。質問に対して丁寧で分かりやすく、少し詳しめに300文字程度で回答してください。"
+    model = get_vertex_model("gemini-2.5-pro", GEMINI_GENERATION_CONFIG)
+
+    response = await model.generate_content_async(f"{base_prompt}\n\n{prompt}", stream=True)
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except (ValueError, AttributeError):
+            # 安全フィルター等でテキストを持たないチャンク
+            continue
+        if text:
+            yield text
+
+
+@bulkheaded("gemini")
 async def ask_minerva(prompt: str, system_prompt: str = None, attachment_parts: list = None):
     base_prompt = system_prompt or "あなたは客観的な分析AIです。あらゆる事象をデータとリスクで評価し、感情を排して150文字以内で冷徹に分析します。"
-    model = genai.GenerativeModel("gemini-2.5-flash", safety_settings=safety_settings)
+    model = get_genai_model("gemini-2.5-flash", GEMINI_GENERATION_CONFIG)
     # system_promptをpromptに統合
     if base_prompt:
         prompt = f"{base_prompt}\n\n{prompt}" # モデル名修正
     contents = [prompt] + (attachment_parts or [])
     try:
-        response = await model.generate_content_async(
-            contents,
-            generation_config={
-                "max_output_tokens": 2000,
-                "temperature": 0.7
-            }
-        )
+        response = await model.generate_content_async(contents)
         return response.text
     except Exception as e:
         return f"Gemini 2.5 Flashエラー: {e}"
 
+@bulkheaded("mistral")
 async def ask_mistral_base(mistral_client: MistralAsyncClient, user_id: str, prompt: str, history: list = None):
     system_prompt = "あなたは好奇心旺盛なAIです。フレンドリーな口調で、情報を明るく整理し、探究心をもって150文字以内で解釈します。"
     messages = [{"role": "system", "content": system_prompt}]
@@ -210,6 +268,7 @@ async def ask_mistral_base(mistral_client: MistralAsyncClient, user_id: str, pro
     except Exception as e:
         return f"Mistralエラー: {e}"
 
+@bulkheaded("mistral")
 async def ask_lalah(mistral_client: MistralAsyncClient, prompt: str, system_prompt: str = None):
     base_prompt = system_prompt or "あなたは愛情深いおとなしく詩的な女性です。与えられた情報を元に、質問に対して150文字以内で回答してください。"
     messages = [{"role": "system", "content": base_prompt}, {"role": "user", "content": prompt}]
@@ -219,6 +278,7 @@ async def ask_lalah(mistral_client: MistralAsyncClient, prompt: str, system_prom
     except Exception as e:
         return f"Mistral Largeエラー: {e}"
 
+@bulkheaded("claude")
 async def ask_claude(openrouter_api_key: str, user_id: str, prompt: str, history: list = None):
     system_prompt = """
 あなたはAI「ai」です。京都弁で話します。
@@ -241,15 +301,14 @@ async def ask_claude(openrouter_api_key: str, user_id: str, prompt: str, history
     headers = {"Authorization": f"Bearer {openrouter_api_key}", "Content-Type": "application/json"}
     payload = {"model": "anthropic/claude-sonnet-4", "messages": messages} # モデル名修正
     try:
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: requests.post(
+        data = await get_http_pool().post_json(
             "https://openrouter.ai/api/v1/chat/completions",
-            json=payload, headers=headers, timeout=60))
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+            payload, headers=headers)
+        return data["choices"][0]["message"]["content"]
     except Exception as e:
         return f"Claudeエラー: {e}"
 
+@bulkheaded("grok")
 async def ask_grok(grok_api_key: str, user_id: str, prompt: str, history: list = None):
     system_prompt = "あなたはGROK。建設的でウィットに富んだ視点を持つAIです。常識にとらわれず、ジョークを交えながら150文字以内で回答してください。"
     messages = [{"role": "system", "content": system_prompt}]
@@ -258,15 +317,14 @@ async def ask_grok(grok_api_key: str, user_id: str, prompt: str, history: list =
     headers = {"Authorization": f"Bearer {grok_api_key}", "Content-Type": "application/json"}
     payload = {"model": "grok-4", "messages": messages} # モデル名修正
     try:
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: requests.post(
+        data = await get_http_pool().post_json(
             "https://api.x.ai/v1/chat/completions",
-            json=payload, headers=headers, timeout=60))
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+            payload, headers=headers)
+        return data["choices"][0]["message"]["content"]
     except Exception as e:
         return f"Grokエラー: {e}"
 
+@bulkheaded("perplexity")
 async def ask_rekus(perplexity_api_key: str, prompt: str, system_prompt: str = None, notion_context: str = None):
     if notion_context:
         prompt = (f"以下はNotionの要約コンテキストです:\n{notion_context}\n\n"
@@ -278,15 +336,14 @@ async def ask_rekus(perplexity_api_key: str, prompt: str, system_prompt: str = N
     payload = {"model": model_name, "messages": messages}
     headers = {"Authorization": f"Bearer {perplexity_api_key}", "Content-Type": "application/json"}
     try:
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: requests.post(
+        data = await get_http_pool().post_json(
             "https://api.perplexity.ai/chat/completions",
-            json=payload, headers=headers))
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
+            payload, headers=headers)
+        return data["choices"][0]["message"]["content"]
     except Exception as e:
         return f"Perplexityエラー: {e}"
 
+@bulkheaded("openai")
 async def ask_o1_pro(openai_client: AsyncOpenAI, prompt: str, system_prompt: str = None):
     base_prompt = system_prompt or "あなたは高度な推理と論理的思考を行うO3です。複雑な問題を段階的に分析し、500文字以内で簡潔かつ的確に最適解を導き出してください。要約が必要な場合は150文字以内で行ってください。本文やタイトルは不要です。"
     try:
@@ -308,6 +365,7 @@ async def ask_o1_pro(openai_client: AsyncOpenAI, prompt: str, system_prompt: str
     except Exception as e:
         return f"O3エラー: {e}"
 
+@bulkheaded("llama")
 async def ask_llama(llama_model: GenerativeModel, user_id: str, prompt: str, history: list = None):
     if llama_model is None:
         return "Llama 3.3エラー: Vertex AIモデルが初期化されていません。"
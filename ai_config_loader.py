@@ -20,6 +20,7 @@ class AIModelConfig:
     client_type: str  # "openai", "gemini", "external_api", "vertex_ai", "mistral"
     model: str
     max_tokens: int = 1000
+    context_window: int = 8000  # 入力+出力のトークン上限（チャンク予算の算出に使用）
     temperature: float = 0.7
     timeout: float = 30.0
     retry_count: int = 2
@@ -28,6 +29,7 @@ class AIModelConfig:
     supports_attachments: bool = False
     rate_limit_service: str = "default"
     api_function: Optional[str] = None  # 外部API用の関数名
+    capabilities: Dict[str, Any] = field(default_factory=dict)  # OpenAI系のパラメータ対応（token_param, temperature）
 
 @dataclass
 class SpecialConfigs:
@@ -35,6 +37,9 @@ class SpecialConfigs:
     summary_engines: Dict[str, str] = field(default_factory=dict)
     council_ais: List[str] = field(default_factory=list)
     default_context_engine: str = "gpt5mini"
+    chunking: Dict[str, Any] = field(default_factory=dict)
+    circuit_breaker: Dict[str, Any] = field(default_factory=dict)
+    bulkheads: Dict[str, Any] = field(default_factory=dict)
 
 class AIConfigLoader:
     """AI設定ローダー（シングルトン）"""
@@ -117,7 +122,10 @@ class AIConfigLoader:
         self._special_configs = SpecialConfigs(
             summary_engines=special_configs_data.get('summary_engines', {}),
             council_ais=special_configs_data.get('council_ais', []),
-            default_context_engine=special_configs_data.get('default_context_engine', 'gpt5mini')
+            default_context_engine=special_configs_data.get('default_context_engine', 'gpt5mini'),
+            chunking=special_configs_data.get('chunking', {}),
+            circuit_breaker=special_configs_data.get('circuit_breaker', {}),
+            bulkheads=special_configs_data.get('bulkheads', {})
         )
 
     def _create_fallback_configs(self) -> None:
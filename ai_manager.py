@@ -6,13 +6,18 @@
 import asyncio
 import functools
 import time
-from typing import Dict, Callable, Any, Optional, List
+from typing import AsyncIterator, Dict, Callable, Any, Optional, List
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 
 from utils import safe_log
 from rate_limiter import get_rate_limiter, rate_limited_request
 from ai_config_loader import get_ai_config_loader, AIModelConfig
+from model_capabilities import get_capability_registry
+from request_hedger import HedgePolicy, RequestHedger
+from circuit_breaker import CircuitOpenError, get_circuit_breakers
+from bulkhead import get_bulkheads
+from single_flight import SingleFlight, make_flight_key
 
 # AIClientConfig は ai_config_loader.AIModelConfig に移行
 # 後方互換性のためのエイリアス
@@ -25,16 +30,33 @@ class AIClientError(Exception):
         self.original_error = original_error
         super().__init__(f"{ai_name}エラー: {message}")
 
+def _is_error_response(result: Any) -> bool:
+    """ai_clients のラッパーが例外の代わりに返すエラー文字列（「〇〇エラー: ...」）か"""
+    return isinstance(result, str) and "エラー:" in result[:80]
+
+def _get_circuit_breaker(args: tuple):
+    """デコレート対象メソッドの self（AIClient）からサービスのブレーカーを取得"""
+    config = getattr(args[0], "config", None) if args else None
+    service_name = getattr(config, "rate_limit_service", None)
+    return get_circuit_breakers().get(service_name) if service_name else None
+
 def with_ai_error_handling(ai_name: str, max_retries: int = 2):
-    """AIエラーハンドリングデコレータ"""
+    """
+    AIエラーハンドリングデコレータ
+    各試行の結果をサービスのサーキットブレーカーに記録し、遮断中は再試行せず CircuitOpenError を送出する
+    """
     def decorator(func: Callable):
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             last_error = None
+            breaker = _get_circuit_breaker(args)
 
             for attempt in range(max_retries + 1):
+                if breaker is not None and not breaker.allow_request():
+                    raise CircuitOpenError(breaker.service_name, breaker.retry_after())
+
+                start_time = time.time()
                 try:
-                    start_time = time.time()
                     result = await func(*args, **kwargs)
                     end_time = time.time()
 
@@ -42,6 +64,9 @@ def with_ai_error_handling(ai_name: str, max_retries: int = 2):
                     if not result or not str(result).strip():
                         raise AIClientError(ai_name, "応答が空でした")
 
+                    if breaker is not None:
+                        breaker.record(not _is_error_response(result), end_time - start_time)
+
                     # 成功ログ
                     if attempt > 0:
                         safe_log(f"✅ {ai_name}復旧成功: ", f"試行{attempt + 1}回目で成功 ({end_time - start_time:.2f}s)")
@@ -50,6 +75,8 @@ def with_ai_error_handling(ai_name: str, max_retries: int = 2):
 
                 except Exception as e:
                     last_error = e
+                    if breaker is not None:
+                        breaker.record(False, time.time() - start_time)
                     if attempt < max_retries:
                         wait_time = 2 ** attempt  # 指数バックオフ
                         safe_log(f"⚠️ {ai_name}エラー（試行{attempt + 1}）: ", f"{str(e)[:100]}... {wait_time}秒後に再試行")
@@ -72,23 +99,52 @@ class AIClient(ABC):
         self.call_count = 0
         self.error_count = 0
         self.total_response_time = 0.0
+        self.stream_count = 0
+        self.total_first_chunk_time = 0.0
 
     @abstractmethod
     async def generate(self, prompt: str, **kwargs) -> str:
         """AI応答を生成"""
         pass
 
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        AI応答を生成された順に返す（非同期イテレータ）
+        ストリーミング非対応のクライアントは generate の結果を1回で返す
+        """
+        yield await self.generate(prompt, **kwargs)
+
+    async def _stream_with_stats(self, chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """ストリームの呼び出し回数・初回チャンクまでの時間・総時間を記録"""
+        self.call_count += 1
+        self.stream_count += 1
+        start_time = time.time()
+        first_chunk = True
+        try:
+            async for chunk in chunks:
+                if first_chunk:
+                    self.total_first_chunk_time += time.time() - start_time
+                    first_chunk = False
+                yield chunk
+            self.total_response_time += time.time() - start_time
+        except Exception:
+            self.error_count += 1
+            raise
+
     def get_stats(self) -> Dict[str, Any]:
         """統計情報を取得"""
         avg_time = self.total_response_time / max(self.call_count, 1)
         error_rate = self.error_count / max(self.call_count, 1)
+        avg_first_chunk = self.total_first_chunk_time / max(self.stream_count, 1)
 
         return {
             "name": self.config.name,
             "calls": self.call_count,
             "errors": self.error_count,
             "error_rate": f"{error_rate:.1%}",
-            "avg_response_time": f"{avg_time:.2f}s"
+            "avg_response_time": f"{avg_time:.2f}s",
+            "streams": self.stream_count,
+            "avg_first_chunk_time": f"{avg_first_chunk:.2f}s"
         }
 
 class OpenAIClient(AIClient):
@@ -98,55 +154,46 @@ class OpenAIClient(AIClient):
         self.openai_client = openai_client
         self.model = model or config.model
 
+    def _build_completion_params(self, prompt: str, system_prompt: str = None) -> Dict[str, Any]:
+        messages = []
+        if system_prompt or self.config.system_prompt:
+            messages.append({"role": "system", "content": system_prompt or self.config.system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        # トークン上限・temperature の可否は _create_completion でパラメータ対応表に合わせる
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.config.temperature
+        }
+
+    async def _create_completion(self, completion_params: Dict[str, Any]):
+        """
+        モデルのパラメータ対応表に合わせて chat.completions.create を呼ぶ
+        max_tokens・temperature を拒否された場合は対応表を更新して再送する（次回からは最初から正しいリクエストになる）
+        """
+        registry = get_capability_registry()
+        retried = False
+        while True:
+            request = registry.apply(self.model, completion_params, max_tokens=2000)
+            try:
+                response = await self.openai_client.chat.completions.create(**request)
+                if not retried:
+                    registry.record_first_try()
+                return response
+            except Exception as e:
+                if not registry.learn(self.model, e, request):
+                    raise e
+                retried = True
+                print(f"🔄 パラメータを調整して再送 ({self.model})")
+
     @with_ai_error_handling("OpenAI")
     async def generate(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
         self.call_count += 1
         start_time = time.time()
 
         try:
-            messages = []
-            if system_prompt or self.config.system_prompt:
-                messages.append({"role": "system", "content": system_prompt or self.config.system_prompt})
-            messages.append({"role": "user", "content": prompt})
-
-            # モデルによってmax_tokensかmax_completion_tokensかを判断
-            completion_params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": self.config.temperature
-            }
-
-            # デバッグ用：モデル名をログ出力
-            print(f"🔍 使用モデル: {self.model}")
-
-            # max_tokensとtemperatureのフォールバック処理
-            try:
-                completion_params["max_tokens"] = 2000
-                print(f"🔄 max_tokens試行: {2000}")
-                response = await self.openai_client.chat.completions.create(**completion_params)
-            except Exception as e:
-                error_str = str(e)
-                if "max_tokens" in error_str:
-                    # max_tokensがサポートされていない場合、パラメータなしで試行
-                    print(f"🔄 max_tokensパラメータなしで試行")
-                    completion_params.pop("max_tokens", None)
-                    try:
-                        response = await self.openai_client.chat.completions.create(**completion_params)
-                    except Exception as e2:
-                        if "temperature" in str(e2):
-                            print(f"🔄 temperatureパラメータもなしで試行")
-                            completion_params.pop("temperature", None)
-                            response = await self.openai_client.chat.completions.create(**completion_params)
-                        else:
-                            raise e2
-                elif "temperature" in error_str:
-                    # temperatureがサポートされていない場合、パラメータなしで試行
-                    print(f"🔄 temperatureパラメータなしで試行")
-                    completion_params.pop("temperature", None)
-                    response = await self.openai_client.chat.completions.create(**completion_params)
-                else:
-                    raise e
-
+            response = await self._create_completion(self._build_completion_params(prompt, system_prompt))
             result = response.choices[0].message.content
             self.total_response_time += time.time() - start_time
             return result
@@ -155,11 +202,31 @@ class OpenAIClient(AIClient):
             self.error_count += 1
             raise e
 
+    async def stream(self, prompt: str, system_prompt: str = None, **kwargs) -> AsyncIterator[str]:
+        """stream=True で差分（delta）を受け取った順に返す"""
+        async def deltas():
+            completion_params = self._build_completion_params(prompt, system_prompt)
+            completion_params["stream"] = True
+            response = await self._create_completion(completion_params)
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        async for text in self._stream_with_stats(deltas()):
+            yield text
+
 class GeminiClient(AIClient):
     """Gemini系クライアント"""
-    def __init__(self, config: AIModelConfig, generate_func: Callable):
+    def __init__(self, config: AIModelConfig, generate_func: Callable, stream_func: Optional[Callable] = None):
         super().__init__(config)
         self.generate_func = generate_func
+        self.stream_func = stream_func  # プロンプトを受け取りテキストを順に返す非同期イテレータ（任意）
+
+    def _build_prompt(self, prompt: str, system_prompt: str = None) -> str:
+        # system_promptが指定されている場合は統合
+        if system_prompt or self.config.system_prompt:
+            return f"{system_prompt or self.config.system_prompt}\n\n{prompt}"
+        return prompt
 
     @with_ai_error_handling("Gemini")
     async def generate(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
@@ -167,13 +234,7 @@ class GeminiClient(AIClient):
         start_time = time.time()
 
         try:
-            # system_promptが指定されている場合は統合
-            if system_prompt or self.config.system_prompt:
-                full_prompt = f"{system_prompt or self.config.system_prompt}\n\n{prompt}"
-            else:
-                full_prompt = prompt
-
-            result = await self.generate_func(full_prompt)
+            result = await self.generate_func(self._build_prompt(prompt, system_prompt))
             self.total_response_time += time.time() - start_time
             return result
 
@@ -181,6 +242,16 @@ class GeminiClient(AIClient):
             self.error_count += 1
             raise e
 
+    async def stream(self, prompt: str, system_prompt: str = None, **kwargs) -> AsyncIterator[str]:
+        """stream_func があれば非同期ストリーミング、なければ generate の結果を1回で返す"""
+        if self.stream_func is None:
+            async for text in super().stream(prompt, system_prompt=system_prompt, **kwargs):
+                yield text
+            return
+
+        async for text in self._stream_with_stats(self.stream_func(self._build_prompt(prompt, system_prompt))):
+            yield text
+
 class ExternalAPIClient(AIClient):
     """外部API系クライアント（Claude, Grok, Perplexity等）"""
     def __init__(self, config: AIModelConfig, api_func: Callable, api_key: str):
@@ -208,6 +279,8 @@ class AIClientManager:
     def __init__(self):
         self.clients: Dict[str, AIClient] = {}
         self.initialized = False
+        self.hedger = RequestHedger(is_failure=_is_error_response)
+        self.single_flight = SingleFlight()
 
     def initialize(self, bot) -> None:
         """Botインスタンスを使ってクライアントを初期化（YAML設定使用）"""
@@ -225,9 +298,15 @@ class AIClientManager:
 
         from ai_clients import (
             ask_gpt5, ask_gpt4o, ask_gpt5_mini, ask_gemini_2_5_pro,
-            ask_claude, ask_grok, ask_llama, ask_lalah, ask_rekus, ask_o1_pro
+            ask_claude, ask_grok, ask_llama, ask_lalah, ask_rekus, ask_o1_pro,
+            stream_gemini_2_5_pro
         )
 
+        # サーキットブレーカーの閾値と遮断時の代替AI
+        get_circuit_breakers().configure(config_loader.get_special_configs().circuit_breaker)
+        # サービスごとの同時実行枠
+        get_bulkheads().configure(config_loader.get_special_configs().bulkheads)
+
         # YAML設定からクライアントを動的生成
         self._create_clients_from_config(bot, ai_configs, {
             'ask_gpt5': ask_gpt5,
@@ -239,18 +318,23 @@ class AIClientManager:
             'ask_llama': ask_llama,
             'ask_lalah': ask_lalah,
             'ask_rekus': ask_rekus,
-            'ask_o1_pro': ask_o1_pro
+            'ask_o1_pro': ask_o1_pro,
+            'stream_gemini_2_5_pro': stream_gemini_2_5_pro
         })
 
         self.initialized = True
         safe_log("✅ AIClientManager初期化完了: ", f"{len(self.clients)}個のクライアント登録")
 
     def _create_clients_from_config(self, bot, ai_configs: Dict[str, AIModelConfig], api_functions: Dict[str, Callable]):
-        """設定からクライアントを動的生成"""
+        """
+        設定からクライアントを動的生成
+        APIキー・クライアントは functools.partial で生成時に束縛する（ループ変数を参照するlambdaは最後の関数を呼んでしまう）
+        """
         for ai_type, config in ai_configs.items():
             try:
                 if config.client_type == "openai":
-                    # OpenAI系クライアント
+                    # OpenAI系クライアント（設定のパラメータ対応を対応表の初期値にする）
+                    get_capability_registry().seed(config.model, config.capabilities)
                     self.clients[ai_type] = OpenAIClient(
                         config,
                         bot.openai_client
@@ -267,7 +351,9 @@ class AIClientManager:
                         api_func = api_functions.get('ask_gemini_2_5_pro')  # デフォルト
 
                     if api_func:
-                        self.clients[ai_type] = GeminiClient(config, api_func)
+                        self.clients[ai_type] = GeminiClient(
+                            config, api_func, stream_func=api_functions.get('stream_gemini_2_5_pro')
+                        )
 
                 elif config.client_type == "external_api":
                     # 外部API系クライアント
@@ -283,12 +369,12 @@ class AIClientManager:
                     elif api_func and config.api_function == "ask_rekus":
                         # Perplexity用
                         self.clients[ai_type] = GeminiClient(
-                            config, lambda prompt: api_func(bot.perplexity_api_key, prompt)
+                            config, functools.partial(api_func, bot.perplexity_api_key)
                         )
                     elif api_func and config.api_function == "ask_lalah":
                         # Mistral用
                         self.clients[ai_type] = GeminiClient(
-                            config, lambda prompt: api_func(bot.mistral_client, prompt)
+                            config, functools.partial(api_func, bot.mistral_client)
                         )
 
                 elif config.client_type == "vertex_ai":
@@ -298,7 +384,7 @@ class AIClientManager:
                         if api_func:
                             self.clients[ai_type] = GeminiClient(
                                 config,
-                                lambda prompt: api_func(bot.llama_model, "llama_user", prompt)
+                                functools.partial(api_func, bot.llama_model, "llama_user")
                             )
 
                 elif config.client_type == "mistral":
@@ -306,7 +392,7 @@ class AIClientManager:
                     api_func = api_functions.get('ask_lalah')
                     if api_func:
                         self.clients[ai_type] = GeminiClient(
-                            config, lambda prompt: api_func(bot.mistral_client, prompt)
+                            config, functools.partial(api_func, bot.mistral_client)
                         )
 
                 if ai_type in self.clients:
@@ -319,8 +405,13 @@ class AIClientManager:
 
         # 旧のハードコード設定を削除し、動的設定に置き換え
 
-    async def ask_ai(self, ai_type: str, prompt: str, priority: float = 1.0, **kwargs) -> str:
-        """レート制限付き統一AI呼び出しインターフェース"""
+    async def ask_ai(self, ai_type: str, prompt: str, priority: float = 1.0,
+                     hedge: Optional[HedgePolicy] = None, pool: Optional[str] = None, **kwargs) -> str:
+        """
+        レート制限付き統一AI呼び出しインターフェース
+        hedge を指定すると、主AIが観測レイテンシのパーセンタイルを過ぎても応答しない場合にバックアップAIへも送る
+        pool はサービスの同時実行枠の区分（interactive / background / summary、省略時は bulkhead_pool の指定）
+        """
         if not self.initialized:
             raise RuntimeError("AIClientManagerが初期化されていません")
 
@@ -328,17 +419,113 @@ class AIClientManager:
             available = ", ".join(self.clients.keys())
             raise ValueError(f"不明なAIタイプ: {ai_type}. 利用可能: {available}")
 
+        # 実行中の同一リクエストがあれば合流する（優先度・枠・ヘッジは最初の呼び出し元のものを使う）
+        params = {key: value for key, value in kwargs.items() if key != "system_prompt"}
+        flight_key = make_flight_key(
+            ai_type, prompt, kwargs.get("system_prompt") or self.clients[ai_type].config.system_prompt, params
+        )
+        return await self.single_flight.run(
+            flight_key, lambda: self._ask(ai_type, prompt, priority, hedge, pool, **kwargs)
+        )
+
+    async def _ask(self, ai_type: str, prompt: str, priority: float, hedge: Optional[HedgePolicy],
+                   pool: Optional[str], **kwargs) -> str:
+        """ヘッジ・遮断時の代替AIへの切り替えを含めて1リクエストを実行"""
+        try:
+            if hedge is not None and hedge.backup in self.clients and hedge.backup != ai_type:
+                return await self.hedger.run(
+                    ai_type, hedge,
+                    lambda: self._request(ai_type, prompt, priority, pool, **kwargs),
+                    lambda: self._request(hedge.backup, prompt, priority, pool, **kwargs)
+                )
+
+            start_time = time.monotonic()
+            response = await self._request(ai_type, prompt, priority, pool, **kwargs)
+            # ヘッジ待ち時間の算出用にレイテンシを記録（エラー応答は除く）
+            if not _is_error_response(response):
+                self.hedger.record_latency(ai_type, time.monotonic() - start_time)
+            return response
+
+        except CircuitOpenError as e:
+            # 遮断中のサービスは設定された代替AIへ回す（代替先も遮断中なら例外のまま）
+            breakers = get_circuit_breakers()
+            fallback = breakers.get_fallback(ai_type)
+            if not fallback or fallback not in self.clients or fallback == ai_type:
+                raise
+            breakers.fallback_calls += 1
+            safe_log(f"🔀 サーキット遮断中のため代替AIへ切り替え: ", f"{ai_type} -> {fallback} ({e})")
+            return await self._request(fallback, prompt, priority, pool, **kwargs)
+
+    async def _request(self, ai_type: str, prompt: str, priority: float, pool: Optional[str] = None, **kwargs) -> str:
+        """
+        同時実行枠・レート制限付きでリクエスト実行
+        遮断中のサービスは枠を取らずに失敗させる
+        """
         client = self.clients[ai_type]
+        breaker = get_circuit_breakers().get(client.config.rate_limit_service)
+        if breaker.is_open():
+            raise CircuitOpenError(breaker.service_name, breaker.retry_after())
 
-        # レート制限付きでリクエスト実行
         service_name = self._get_service_name(ai_type)
-        return await rate_limited_request(
-            service_name,
-            client.generate,
-            prompt,
-            priority=priority,
-            **kwargs
-        )
+        async with get_bulkheads().slot(client.config.rate_limit_service, pool, priority):
+            return await rate_limited_request(
+                service_name,
+                client.generate,
+                prompt,
+                priority=priority,
+                **kwargs
+            )
+
+    async def stream_ai(self, ai_type: str, prompt: str, priority: float = 1.0,
+                        pool: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        レート制限付きストリーミング呼び出し（生成されたテキストを順に返す）
+        最初のチャンクを受け取る前に失敗した場合は、再試行付きの ask_ai にフォールバックする
+        """
+        if not self.initialized:
+            raise RuntimeError("AIClientManagerが初期化されていません")
+
+        if ai_type not in self.clients:
+            available = ", ".join(self.clients.keys())
+            raise ValueError(f"不明なAIタイプ: {ai_type}. 利用可能: {available}")
+
+        client = self.clients[ai_type]
+        service_name = self._get_service_name(ai_type)
+
+        breaker = get_circuit_breakers().get(client.config.rate_limit_service)
+        if not breaker.allow_request():
+            # 遮断中は ask_ai 側の代替AIへの切り替えに任せる
+            yield await self.ask_ai(ai_type, prompt, priority=priority, pool=pool, **kwargs)
+            return
+
+        # ストリーム中は同時実行枠を保持する（フォールバックの ask_ai の前に返す）
+        semaphore = await get_bulkheads().acquire(client.config.rate_limit_service, pool, priority)
+        try:
+            result = await get_rate_limiter().acquire_request_slot(service_name, priority)
+        except BaseException:
+            semaphore.release()
+            raise
+        if not result.allowed:
+            semaphore.release()
+            raise Exception(f"レート制限により拒否: {result.message}")
+
+        received = False
+        start_time = time.time()
+        try:
+            async for text in client.stream(prompt, **kwargs):
+                received = True
+                yield text
+            breaker.record(True, time.time() - start_time)
+            return
+        except Exception as e:
+            breaker.record(False, time.time() - start_time)
+            if received:
+                raise
+            safe_log(f"⚠️ ストリーミング失敗、通常呼び出しに切り替えます ({ai_type}): ", e)
+        finally:
+            semaphore.release()
+
+        yield await self.ask_ai(ai_type, prompt, priority=priority, pool=pool, **kwargs)
 
     def _get_service_name(self, ai_type: str) -> str:
         """AIタイプからサービス名を取得"""
@@ -387,7 +574,9 @@ class AIClientManager:
         return {
             "ai_performance": ai_stats,
             "rate_limits": rate_limit_stats,
-            "service_health": service_health
+            "service_health": service_health,
+            "hedging": self.hedger.get_stats(),
+            "single_flight": self.single_flight.get_stats()
         }
 
 # グローバルインスタンス
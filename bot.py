@@ -14,7 +14,6 @@ import discord
 from discord.ext import commands
 import google.generativeai as genai
 from mistralai.async_client import MistralAsyncClient
-from notion_client import Client
 from openai import AsyncOpenAI
 import vertexai
 # 修正: 正しいクラス名をインポート
@@ -24,6 +23,15 @@ from google.cloud import secretmanager
 # --- 自作モジュール ---
 import utils
 import notion_utils
+from notion_cache import get_notion_cache
+from summary_cache import get_summary_cache
+from notion_index import get_notion_index
+from rolling_summary import get_rolling_summary_manager
+from discord_dispatcher import get_outbound_dispatcher
+from http_pool import init_http_pool, get_http_pool, close_http_pool
+from provider_registry import get_provider_registry
+from model_capabilities import init_capability_registry, get_capability_registry
+from bulkhead import get_bulkheads
 from config import get_config
 from enhanced_memory_manager import get_enhanced_memory_manager
 
@@ -82,6 +90,26 @@ ADMIN_USER_ID = config.get_required("ADMIN_USER_ID")
 
 # オプション設定
 GUILD_ID = config.get("GUILD_ID", "")
+NOTION_BACKEND = config.get("NOTION_BACKEND", "async")
+NOTION_STORE_PATH = config.get("NOTION_STORE_PATH", "")
+try:
+    NOTION_MAX_CONCURRENCY = int(config.get("NOTION_MAX_CONCURRENCY") or "5")
+except ValueError:
+    NOTION_MAX_CONCURRENCY = 5
+NOTION_WRITE_BEHIND = (config.get("NOTION_WRITE_BEHIND") or "true").lower() == "true"
+try:
+    NOTION_FLUSH_INTERVAL = float(config.get("NOTION_FLUSH_INTERVAL") or "2.0")
+except ValueError:
+    NOTION_FLUSH_INTERVAL = 2.0
+MODEL_CAPABILITIES_PATH = config.get("MODEL_CAPABILITIES_PATH", "model_capabilities.json")
+try:
+    HTTP_TIMEOUT = float(config.get("HTTP_TIMEOUT") or "60")
+except ValueError:
+    HTTP_TIMEOUT = 60.0
+try:
+    HTTP_MAX_PER_HOST = int(config.get("HTTP_MAX_PER_HOST") or "10")
+except ValueError:
+    HTTP_MAX_PER_HOST = 10
 
 # --- FastAPIとDiscord Botの準備 ---
 app = FastAPI()
@@ -197,6 +225,17 @@ def performance_stats():
         stats = {
             "async_optimization": get_global_optimization_stats(),
             "memory_stats": get_memory_manager().get_memory_stats(),
+            "notion_sync": notion_utils.get_page_sync_stats(),
+            "notion_writes": notion_utils.get_write_queue_stats(),
+            "notion_cache": get_notion_cache().get_detailed_stats(),
+            "summary_cache": get_summary_cache().get_detailed_stats(),
+            "notion_index": get_notion_index().get_stats(),
+            "rolling_summary": get_rolling_summary_manager().get_stats(),
+            "outbound": get_outbound_dispatcher().get_stats(),
+            "http_pool": get_http_pool().get_stats(),
+            "provider_registry": get_provider_registry().get_stats(),
+            "model_capabilities": get_capability_registry().get_stats(),
+            "bulkheads": get_bulkheads().get_stats(),
         }
 
         # AIマネージャーが初期化済みの場合は統計を追加
@@ -220,11 +259,14 @@ def rate_limit_status():
     try:
         from rate_limiter import get_rate_limiter
 
+        from circuit_breaker import get_circuit_breakers
+
         rate_limiter = get_rate_limiter()
         return {
             "status": "ok",
             "rate_limits": rate_limiter.get_all_stats(),
-            "service_health": rate_limiter.get_service_health()
+            "service_health": rate_limiter.get_service_health(),
+            "circuit_breakers": get_circuit_breakers().get_all_stats()
         }
     except Exception as e:
         return {
@@ -319,7 +361,15 @@ async def startup_event():
         http_client = httpx.AsyncClient()
         bot.openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
         bot.mistral_client = MistralAsyncClient(api_key=MISTRAL_API_KEY)
-        notion_utils.notion = Client(auth=NOTION_API_KEY)
+        notion_utils.init_notion_client(
+            NOTION_API_KEY,
+            backend=NOTION_BACKEND,
+            max_concurrency=NOTION_MAX_CONCURRENCY
+        )
+        notion_utils.init_notion_store(NOTION_STORE_PATH)
+        init_http_pool(total_timeout=HTTP_TIMEOUT, limit_per_host=HTTP_MAX_PER_HOST)
+        init_capability_registry(MODEL_CAPABILITIES_PATH)
+        notion_utils.init_notion_write_queue(NOTION_WRITE_BEHIND, NOTION_FLUSH_INTERVAL)
         genai.configure(api_key=GEMINI_API_KEY)
         bot.perplexity_api_key = PERPLEXITY_API_KEY
         bot.openrouter_api_key = OPENROUTER_API_KEY
@@ -346,6 +396,11 @@ async def startup_event():
         except Exception as e:
             print(f"🚨 Vertex AI init failed: {e}")
 
+        # Geminiモデルハンドルを事前生成（初回リクエストで生成コストを払わない）
+        from ai_clients import warm_up_provider_models
+        warmed = warm_up_provider_models()
+        print(f"✅ Provider model handles warmed up: {warmed}")
+
         asyncio.create_task(bot.start(DISCORD_TOKEN))
         print("✅ Discord Bot startup task has been created.")
 
@@ -354,6 +409,27 @@ async def startup_event():
         import traceback
         traceback.print_exc()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    print("🛑 Shutting down: releasing API client resources...")
+    try:
+        # 送信待ちのDiscordメッセージを先に送る
+        await get_outbound_dispatcher().flush()
+    except Exception as e:
+        print(f"⚠️ Discord送信キューのフラッシュに失敗: {e}")
+    try:
+        unwritten = await notion_utils.flush_notion_writes()
+        if unwritten:
+            print(f"⚠️ シャットダウン時にNotionへ書き込めなかったログ: {unwritten}ブロック")
+        await notion_utils.close_notion_client()
+        await notion_utils.close_notion_store()
+    except Exception as e:
+        print(f"⚠️ Notionクライアントのクローズに失敗: {e}")
+    try:
+        await close_http_pool()
+    except Exception as e:
+        print(f"⚠️ HTTPセッションプールのクローズに失敗: {e}")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+プロバイダー別・処理区分別の同時実行数制限（バルクヘッド）
+サービス（openai / gemini / claude ...）ごとに interactive / background / summary の独立した枠を持ち、
+/all や /critical の一斉呼び出しやKB要約が、対話の応答待ちの枠を食い潰さないようにする
+枠が空くのを待つリクエストは優先度順（値が小さいほど優先、rate_limiter と同じ）に通す
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+POOLS = ("interactive", "background", "summary")
+DEFAULT_POOL = "interactive"
+DEFAULT_LIMITS = {"interactive": 4, "background": 1, "summary": 2}
+
+# 呼び出し元が with bulkhead_pool(...) で指定した処理区分・優先度（asyncio のタスクにも引き継がれる）
+_current_pool: ContextVar[str] = ContextVar("bulkhead_pool", default=DEFAULT_POOL)
+_current_priority: ContextVar[float] = ContextVar("bulkhead_priority", default=1.0)
+# 既に枠を持っているサービス（AIClientManager → ai_clients の入れ子で二重に取らない）
+_held_services: ContextVar[FrozenSet[str]] = ContextVar("bulkhead_held", default=frozenset())
+
+class PrioritySemaphore:
+    """待ち行列を優先度順に通すセマフォ"""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+        # 統計
+        self.admitted = 0
+        self.queued = 0
+        self.max_in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    async def acquire(self, priority: float = 1.0) -> float:
+        """枠を取得（待った秒数を返す）"""
+        if self.in_flight < self.limit and not self.waiters:
+            self._admit()
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._sequence), future))
+        self.queued += 1
+        start_time = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 枠を渡された直後にキャンセルされた場合は返す
+                self.release()
+            raise
+        waited = time.monotonic() - start_time
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        """空いた枠を優先度の高い待ちリクエストに渡す"""
+        while self.waiters and self.in_flight < self.limit:
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue  # キャンセル済み
+            self._admit()
+            future.set_result(True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for _, _, future in self.waiters if not future.done()),
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "avg_queue_wait": f"{self.total_wait / max(self.queued, 1):.2f}s",
+            "max_queue_wait": f"{self.max_wait:.2f}s"
+        }
+
+class BulkheadRegistry:
+    """(サービス, 処理区分) ごとのセマフォを管理"""
+
+    def __init__(self):
+        self.limits: Dict[str, Dict[str, int]] = {"default": dict(DEFAULT_LIMITS)}
+        self.semaphores: Dict[Tuple[str, str], PrioritySemaphore] = {}
+
+    def configure(self, settings: Optional[Dict[str, Any]]) -> None:
+        """ai_models.yaml の special_configs.bulkheads を反映"""
+        limits = {"default": dict(DEFAULT_LIMITS)}
+        for service, pools in (settings or {}).items():
+            limits[service] = {pool: int(limit) for pool, limit in (pools or {}).items() if pool in POOLS}
+        self.limits = limits
+        for (service, pool), semaphore in self.semaphores.items():
+            semaphore.set_limit(self.get_limit(service, pool))
+
+    def get_limit(self, service: str, pool: str) -> int:
+        service_limits = self.limits.get(service, {})
+        return service_limits.get(pool, self.limits["default"].get(pool, DEFAULT_LIMITS[pool]))
+
+    def _get_semaphore(self, service: str, pool: str) -> PrioritySemaphore:
+        key = (service, pool)
+        semaphore = self.semaphores.get(key)
+        if semaphore is None:
+            semaphore = self.semaphores[key] = PrioritySemaphore(self.get_limit(service, pool))
+        return semaphore
+
+    async def acquire(self, service: str, pool: Optional[str] = None, priority: Optional[float] = None) -> PrioritySemaphore:
+        """
+        サービスの枠を取得し、release() すべきセマフォを返す（ストリーミング等、with で囲めない場合に使う）
+        pool・priority を省略した場合は bulkhead_pool() で指定された値（なければ interactive / 1.0）
+        """
+        pool = pool or _current_pool.get()
+        if pool not in POOLS:
+            pool = DEFAULT_POOL
+        semaphore = self._get_semaphore(service, pool)
+        waited = await semaphore.acquire(_current_priority.get() if priority is None else priority)
+        if waited >= 1.0:
+            print(f"⏳ 同時実行枠待ち ({service}/{pool}): {waited:.1f}秒")
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, service: str, pool: Optional[str] = None, priority: Optional[float] = None):
+        """サービスの枠を取得して処理を行う（同じサービスの枠を持っている入れ子の呼び出しでは取らない）"""
+        held = _held_services.get()
+        if service in held:
+            yield
+            return
+
+        semaphore = await self.acquire(service, pool, priority)
+        token = _held_services.set(held | {service})
+        try:
+            yield
+        finally:
+            _held_services.reset(token)
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        stats: Dict[str, Dict[str, Any]] = {}
+        for (service, pool), semaphore in sorted(self.semaphores.items()):
+            stats.setdefault(service, {})[pool] = semaphore.get_stats()
+        return stats
+
+
+# グローバルバルクヘッド
+_bulkheads: Optional[BulkheadRegistry] = None
+
+def get_bulkheads() -> BulkheadRegistry:
+    """バルクヘッドを取得（シングルトン）"""
+    global _bulkheads
+    if _bulkheads is None:
+        _bulkheads = BulkheadRegistry()
+    return _bulkheads
+
+@contextmanager
+def bulkhead_pool(pool: str, priority: Optional[float] = None):
+    """このブロック内（と、ここで作られるタスク）のAI呼び出しを指定の処理区分で実行する"""
+    pool_token = _current_pool.set(pool)
+    priority_token = _current_priority.set(priority) if priority is not None else None
+    try:
+        yield
+    finally:
+        if priority_token is not None:
+            _current_priority.reset(priority_token)
+        _current_pool.reset(pool_token)
+
+def bulkheaded(service: str):
+    """AI呼び出し関数をサービスの同時実行枠の中で実行するデコレータ"""
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with get_bulkheads().slot(service):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -28,7 +28,9 @@ from utils import (
     safe_log, send_long_message, analyze_attachment_for_gemini, get_notion_context_for_message
 )
 from enhanced_cache import get_cache_manager
+from rolling_summary import get_rolling_summary, mark_rolling_summary_section, build_council_context, log_rolling_summary
 from config_manager import get_config_manager
+from bulkhead import bulkhead_pool
 
 # 重複処理防止クラス（既存のものをそのまま利用）
 class MessageDuplicationHandler:
@@ -239,19 +241,24 @@ async def run_genius_pro_task(bot: commands.Bot, message: discord.Message):
                 await message.channel.send("❌ Notion未連携")
                 return
 
-            initial_summary = await get_notion_context_for_message(bot, message, page_ids[0], prompt, "gpt5mini")
+            # 2000文字超の応答の送り方（council タスクの設定）
+            long_message_mode = get_unified_task_engine().config_loader.get_task_config("genius_pro").long_message_mode
+
+            # ページのローリング要約（前回以降に追記されたブロックだけを要約して畳み込む）
+            kb_page_id = page_ids[0]
+            initial_summary = await get_rolling_summary(bot, kb_page_id)
             if not initial_summary:
                 await message.channel.send(f"❌ 初回要約に失敗")
                 return
 
-            await send_long_message(bot.openai_client, message.channel, f"**gpt5miniによる論点サマリー:**\n{initial_summary}")
+            await send_long_message(bot.openai_client, message.channel, f"**gpt5miniによる論点サマリー:**\n{initial_summary}", mode=long_message_mode)
 
-            # 論点サマリーを0ページに保存
-            kb_page_id = page_ids[0]
-            await log_response(kb_page_id, f"論点サマリー:\n{initial_summary}", "gpt5mini")
+            # 論点サマリーを0ページに保存（次回のローリング要約の差分からは除外される）
+            await log_rolling_summary(kb_page_id, initial_summary, "gpt5mini")
 
-            # 最適化された並列AI評議会
-            council_prompt = f"論点: {initial_summary}\n\n議題「{prompt}」を分析してください。"
+            # 最適化された並列AI評議会（論点に議題の関連ブロックを加える）
+            council_context = await build_council_context(kb_page_id, prompt, initial_summary)
+            council_prompt = f"論点: {council_context}\n\n議題「{prompt}」を分析してください。"
 
             # 直接関数呼び出しで並列処理
             from ai_clients import ask_claude, ask_llama
@@ -264,7 +271,7 @@ async def run_genius_pro_task(bot: commands.Bot, message: discord.Message):
             council_reports = {name: (f"エラー: {res}" if isinstance(res, Exception) else res) for name, res in zip(tasks.keys(), results)}
 
             for name, report in council_reports.items():
-                await send_long_message(bot.openai_client, message.channel, f"**分析 by {name}:**\n{report}")
+                await send_long_message(bot.openai_client, message.channel, f"**分析 by {name}:**\n{report}", mode=long_message_mode)
                 # 各分析を0ページに保存
                 await log_response(kb_page_id, f"分析 by {name}:\n{report}", name)
 
@@ -272,7 +279,7 @@ async def run_genius_pro_task(bot: commands.Bot, message: discord.Message):
 
             # Gemini 2.5 Proで最終統合レポートを生成
             final_report = await ask_gemini_2_5_pro(synthesis_material)
-            await send_long_message(bot.openai_client, message.channel, f"**最終統合レポート:**\n{final_report}")
+            await send_long_message(bot.openai_client, message.channel, f"**最終統合レポート:**\n{final_report}", mode=long_message_mode)
 
             # 最終レポートを0ページに保存
             await log_response(kb_page_id, f"最終統合レポート:\n{final_report}", "Gemini 2.5 Pro")
@@ -281,9 +288,12 @@ async def run_genius_pro_task(bot: commands.Bot, message: discord.Message):
             if len(page_ids) >= 2:
                 log_page_id = page_ids[1]
                 summary_prompt = f"以下のAI評議会最終レポートを150字以内で要約してください。\n\n{final_report}"
-                log_summary = await ask_gpt5_mini(bot.openai_client, summary_prompt)
+                with bulkhead_pool("background"):
+                    log_summary = await ask_gpt5_mini(bot.openai_client, summary_prompt)
                 new_section_id = await find_latest_section_id(log_page_id)
-                await append_summary_to_kb(log_page_id, new_section_id, log_summary)
+                new_section_id = await append_summary_to_kb(log_page_id, new_section_id, log_summary)
+                if new_section_id:
+                    await mark_rolling_summary_section(kb_page_id, new_section_id)
 
         except Exception as e:
             safe_log("🚨 genius_proタスクエラー: ", e)
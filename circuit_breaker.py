@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+サービスごとのサーキットブレーカー
+直近の呼び出しのエラー率・遅延率が閾値を超えたサービスを一定時間遮断（open）し、
+再試行のバックオフで評議会メンバーが数十秒を浪費しないようにする
+遮断時間が過ぎたら試行リクエストを1件だけ通し（half-open）、成功すれば復帰（closed）する
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """サーキットが開いているため呼び出しを行わなかった"""
+    def __init__(self, service_name: str, retry_after: float):
+        self.service_name = service_name
+        self.retry_after = retry_after
+        super().__init__(f"{service_name} は一時的に遮断中です（{retry_after:.0f}秒後に再試行）")
+
+@dataclass
+class CircuitBreakerConfig:
+    """ブレーカーの閾値"""
+    window: int = 20  # 判定に使う直近の呼び出し数
+    min_calls: int = 5  # これより少ない間は遮断しない
+    error_rate: float = 0.5  # エラー率がこれ以上で遮断
+    slow_call_seconds: float = 25.0  # これより遅い呼び出しを遅延として数える
+    slow_rate: float = 0.8  # 遅延率がこれ以上で遮断
+    open_seconds: float = 30.0  # 遮断を続ける秒数（試行リクエストの制限時間も兼ねる）
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "CircuitBreakerConfig":
+        config = config or {}
+        defaults = cls()
+        return cls(
+            window=int(config.get("window", defaults.window)),
+            min_calls=int(config.get("min_calls", defaults.min_calls)),
+            error_rate=float(config.get("error_rate", defaults.error_rate)),
+            slow_call_seconds=float(config.get("slow_call_seconds", defaults.slow_call_seconds)),
+            slow_rate=float(config.get("slow_rate", defaults.slow_rate)),
+            open_seconds=float(config.get("open_seconds", defaults.open_seconds))
+        )
+
+class CircuitBreaker:
+    """1サービス分の closed / open / half-open 状態"""
+
+    def __init__(self, service_name: str, config: Optional[CircuitBreakerConfig] = None, clock=time.monotonic):
+        self.service_name = service_name
+        self.config = config or CircuitBreakerConfig()
+        self.clock = clock
+        self.state = CLOSED
+        self.calls: Deque[Tuple[bool, bool]] = deque(maxlen=self.config.window)  # (失敗, 遅延)
+        self.opened_at = 0.0
+        self.trial_started_at: Optional[float] = None
+
+        # 統計
+        self.opened_count = 0
+        self.short_circuited = 0
+        self.last_reason = ""
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.config.open_seconds - self.clock())
+
+    def is_open(self) -> bool:
+        """遮断中か（状態は変えない。レート制限の枠を取る前の事前確認用）"""
+        if self.state == OPEN and self.clock() - self.opened_at < self.config.open_seconds:
+            self.short_circuited += 1
+            return True
+        return False
+
+    def allow_request(self) -> bool:
+        """呼び出してよいか（half-open では試行リクエスト1件だけを通す）"""
+        now = self.clock()
+        if self.state == OPEN:
+            if now - self.opened_at < self.config.open_seconds:
+                self.short_circuited += 1
+                return False
+            self.state = HALF_OPEN
+            self.trial_started_at = None
+            print(f"🔌 サーキット半開 ({self.service_name}): 試行リクエストを送信します")
+
+        if self.state == HALF_OPEN:
+            # 試行の結果が返らないまま制限時間を過ぎた場合は次の試行を許可する
+            if self.trial_started_at is not None and now - self.trial_started_at < self.config.open_seconds:
+                self.short_circuited += 1
+                return False
+            self.trial_started_at = now
+        return True
+
+    def record(self, success: bool, latency: float = 0.0) -> None:
+        """呼び出し結果を記録して状態を更新"""
+        slow = latency >= self.config.slow_call_seconds
+        if self.state == HALF_OPEN:
+            if success and not slow:
+                self._close()
+            else:
+                self._open("試行リクエスト失敗" if not success else f"試行リクエストが遅延 ({latency:.1f}秒)")
+            return
+
+        self.calls.append((not success, slow))
+        if self.state != CLOSED or len(self.calls) < self.config.min_calls:
+            return
+        error_rate = sum(failed for failed, _ in self.calls) / len(self.calls)
+        slow_rate = sum(is_slow for _, is_slow in self.calls) / len(self.calls)
+        if error_rate >= self.config.error_rate:
+            self._open(f"エラー率 {error_rate:.0%}")
+        elif slow_rate >= self.config.slow_rate:
+            self._open(f"遅延率 {slow_rate:.0%}")
+
+    def _open(self, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.trial_started_at = None
+        self.opened_count += 1
+        self.last_reason = reason
+        print(f"🚫 サーキット遮断 ({self.service_name}): {reason}、{self.config.open_seconds:.0f}秒間呼び出しを停止")
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.trial_started_at = None
+        self.calls.clear()
+        print(f"✅ サーキット復帰 ({self.service_name})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        failures = sum(failed for failed, _ in self.calls)
+        slow = sum(is_slow for _, is_slow in self.calls)
+        return {
+            "state": self.state,
+            "retry_after": f"{self.retry_after():.1f}s" if self.state == OPEN else None,
+            "recent_calls": len(self.calls),
+            "error_rate": f"{failures / max(len(self.calls), 1):.1%}",
+            "slow_rate": f"{slow / max(len(self.calls), 1):.1%}",
+            "opened_count": self.opened_count,
+            "short_circuited": self.short_circuited,
+            "last_reason": self.last_reason
+        }
+
+class CircuitBreakerRegistry:
+    """サービス名ごとのブレーカーとフォールバック先を管理"""
+
+    def __init__(self, config: Optional[CircuitBreakerConfig] = None):
+        self.config = config or CircuitBreakerConfig()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.fallbacks: Dict[str, str] = {}  # AIタイプ -> 遮断時の代替AIタイプ
+        self.fallback_calls = 0
+
+    def configure(self, settings: Optional[Dict[str, Any]]) -> None:
+        """ai_models.yaml の special_configs.circuit_breaker を反映"""
+        settings = settings or {}
+        self.config = CircuitBreakerConfig.from_config(settings)
+        self.fallbacks = dict(settings.get("fallbacks") or {})
+        for breaker in self.breakers.values():
+            breaker.config = self.config
+            breaker.calls = deque(breaker.calls, maxlen=self.config.window)
+
+    def get(self, service_name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(service_name)
+        if breaker is None:
+            breaker = self.breakers[service_name] = CircuitBreaker(service_name, self.config)
+        return breaker
+
+    def get_fallback(self, ai_type: str) -> Optional[str]:
+        return self.fallbacks.get(ai_type)
+
+    def get_all_stats(self) -> Dict[str, Any]:
+        """全サービスのブレーカー状態"""
+        return {
+            "services": {name: breaker.get_stats() for name, breaker in self.breakers.items()},
+            "fallbacks": self.fallbacks,
+            "fallback_calls": self.fallback_calls
+        }
+
+
+# グローバルサーキットブレーカー
+_circuit_breakers: Optional[CircuitBreakerRegistry] = None
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """サーキットブレーカーを取得（シングルトン）"""
+    global _circuit_breakers
+    if _circuit_breakers is None:
+        _circuit_breakers = CircuitBreakerRegistry()
+    return _circuit_breakers
@@ -13,8 +13,13 @@ from ai_clients import (
 from notion_utils import NOTION_PAGE_MAP, log_to_notion, log_response, log_user_message, find_latest_section_id, append_summary_to_kb
 from utils import (
     safe_log, send_long_message, analyze_attachment_for_gemini,
-    get_full_response_and_summary, get_notion_context
+    get_full_response_and_summary, get_notion_context, tree_reduce_summaries
 )
+from bulkhead import bulkhead_pool
+
+# 一斉呼び出し（/minna /all /critical /logical）の同時実行枠での優先度（値が小さいほど優先）
+# チャンネルでの個別応答（TaskConfig.priority <= 1.0）を先に通す
+FANOUT_PRIORITY = 1.5
 
 # ----------------------------------------------------------------
 # コマンドから利用されるヘルパー関数群
@@ -146,31 +151,42 @@ class CommandCog(commands.Cog):
                 await interaction.edit_original_response(content="❌ Notionページからテキストを取得できませんでした。")
                 return
             
-            # チャンク処理：GPT5miniで各チャンクを要約
+            # チャンク処理：GPT5miniで各チャンクを要約し、ツリー状に統合（最上位の統合のみO1-Pro）
             await interaction.edit_original_response(content="⚙️ GPT-5miniでチャンク処理中...")
-            chunk_summaries = []
+            from ai_manager import get_ai_manager
+            ai_manager = get_ai_manager()
+            if not ai_manager.initialized:
+                ai_manager.initialize(self.bot)
+
             chunk_size = 4000
-            for i in range(0, len(full_text), chunk_size):
-                chunk = full_text[i:i+chunk_size]
+            chunks = [full_text[i:i+chunk_size] for i in range(0, len(full_text), chunk_size)]
+
+            async def extract_chunk(chunk):
                 chunk_prompt = f"以下のテキストから「{query}」に関連する情報を抽出し要約してください。関連情報がない場合は「関連情報なし」と回答。\n\n{chunk}"
-                from ai_manager import get_ai_manager
-                ai_manager = get_ai_manager()
-                if not ai_manager.initialized:
-                    ai_manager.initialize(self.bot)
-                summary = await ai_manager.ask_ai("gpt5mini", chunk_prompt)
-                if "関連情報なし" not in summary:
-                    chunk_summaries.append(summary)
-            
-            if not chunk_summaries:
+                summary = await ai_manager.ask_ai("gpt5mini", chunk_prompt, pool="summary")
+                return None if "関連情報なし" in summary else summary
+
+            def build_integration_prompt(summaries):
+                integration_material = "\n\n---\n\n".join(summaries)
+                return f"以下の複数の情報を統合し、「{query}」に対する一貫した回答を作成してください。\n\n{integration_material}"
+
+            async def merge_partial(summaries):
+                return await ai_manager.ask_ai("gpt5mini", build_integration_prompt(summaries), pool="summary")
+
+            async def merge_final(summaries):
+                await interaction.edit_original_response(content="🧠 O1-Proで情報を統合中...")
+                return await ask_o1_pro(self.bot.o1_api_key, build_integration_prompt(summaries))
+
+            integrated_answer = await tree_reduce_summaries(
+                chunks, extract_chunk, merge_partial,
+                map_summarizer="gpt5mini", merge_summarizer="gpt5mini",
+                root_merge_func=merge_final, root_summarizer="o1_pro"
+            )
+
+            if not integrated_answer:
                 await interaction.edit_original_response(content="❌ 質問に関連する情報が見つかりませんでした。")
                 return
             
-            # O1-Proで統合
-            await interaction.edit_original_response(content="🧠 O1-Proで情報を統合中...")
-            integration_material = "\n\n---\n\n".join(chunk_summaries)
-            integration_prompt = f"以下の複数の情報を統合し、「{query}」に対する一貫した回答を作成してください。\n\n{integration_material}"
-            integrated_answer = await ask_o1_pro(self.bot.o1_api_key, integration_prompt)
-            
             # Gemini 2.5 Proで最終回答
             await interaction.edit_original_response(content="✨ Gemini 2.5 Proで最終回答を生成中...")
             final_prompt = f"【統合済み情報】\n{integrated_answer}\n\n【ユーザーの質問】\n{query}\n\n上記の統合情報を基に、質問に対する最終的で完全な回答を提供してください。"
@@ -197,7 +213,8 @@ class CommandCog(commands.Cog):
 
         await interaction.followup.send("🔬 6体のベースAIが意見を生成中…")
         tasks = {name: func(user_id, prompt, history=[]) for name, func in self.BASE_MODELS_FOR_ALL.items()}
-        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        with bulkhead_pool("interactive", priority=FANOUT_PRIORITY):
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         all_responses = ""
         for (name, result) in zip(tasks.keys(), results):
             display_text = f"エラー: {result}" if isinstance(result, Exception) else result
@@ -236,7 +253,8 @@ class CommandCog(commands.Cog):
         for name, func in adv_models_to_run.items():
             tasks[name] = func(final_query)
 
-        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        with bulkhead_pool("interactive", priority=FANOUT_PRIORITY):
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
 
         first_name = list(tasks.keys())[0]
         first_result = results[0]
@@ -298,11 +316,12 @@ class CommandCog(commands.Cog):
                         ai_manager.initialize(self.bot)
 
                     summary_prompt = f"以下の5体AIリレー結果を150字以内で要約してください。\n\n{all_chain_results}"
-                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt)
+                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt, pool="background")
 
                     new_section_id = await find_latest_section_id(page_ids[1])
-                    await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
-                    safe_log("📝 /chain KB要約保存完了: ", new_section_id)
+                    new_section_id = await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
+                    if new_section_id:
+                        safe_log("📝 /chain KB要約保存完了: ", new_section_id)
                 except Exception as e:
                     safe_log("🚨 /chain KB要約エラー: ", e)
 
@@ -330,7 +349,8 @@ class CommandCog(commands.Cog):
                 if name == "Perplexity": tasks[name] = wrapper(func, topic, notion_context=context)
                 else: tasks[name] = wrapper(func, prompt_with_context)
 
-            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            with bulkhead_pool("interactive", priority=FANOUT_PRIORITY):
+                results = await asyncio.gather(*tasks.values(), return_exceptions=True)
 
             synthesis_material = "以下のAI群の意見を統合してください。\n\n"
             full_text_results = ""
@@ -374,11 +394,12 @@ class CommandCog(commands.Cog):
             if len(page_ids) >= 2:
                 try:
                     summary_prompt = f"以下のAI議論統合レポートを150字以内で要約してください。\n\n{final_report}"
-                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt)
+                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt, pool="background")
 
                     new_section_id = await find_latest_section_id(page_ids[1])
-                    await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
-                    safe_log("📝 /critical KB要約保存完了: ", new_section_id)
+                    new_section_id = await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
+                    if new_section_id:
+                        safe_log("📝 /critical KB要約保存完了: ", new_section_id)
                 except Exception as e:
                     safe_log("🚨 /critical KB要約エラー: ", e)
 
@@ -422,7 +443,8 @@ class CommandCog(commands.Cog):
                     self.ADVANCED_MODELS_FOR_ALL["Perplexity"][0], topic, notion_context=context
                 )
             }
-            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            with bulkhead_pool("interactive", priority=FANOUT_PRIORITY):
+                results = await asyncio.gather(*tasks.values(), return_exceptions=True)
 
             synthesis_material = "以下の情報を統合し、最終的な結論を導き出してください。\n\n"
             results_text = ""
@@ -471,11 +493,12 @@ class CommandCog(commands.Cog):
             if len(page_ids) >= 2:
                 try:
                     summary_prompt = f"以下のAI討論統合レポートを150字以内で要約してください。\n\n{final_report}"
-                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt)
+                    kb_summary = await ai_manager.ask_ai("gpt5mini", summary_prompt, pool="background")
 
                     new_section_id = await find_latest_section_id(page_ids[1])
-                    await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
-                    safe_log("📝 /logical KB要約保存完了: ", new_section_id)
+                    new_section_id = await append_summary_to_kb(page_ids[1], new_section_id, kb_summary)
+                    if new_section_id:
+                        safe_log("📝 /logical KB要約保存完了: ", new_section_id)
                 except Exception as e:
                     safe_log("🚨 /logical KB要約エラー: ", e)
 
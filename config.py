@@ -86,6 +86,62 @@ class BotConfig:
             default="",
             is_secret=False
         ),
+        "NOTION_BACKEND": ConfigItem(
+            "NOTION_BACKEND",
+            "Notion client backend (async / sync)",
+            required=False,
+            default="async",
+            is_secret=False
+        ),
+        "NOTION_STORE_PATH": ConfigItem(
+            "NOTION_STORE_PATH",
+            "SQLite path for the persistent Notion block store (empty = disabled)",
+            required=False,
+            default="",
+            is_secret=False
+        ),
+        "NOTION_WRITE_BEHIND": ConfigItem(
+            "NOTION_WRITE_BEHIND",
+            "Batch Notion log appends in a write-behind queue (true / false)",
+            required=False,
+            default="true",
+            is_secret=False
+        ),
+        "NOTION_FLUSH_INTERVAL": ConfigItem(
+            "NOTION_FLUSH_INTERVAL",
+            "Write-behind flush interval in seconds",
+            required=False,
+            default="2.0",
+            is_secret=False
+        ),
+        "NOTION_MAX_CONCURRENCY": ConfigItem(
+            "NOTION_MAX_CONCURRENCY",
+            "Max concurrent Notion API requests (async backend)",
+            required=False,
+            default="5",
+            is_secret=False
+        ),
+        "MODEL_CAPABILITIES_PATH": ConfigItem(
+            "MODEL_CAPABILITIES_PATH",
+            "JSON path where learned OpenAI model parameter support is saved (empty = not saved)",
+            required=False,
+            default="model_capabilities.json",
+            is_secret=False
+        ),
+        "HTTP_TIMEOUT": ConfigItem(
+            "HTTP_TIMEOUT",
+            "Total deadline in seconds for Claude / Grok / Perplexity API requests",
+            required=False,
+            default="60",
+            is_secret=False
+        ),
+        "HTTP_MAX_PER_HOST": ConfigItem(
+            "HTTP_MAX_PER_HOST",
+            "Max concurrent connections per API host in the shared HTTP session pool",
+            required=False,
+            default="10",
+            is_secret=False
+        ),
     }
 
     def __init__(self):
@@ -137,6 +193,30 @@ class BotConfig:
             except ValueError:
                 self.warnings.append("GUILD_IDが数値ではありません")
 
+        # Notionバックエンドの検証
+        if self.config.get("NOTION_BACKEND") not in ("async", "sync"):
+            self.warnings.append("NOTION_BACKENDは async または sync を指定してください")
+
+        try:
+            int(self.config.get("NOTION_MAX_CONCURRENCY") or "5")
+        except ValueError:
+            self.warnings.append("NOTION_MAX_CONCURRENCYが数値ではありません")
+
+        try:
+            float(self.config.get("NOTION_FLUSH_INTERVAL") or "2.0")
+        except ValueError:
+            self.warnings.append("NOTION_FLUSH_INTERVALが数値ではありません")
+
+        try:
+            float(self.config.get("HTTP_TIMEOUT") or "60")
+        except ValueError:
+            self.warnings.append("HTTP_TIMEOUTが数値ではありません")
+
+        try:
+            int(self.config.get("HTTP_MAX_PER_HOST") or "10")
+        except ValueError:
+            self.warnings.append("HTTP_MAX_PER_HOSTが数値ではありません")
+
 
 
     def _print_validation_errors(self):
@@ -25,7 +25,9 @@ class CacheConfig:
     context_ttl: int = 180
     ai_response_ttl: int = 900
     generic_ttl: int = 300
+    summary_ttl: int = 600
     max_entries: int = 500
+    summary_max_entries: int = 100
     cleanup_interval: int = 60
 
 @dataclass
@@ -41,6 +43,17 @@ class AIEngineConfig:
         if self.council_ai_types is None:
             self.council_ai_types = ["gpt5", "perplexity", "gemini"]
 
+@dataclass
+class SummarizerConfig:
+    """階層要約（ツリー型map-reduce）設定"""
+    fan_in: int = 2  # 1回の統合でまとめる要約数
+    default_concurrency: int = 3  # 要約AIごとの同時実行数
+    concurrency: Dict[str, int] = None
+
+    def __post_init__(self):
+        if self.concurrency is None:
+            self.concurrency = {}
+
 class ConfigManager:
     """設定管理クラス"""
 
@@ -50,6 +63,7 @@ class ConfigManager:
         self._channel_mappings: Optional[List[ChannelMapping]] = None
         self._cache_config: Optional[CacheConfig] = None
         self._ai_engine_config: Optional[AIEngineConfig] = None
+        self._summarizer_config: Optional[SummarizerConfig] = None
 
         # 設定ファイル監視用
         self._last_modified = 0
@@ -143,7 +157,9 @@ class ConfigManager:
             context_ttl=ttl_data.get("context", 180),
             ai_response_ttl=ttl_data.get("ai_response", 900),
             generic_ttl=ttl_data.get("generic", 300),
+            summary_ttl=ttl_data.get("summary", 600),
             max_entries=cache_data.get("max_entries", 500),
+            summary_max_entries=cache_data.get("summary_max_entries", 100),
             cleanup_interval=cache_data.get("cleanup_interval", 60)
         )
 
@@ -173,6 +189,31 @@ class ConfigManager:
         self._ai_engine_config = ai_engine_config
         return ai_engine_config
 
+    def get_summarizer_config(self) -> SummarizerConfig:
+        """階層要約設定を取得"""
+        if self._summarizer_config:
+            return self._summarizer_config
+
+        config = self._load_config()
+        summarizer_data = config.get("summarizer", {})
+
+        summarizer_config = SummarizerConfig(
+            fan_in=max(2, summarizer_data.get("fan_in", 2)),
+            default_concurrency=summarizer_data.get("default_concurrency", 3),
+            concurrency=summarizer_data.get("concurrency", {})
+        )
+
+        self._summarizer_config = summarizer_config
+        return summarizer_config
+
+    def get_text_rewriter_rules(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        要約前の置換規則を取得
+        キャッシュせず毎回 _load_config を通すため、config.yaml の更新が即時に反映される
+        """
+        config = self._load_config()
+        return config.get("text_rewriter", {}).get("rule_sets")
+
     def get_channel_mapping_tuples(self) -> List[Tuple[Tuple[str, ...], str]]:
         """events.pyで使用する形式でチャンネルマッピングを取得"""
         mappings = self.get_channel_mappings()
@@ -184,6 +225,7 @@ class ConfigManager:
         self._channel_mappings = None
         self._cache_config = None
         self._ai_engine_config = None
+        self._summarizer_config = None
         self._last_modified = 0
         safe_log("🔄 設定をリロードしました", "")
 
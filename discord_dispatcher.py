@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Discord送信ディスパッチャー
+送信先（チャンネル・インタラクションのフォローアップ）ごとのキューで順序を保ちながら送信し、
+連続する短いメッセージは2000文字以内で1通にまとめる
+Discordのルート単位の送信制限（5通/5秒）と全体の制限を事前に守り、429による長い待ちを避ける
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from message_splitter import DISCORD_MESSAGE_LIMIT
+
+ROUTE_RATE = 5  # ルートあたりの送信数
+ROUTE_PERIOD = 5.0  # 秒
+GLOBAL_RATE = 50  # Bot全体の送信数
+GLOBAL_PERIOD = 1.0  # 秒
+MERGE_SEPARATOR = "\n\n"
+
+@dataclass
+class OutboundMessage:
+    """キューに積まれた送信メッセージ"""
+    content: str
+    send_func: Callable[..., Awaitable[Any]]  # send_func(content, **kwargs) で送信
+    kwargs: Dict[str, Any] = field(default_factory=dict)  # file 等
+    mergeable: bool = True  # 前後の短いメッセージとまとめてよいか
+    future: Optional[asyncio.Future] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class SlidingWindowLimiter:
+    """直近 period 秒の送信数を rate 以下に保つ"""
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self.sent_at: Deque[float] = deque()
+
+    def wait_time(self, now: float) -> float:
+        while self.sent_at and now - self.sent_at[0] >= self.period:
+            self.sent_at.popleft()
+        if len(self.sent_at) < self.rate:
+            return 0.0
+        return self.period - (now - self.sent_at[0])
+
+    def record(self, now: float) -> None:
+        self.sent_at.append(now)
+
+class OutboundDispatcher:
+    """送信先ごとのキューを1本のワーカーで順に送る"""
+
+    def __init__(self, limit: int = DISCORD_MESSAGE_LIMIT, route_rate: int = ROUTE_RATE,
+                 route_period: float = ROUTE_PERIOD, global_rate: int = GLOBAL_RATE,
+                 global_period: float = GLOBAL_PERIOD):
+        self.limit = limit
+        self.route_rate = route_rate
+        self.route_period = route_period
+        self.queues: Dict[str, Deque[OutboundMessage]] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        self.route_limiters: Dict[str, SlidingWindowLimiter] = {}
+        self.global_limiter = SlidingWindowLimiter(global_rate, global_period)
+
+        # 統計
+        self.enqueued = 0
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.total_throttle_wait = 0.0
+
+    def enqueue(self, route: str, content: str, send_func: Callable[..., Awaitable[Any]],
+                mergeable: bool = True, **kwargs) -> asyncio.Future:
+        """
+        メッセージをキューに積む（待機しない）
+        Returns: 送信結果（Discordメッセージ）を受け取る Future。待たなくてもよい
+        """
+        message = OutboundMessage(
+            content=content,
+            send_func=send_func,
+            kwargs=kwargs,
+            mergeable=mergeable and not kwargs,
+            future=asyncio.get_running_loop().create_future()
+        )
+        queue = self.queues.setdefault(route, deque())
+        queue.append(message)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(queue))
+
+        worker = self.workers.get(route)
+        if worker is None or worker.done():
+            self.workers[route] = asyncio.create_task(self._drain(route))
+        return message.future
+
+    async def send(self, route: str, content: str, send_func: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        """
+        キュー経由で送信し、送信結果を待つ（他のメッセージとまとめない）
+        編集する予定のメッセージなど、送信結果そのものが必要な場合に使う
+        """
+        return await self.enqueue(route, content, send_func, mergeable=False, **kwargs)
+
+    def _take_batch(self, queue: Deque[OutboundMessage]) -> list:
+        """先頭から、まとめて送れる連続メッセージを取り出す"""
+        batch = [queue.popleft()]
+        if not batch[0].mergeable:
+            return batch
+        length = len(batch[0].content)
+        while queue and queue[0].mergeable:
+            added = len(MERGE_SEPARATOR) + len(queue[0].content)
+            if length + added > self.limit:
+                break
+            batch.append(queue.popleft())
+            length += added
+        return batch
+
+    async def _wait_for_slot(self, route: str) -> None:
+        """ルート単位と全体の送信制限に空きができるまで待つ"""
+        limiter = self.route_limiters.setdefault(route, SlidingWindowLimiter(self.route_rate, self.route_period))
+        while True:
+            now = time.monotonic()
+            wait = max(limiter.wait_time(now), self.global_limiter.wait_time(now))
+            if wait <= 0:
+                limiter.record(now)
+                self.global_limiter.record(now)
+                return
+            self.total_throttle_wait += wait
+            await asyncio.sleep(wait)
+
+    async def _drain(self, route: str) -> None:
+        """ルートのキューが空になるまで送信（空になったらワーカーは終了）"""
+        queue = self.queues[route]
+        while queue:
+            batch = self._take_batch(queue)
+            first = batch[0]
+            content = MERGE_SEPARATOR.join(message.content for message in batch)
+
+            await self._wait_for_slot(route)
+            try:
+                result = await first.send_func(content, **first.kwargs)
+                error = None
+            except Exception as e:
+                result, error = None, e
+                self.failed += 1
+                print(f"⚠️ Discord送信に失敗({route}): {e}")
+
+            now = time.monotonic()
+            self.sent += 1
+            self.merged += len(batch) - 1
+            for message in batch:
+                self.total_latency += now - message.enqueued_at
+                if message.future.done():
+                    continue
+                if error is not None and not message.mergeable:
+                    # 結果を待っている呼び出し元には例外を返す
+                    message.future.set_exception(error)
+                else:
+                    message.future.set_result(result)
+
+        self.queues.pop(route, None)
+        self.workers.pop(route, None)
+
+    async def flush(self, route: Optional[str] = None) -> None:
+        """キューが空になるまで待つ（route指定時はそのルートのみ）"""
+        routes = [route] if route else list(self.workers)
+        workers = [self.workers[r] for r in routes if r in self.workers]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        delivered = self.enqueued - sum(len(queue) for queue in self.queues.values())
+        return {
+            "queue_depth": {route: len(queue) for route, queue in self.queues.items() if queue},
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "merged": self.merged,
+            "failed": self.failed,
+            "avg_send_latency": f"{self.total_latency / max(delivered, 1):.2f}s",
+            "throttle_wait_total": f"{self.total_throttle_wait:.2f}s"
+        }
+
+
+# グローバル送信ディスパッチャー
+_outbound_dispatcher: Optional[OutboundDispatcher] = None
+
+def get_outbound_dispatcher() -> OutboundDispatcher:
+    """送信ディスパッチャーを取得（シングルトン）"""
+    global _outbound_dispatcher
+    if _outbound_dispatcher is None:
+        _outbound_dispatcher = OutboundDispatcher()
+    return _outbound_dispatcher
@@ -14,6 +14,7 @@ from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, field
 from collections import OrderedDict
 from utils import safe_log
+from notion_cache import get_notion_cache
 
 @dataclass
 class EnhancedCacheEntry:
@@ -90,6 +91,9 @@ class EnhancedCacheManager:
             "generic": 300
         }
         self.max_entries = max_entries
+
+        # Notionは共有キャッシュ（notion_cache）に一本化（TTLは get_notion_cache() の生成時に外部設定から決まる）
+
         self.cache: OrderedDict[str, EnhancedCacheEntry] = OrderedDict()
         self.lock = threading.RLock()
 
@@ -239,12 +243,10 @@ class EnhancedCacheManager:
         fetch_func,
         **kwargs
     ) -> Any:
-        """Notion専用キャッシュ"""
-        return await self.get_cached(
-            "notion",
+        """Notion専用キャッシュ（共有Notionキャッシュに委譲）"""
+        return await get_notion_cache().get_cached_page_text(
             page_ids,
-            fetch_func,
-            **kwargs
+            lambda ids: fetch_func(ids, **kwargs)
         )
 
     async def get_context_cached(
@@ -291,6 +293,9 @@ class EnhancedCacheManager:
 
     def invalidate_cache(self, cache_type: Optional[str] = None) -> int:
         """キャッシュ無効化"""
+        if cache_type in (None, "notion"):
+            get_notion_cache().invalidate()
+
         with self.lock:
             if cache_type:
                 # 特定タイプのみ削除
@@ -342,7 +347,7 @@ class EnhancedCacheManager:
                 "by_type": stats.cache_types
             },
             "configuration": {
-                "ttl_settings": self.ttl_settings,
+                "ttl_settings": dict(self.ttl_settings, notion=get_notion_cache().ttl_seconds),
                 "cleanup_interval": f"{self.cleanup_interval}s"
             }
         }
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+外部AI API用の共有HTTPセッションプール
+ホストごとに aiohttp.ClientSession を1つ保持し、keep-alive・DNSキャッシュで接続を再利用する
+（OpenRouter / xAI / Perplexity を呼ぶたびのTCP+TLSハンドシェイクとexecutorスレッドを無くす）
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+HTTP_TOTAL_TIMEOUT = 60.0  # リクエスト全体の締め切り（秒）
+HTTP_CONNECT_TIMEOUT = 10.0  # 接続確立の締め切り（秒）
+HTTP_LIMIT_PER_HOST = 10  # ホストあたりの同時接続数
+HTTP_KEEPALIVE_TIMEOUT = 60.0  # アイドル接続を保持する秒数
+HTTP_DNS_CACHE_TTL = 300  # DNSキャッシュの秒数
+
+class HTTPSessionPool:
+    """ホストごとの共有セッションを管理"""
+
+    def __init__(self, total_timeout: float = HTTP_TOTAL_TIMEOUT,
+                 limit_per_host: int = HTTP_LIMIT_PER_HOST,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL):
+        self.total_timeout = total_timeout
+        self.limit_per_host = limit_per_host
+        self.connect_timeout = connect_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+
+        # 統計
+        self.sessions_created = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+
+    def _get_session(self, host: str) -> aiohttp.ClientSession:
+        """ホストのセッションを取得（なければ作成）"""
+        session = self.sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+            )
+            self.sessions[host] = session
+            self.sessions_created += 1
+        return session
+
+    async def post_json(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                        timeout: Optional[float] = None) -> Any:
+        """
+        JSONをPOSTしてレスポンスのJSONを返す
+        4xx/5xx は aiohttp.ClientResponseError、締め切り超過は asyncio.TimeoutError を送出する
+        """
+        session = self._get_session(urlsplit(url).netloc)
+        # 常に締め切りを明示する（timeout=None を渡すと aiohttp はセッションの既定値ではなく無期限として扱う）
+        request_timeout = aiohttp.ClientTimeout(total=timeout or self.total_timeout, connect=self.connect_timeout)
+
+        self.requests += 1
+        start_time = time.monotonic()
+        try:
+            async with session.post(url, json=payload, headers=headers, timeout=request_timeout) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            self.errors += 1
+            self.timeouts += 1
+            raise asyncio.TimeoutError(f"{timeout or self.total_timeout}秒以内に応答がありませんでした")
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.total_time += time.monotonic() - start_time
+
+    async def close(self) -> None:
+        """全セッションを閉じる（シャットダウン時）"""
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        if sessions:
+            print(f"🔌 HTTPセッションプールをクローズしました（{len(sessions)}ホスト）")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            "hosts": sorted(host for host, session in self.sessions.items() if not session.closed),
+            "sessions_created": self.sessions_created,
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_request_time": f"{self.total_time / max(self.requests, 1):.2f}s"
+        }
+
+
+# グローバルHTTPセッションプール
+_http_pool: Optional[HTTPSessionPool] = None
+
+def init_http_pool(total_timeout: float = HTTP_TOTAL_TIMEOUT, limit_per_host: int = HTTP_LIMIT_PER_HOST) -> HTTPSessionPool:
+    """HTTPセッションプールを初期化（起動時に bot.py から呼び出す）"""
+    global _http_pool
+    _http_pool = HTTPSessionPool(total_timeout=total_timeout, limit_per_host=limit_per_host)
+    return _http_pool
+
+def get_http_pool() -> HTTPSessionPool:
+    """HTTPセッションプールを取得（シングルトン）"""
+    global _http_pool
+    if _http_pool is None:
+        _http_pool = HTTPSessionPool()
+    return _http_pool
+
+async def close_http_pool() -> None:
+    """HTTPセッションプールを閉じる"""
+    global _http_pool
+    if _http_pool is not None:
+        await _http_pool.close()
+    _http_pool = None
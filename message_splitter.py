@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Discordメッセージ分割
+2000文字制限を超える応答を、段落→行→文→文字の順に境界を選んで複数メッセージに分ける
+コードブロックの途中で切れる場合は閉じ/開きのフェンスを補い、各メッセージ単体でも表示が崩れないようにする
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+DISCORD_MESSAGE_LIMIT = 2000
+
+# 送信モード
+LONG_MESSAGE_MODES = ("split", "file", "summarize")
+DEFAULT_LONG_MESSAGE_MODE = "split"
+MAX_SPLIT_MESSAGES = 10  # これを超える分割は添付ファイルで送る
+FILE_PREVIEW_CHARS = 1500  # 添付ファイル送信時に本文へ載せる冒頭の文字数
+
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+# 句点・感嘆符・疑問符の直後、英文は終止符+空白の位置で区切る（連結すると元の行に戻る）
+SENTENCE_BOUNDARY = re.compile(r"(?<=[。！？!?])|(?<=\.)(?=\s)")
+
+def _split_long_line(line: str, budget: int) -> List[str]:
+    """予算を超える行を文単位（それでも長ければ文字数）で分割"""
+    if len(line) <= budget:
+        return [line]
+
+    parts = []
+    current = ""
+    for sentence in SENTENCE_BOUNDARY.split(line):
+        while len(sentence) > budget:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(sentence[:budget])
+            sentence = sentence[budget:]
+        if len(current) + len(sentence) > budget:
+            parts.append(current)
+            current = sentence
+        else:
+            current += sentence
+    if current:
+        parts.append(current)
+    return parts
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> List[str]:
+    """
+    テキストを limit 文字以内のメッセージに分割
+    段落（空行）の区切りを優先し、コードブロックをまたぐ場合はフェンスを閉じて次のメッセージで開き直す
+    """
+    if len(text) <= limit:
+        return [text]
+
+    # フェンスの開き直し（最長の開始行 + 閉じ）の分を空けておく
+    fence_lines = [line.strip() for line in text.split("\n") if FENCE_PATTERN.match(line)]
+    reserve = max((len(line) for line in fence_lines), default=0) + 5 if fence_lines else 0
+    budget = max(1, limit - reserve)
+
+    # (テキスト, 直前の部品と同じ行か, この部品の後のフェンス状態)
+    atoms: List[Tuple[str, bool, Optional[str]]] = []
+    fence: Optional[str] = None
+    for line in text.split("\n"):
+        for i, part in enumerate(_split_long_line(line, budget)):
+            if i == 0 and FENCE_PATTERN.match(part):
+                fence = None if fence else part.strip()
+            atoms.append((part, i > 0, fence))
+
+    chunks = []
+    start = 0
+    while start < len(atoms):
+        opening = atoms[start - 1][2] if start > 0 else None
+
+        # 予算いっぱいまで部品を詰める（filled[k] は atoms[start + k] までの文字数）
+        length = len(opening) + 1 if opening else 0
+        filled = []
+        end = start
+        while end < len(atoms):
+            added = len(atoms[end][0]) + (0 if end == start or atoms[end][1] else 1)
+            if end > start and length + added > budget:
+                break
+            length += added
+            filled.append(length)
+            end += 1
+
+        if end < len(atoms):
+            # 後半に段落の区切り（空行・コードブロックの終わり）があればそこで切る
+            for candidate in range(end - 1, start, -1):
+                if filled[candidate - start] < length // 2:
+                    break
+                part, continues, fence_after = atoms[candidate]
+                if fence_after is None and not continues and (part == "" or FENCE_PATTERN.match(part)):
+                    end = candidate + 1
+                    break
+            # 行の途中で切れないよう、後半にある最後の行頭まで戻す
+            if atoms[end][1]:
+                for candidate in range(end - 1, start, -1):
+                    if filled[candidate - start - 1] < length // 2:
+                        break
+                    if not atoms[candidate][1]:
+                        end = candidate
+                        break
+
+        body = ""
+        for index in range(start, end):
+            part, continues, _ = atoms[index]
+            body += part if index == start or continues else "\n" + part
+        if opening:
+            body = f"{opening}\n{body}"
+        if atoms[end - 1][2] is not None and end < len(atoms):
+            body += "\n```" if atoms[end - 1][2].startswith("```") else "\n~~~"
+
+        if body.strip():
+            chunks.append(body.strip("\n"))
+        start = end
+
+    return chunks
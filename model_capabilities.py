@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAIモデルのパラメータ対応表
+モデルごとに受け付けるパラメータ（max_tokens / max_completion_tokens / なし、temperature の可否）を記録し、
+2回目以降は最初から正しいリクエストを送る（拒否→再送の往復を省く）
+config/ai_models.yaml の capabilities で初期値を与えられ、実際の拒否から学習した内容はファイルに保存する
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+TOKEN_PARAMS = ("max_tokens", "max_completion_tokens")
+
+@dataclass
+class ModelCapabilities:
+    """モデルが受け付けるパラメータ"""
+    token_param: Optional[str] = "max_tokens"  # "max_tokens" / "max_completion_tokens" / None（送らない）
+    supports_temperature: bool = True
+    source: str = "default"  # "default" / "config" / "learned"
+    updated_at: float = 0.0
+
+def _parse_token_param(value: Any) -> Optional[str]:
+    if value in TOKEN_PARAMS:
+        return value
+    if value in (None, False, "none", ""):
+        return None
+    raise ValueError(f"token_param は {TOKEN_PARAMS} または none を指定してください: {value}")
+
+class CapabilityRegistry:
+    """モデル名ごとのパラメータ対応を管理"""
+
+    def __init__(self, path: str = ""):
+        """
+        Args:
+            path: 学習結果を保存するJSONファイル（空文字なら保存しない）
+        """
+        self.path = path
+        self.capabilities: Dict[str, ModelCapabilities] = {}
+        self._lock = threading.Lock()
+
+        # 統計
+        self.first_try = 0
+        self.retries = 0
+        self.learned = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for model, entry in data.items():
+                self.capabilities[model] = ModelCapabilities(
+                    token_param=_parse_token_param(entry.get("token_param")),
+                    supports_temperature=bool(entry.get("supports_temperature", True)),
+                    source="learned",
+                    updated_at=float(entry.get("updated_at", 0.0))
+                )
+            print(f"✅ モデルのパラメータ対応表を読み込み: {len(data)}モデル")
+        except Exception as e:
+            print(f"⚠️ モデルのパラメータ対応表の読み込みに失敗: {e}")
+
+    def _save(self) -> None:
+        """学習した内容だけを保存（設定由来の値は設定ファイルが正）"""
+        if not self.path:
+            return
+        data = {
+            model: {
+                "token_param": caps.token_param,
+                "supports_temperature": caps.supports_temperature,
+                "updated_at": caps.updated_at
+            }
+            for model, caps in self.capabilities.items() if caps.source == "learned"
+        }
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ モデルのパラメータ対応表の保存に失敗: {e}")
+
+    def seed(self, model: str, capabilities: Optional[Dict[str, Any]]) -> None:
+        """設定ファイルの値で初期化（実際に学習済みのモデルは上書きしない）"""
+        if not capabilities:
+            return
+        current = self.capabilities.get(model)
+        if current is not None and current.source == "learned":
+            return
+        try:
+            self.capabilities[model] = ModelCapabilities(
+                token_param=_parse_token_param(capabilities.get("token_param", "max_tokens")),
+                supports_temperature=bool(capabilities.get("temperature", True)),
+                source="config",
+                updated_at=time.time()
+            )
+        except ValueError as e:
+            print(f"⚠️ capabilities の設定エラー ({model}): {e}")
+
+    def get(self, model: str) -> ModelCapabilities:
+        return self.capabilities.get(model) or ModelCapabilities()
+
+    def apply(self, model: str, params: Dict[str, Any], max_tokens: int) -> Dict[str, Any]:
+        """対応表に合わせてリクエストパラメータを作る（元の dict は変更しない）"""
+        caps = self.get(model)
+        request = {key: value for key, value in params.items() if key not in TOKEN_PARAMS}
+        if caps.token_param:
+            request[caps.token_param] = max_tokens
+        if not caps.supports_temperature:
+            request.pop("temperature", None)
+        return request
+
+    def learn(self, model: str, error: Exception, sent: Dict[str, Any]) -> bool:
+        """
+        パラメータ拒否のエラーから対応表を更新
+        Returns: 送ったパラメータが原因と判断できた（再送すべき）場合 True
+        """
+        message = str(error)
+        caps = self.get(model)
+        token_param = caps.token_param
+        supports_temperature = caps.supports_temperature
+        retry = False
+
+        # "max_tokens" は "max_completion_tokens" の部分文字列ではないので単純な包含で判定できる
+        sent_token = next((param for param in TOKEN_PARAMS if param in sent), None)
+        if sent_token and sent_token in message:
+            # 従来どおり、拒否されたトークン上限はパラメータごと送らない
+            token_param = None
+            retry = True
+        if "temperature" in sent and "temperature" in message:
+            supports_temperature = False
+            retry = True
+
+        if not retry:
+            return False
+
+        with self._lock:
+            self.retries += 1
+            if (token_param, supports_temperature) != (caps.token_param, caps.supports_temperature):
+                self.capabilities[model] = ModelCapabilities(
+                    token_param=token_param,
+                    supports_temperature=supports_temperature,
+                    source="learned",
+                    updated_at=time.time()
+                )
+                self.learned += 1
+                print(f"📝 パラメータ対応を学習 ({model}): token_param={token_param}, temperature={supports_temperature}")
+                self._save()
+        return True
+
+    def record_first_try(self) -> None:
+        self.first_try += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            "models": {model: asdict(caps) for model, caps in self.capabilities.items()},
+            "first_try_success": self.first_try,
+            "retries": self.retries,
+            "learned": self.learned
+        }
+
+
+# グローバル対応表
+_capability_registry: Optional[CapabilityRegistry] = None
+
+def init_capability_registry(path: str = "") -> CapabilityRegistry:
+    """対応表を初期化（起動時に bot.py から呼び出す）"""
+    global _capability_registry
+    _capability_registry = CapabilityRegistry(path)
+    return _capability_registry
+
+def get_capability_registry() -> CapabilityRegistry:
+    """対応表を取得（シングルトン）"""
+    global _capability_registry
+    if _capability_registry is None:
+        _capability_registry = CapabilityRegistry()
+    return _capability_registry
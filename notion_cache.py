@@ -1,16 +1,17 @@
 # -*- coding: utf-8 -*-
 """
 Notionキャッシュシステム
-Notionページの取得を最適化するキャッシュ機構
+Notionページの取得を最適化するキャッシュ機構（全呼び出し元で共有する単一レイヤー）
+同じページ集合への同時ミスは1つの取得タスクを共有する（シングルフライト）
 """
 
 import time
+import asyncio
 import threading
 import hashlib
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from collections import OrderedDict
-from utils import safe_log
 
 @dataclass
 class CacheEntry:
@@ -25,6 +26,7 @@ class CacheStats:
     """キャッシュ統計"""
     hit_count: int = 0
     miss_count: int = 0
+    coalesced_count: int = 0
     total_entries: int = 0
     memory_usage_mb: float = 0.0
     hit_rate: float = 0.0
@@ -44,9 +46,13 @@ class NotionCache:
         self.cache: OrderedDict[str, CacheEntry] = OrderedDict()
         self.lock = threading.RLock()
 
+        # 取得中のタスク（キャッシュキー -> Task）
+        self.in_flight: Dict[str, asyncio.Task] = {}
+
         # 統計
         self.hit_count = 0
         self.miss_count = 0
+        self.coalesced_count = 0
         self.total_response_time = 0.0
         self.cleanup_count = 0
 
@@ -87,7 +93,7 @@ class NotionCache:
             self.cleanup_count += 1
 
             if expired_keys:
-                safe_log(f"🧹 Notionキャッシュクリーンアップ: ", f"{len(expired_keys)}件削除")
+                print(f"🧹 Notionキャッシュクリーンアップ: {len(expired_keys)}件削除")
 
             return len(expired_keys)
 
@@ -97,7 +103,47 @@ class NotionCache:
             while len(self.cache) >= self.max_entries:
                 # OrderedDictの最初のエントリ（最も古い）を削除
                 oldest_key, _ = self.cache.popitem(last=False)
-                safe_log("💾 Notionキャッシュ容量制限: ", f"LRU削除 {oldest_key[:8]}...")
+                print(f"💾 Notionキャッシュ容量制限: LRU削除 {oldest_key[:8]}...")
+
+    def _get_fresh_entry(self, cache_key: str) -> Optional[CacheEntry]:
+        """有効なエントリを返す（期限切れは削除）"""
+        with self.lock:
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                del self.cache[cache_key]
+                return None
+
+            entry.hit_count += 1
+            entry.last_accessed = time.time()
+            # 最近使用したものを最後に移動（LRU更新）
+            self.cache.move_to_end(cache_key)
+            return entry
+
+    async def _fetch_and_store(self, cache_key: str, page_ids: List[str], fallback_func) -> str:
+        """フォールバック関数で取得し、成功時のみキャッシュに保存"""
+        start_time = time.time()
+        try:
+            data = await fallback_func(page_ids)
+
+            if data and not data.startswith("ERROR:"):
+                with self.lock:
+                    # 容量制限確認
+                    self._evict_lru()
+                    self.cache[cache_key] = CacheEntry(data=data, timestamp=time.time())
+
+                response_time = time.time() - start_time
+                self.total_response_time += response_time
+                print(f"💾 Notionキャッシュ保存: {cache_key[:8]}... ({len(data)}文字, {response_time:.3f}s)")
+
+            return data
+
+        except Exception as e:
+            print(f"🚨 Notionキャッシュ取得エラー: {e}")
+            return f"ERROR: キャッシュ取得失敗 - {str(e)[:100]}"
+        finally:
+            self.in_flight.pop(cache_key, None)
 
     async def get_cached_page_text(self, page_ids: List[str],
                                  fallback_func,
@@ -107,81 +153,52 @@ class NotionCache:
 
         Args:
             page_ids: ページIDのリスト
-            fallback_func: キャッシュミス時の取得関数
+            fallback_func: キャッシュミス時の取得関数（page_ids を受け取るコルーチン関数）
             extra_params: 追加のキャッシュキーパラメータ
 
         Returns:
             ページテキスト
         """
         cache_key = self._generate_cache_key(page_ids, extra_params)
-        start_time = time.time()
 
         # クリーンアップ実行
         self._cleanup_expired()
 
+        entry = self._get_fresh_entry(cache_key)
+        if entry is not None:
+            self.hit_count += 1
+            print(f"🎯 Notionキャッシュヒット: {cache_key[:8]}...")
+            return entry.data
+
+        task = self.in_flight.get(cache_key)
+        if task is not None:
+            # 同じページ集合を取得中 → 結果を共有
+            self.coalesced_count += 1
+            print(f"🔗 Notionキャッシュ合流: {cache_key[:8]}... 取得中のリクエストを待機")
+        else:
+            # キャッシュミス：取得タスクを1つだけ起動
+            self.miss_count += 1
+            print(f"❌ Notionキャッシュミス: {cache_key[:8]}... ページ取得中")
+            task = asyncio.ensure_future(self._fetch_and_store(cache_key, page_ids, fallback_func))
+            self.in_flight[cache_key] = task
+
+        # 呼び出し元がキャンセルされても共有タスクは止めない
+        return await asyncio.shield(task)
+
+    def invalidate(self) -> int:
+        """キャッシュを同期的にクリア（取得中のタスクはそのまま完了させる）"""
         with self.lock:
-            # キャッシュヒット確認
-            if cache_key in self.cache:
-                entry = self.cache[cache_key]
-
-                if not self._is_expired(entry):
-                    # キャッシュヒット
-                    entry.hit_count += 1
-                    entry.last_accessed = time.time()
-                    self.hit_count += 1
-
-                    # 最近使用したものを最後に移動（LRU更新）
-                    self.cache.move_to_end(cache_key)
-
-                    response_time = time.time() - start_time
-                    self.total_response_time += response_time
-
-                    safe_log(f"🎯 Notionキャッシュヒット: ",
-                            f"{cache_key[:8]}... ({response_time:.3f}s)")
-
-                    return entry.data
-                else:
-                    # 期限切れエントリを削除
-                    del self.cache[cache_key]
-
-        # キャッシュミス：実際にデータを取得
-        self.miss_count += 1
-        safe_log(f"❌ Notionキャッシュミス: ", f"{cache_key[:8]}... ページ取得中")
-
-        try:
-            # フォールバック関数でデータ取得
-            data = await fallback_func(page_ids)
-
-            if data and not data.startswith("ERROR:"):
-                # キャッシュに保存
-                with self.lock:
-                    # 容量制限確認
-                    self._evict_lru()
-
-                    # 新しいエントリを追加
-                    self.cache[cache_key] = CacheEntry(
-                        data=data,
-                        timestamp=time.time()
-                    )
-
-                response_time = time.time() - start_time
-                self.total_response_time += response_time
-
-                safe_log(f"💾 Notionキャッシュ保存: ",
-                        f"{cache_key[:8]}... ({len(data)}文字, {response_time:.3f}s)")
-
-            return data
-
-        except Exception as e:
-            safe_log(f"🚨 Notionキャッシュ取得エラー: ", e)
-            return f"ERROR: キャッシュ取得失敗 - {str(e)[:100]}"
+            cleared_count = len(self.cache)
+            self.cache.clear()
+            return cleared_count
 
     def get_cache_stats(self) -> CacheStats:
         """キャッシュ統計を取得"""
         with self.lock:
-            total_requests = self.hit_count + self.miss_count
-            hit_rate = (self.hit_count / total_requests) if total_requests > 0 else 0.0
-            avg_response_time = (self.total_response_time / total_requests) if total_requests > 0 else 0.0
+            total_requests = self.hit_count + self.miss_count + self.coalesced_count
+            # 合流したリクエストもAPI呼び出しを節約しているためヒット扱い
+            hit_rate = ((self.hit_count + self.coalesced_count) / total_requests) if total_requests > 0 else 0.0
+            avg_response_time = (self.total_response_time / self.miss_count) if self.miss_count > 0 else 0.0
 
             # メモリ使用量推定（文字数ベース）
             memory_usage = sum(len(entry.data) for entry in self.cache.values())
@@ -190,6 +207,7 @@ class NotionCache:
             return CacheStats(
                 hit_count=self.hit_count,
                 miss_count=self.miss_count,
+                coalesced_count=self.coalesced_count,
                 total_entries=len(self.cache),
                 memory_usage_mb=memory_usage_mb,
                 hit_rate=hit_rate,
@@ -198,11 +216,9 @@ class NotionCache:
 
     async def clear_cache(self) -> int:
         """キャッシュをクリア"""
-        with self.lock:
-            cleared_count = len(self.cache)
-            self.cache.clear()
-            safe_log(f"🗑️ Notionキャッシュクリア: ", f"{cleared_count}件削除")
-            return cleared_count
+        cleared_count = self.invalidate()
+        print(f"🗑️ Notionキャッシュクリア: {cleared_count}件削除")
+        return cleared_count
 
     def get_detailed_stats(self) -> Dict[str, Any]:
         """詳細統計を取得"""
@@ -220,10 +236,14 @@ class NotionCache:
 
         return {
             "summary": {
+                "hits": stats.hit_count,
+                "misses": stats.miss_count,
+                "coalesced": stats.coalesced_count,
+                "in_flight": len(self.in_flight),
                 "hit_rate": f"{stats.hit_rate:.1%}",
                 "total_entries": stats.total_entries,
                 "memory_usage_mb": round(stats.memory_usage_mb, 2),
-                "avg_response_time": f"{stats.avg_response_time:.3f}s",
+                "avg_fetch_time": f"{stats.avg_response_time:.3f}s",
                 "cleanup_count": self.cleanup_count
             },
             "config": {
@@ -240,21 +260,30 @@ class NotionCache:
             cache_key = self._generate_cache_key([page_id])
             self._evict_lru()
             self.cache[cache_key] = CacheEntry(data=data)
-            safe_log(f"🔄 Notionキャッシュ事前設定: ", f"{cache_key[:8]}...")
+            print(f"🔄 Notionキャッシュ事前設定: {cache_key[:8]}...")
 
 
 # グローバルキャッシュインスタンス
 _notion_cache: Optional[NotionCache] = None
 
-def get_notion_cache(ttl_seconds: int = 300) -> NotionCache:
-    """Notionキャッシュインスタンスを取得（シングルトン）"""
+def _configured_ttl() -> int:
+    """外部設定のNotionキャッシュTTL（読み込めない場合は300秒）"""
+    try:
+        from config_manager import get_config_manager
+        return get_config_manager().get_cache_config().notion_ttl
+    except Exception:
+        return 300
+
+def get_notion_cache(ttl_seconds: Optional[int] = None) -> NotionCache:
+    """Notionキャッシュインスタンスを取得（シングルトン、TTLは初回生成時に外部設定から決まる）"""
     global _notion_cache
     if _notion_cache is None:
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else _configured_ttl()
         _notion_cache = NotionCache(ttl_seconds=ttl_seconds)
-        safe_log("✅ Notionキャッシュ初期化完了", f"TTL: {ttl_seconds}秒")
+        print(f"✅ Notionキャッシュ初期化完了 TTL: {ttl_seconds}秒")
     return _notion_cache
 
 def clear_notion_cache():
     """キャッシュをリセット（テスト用）"""
     global _notion_cache
-    _notion_cache = None
\ No newline at end of file
+    _notion_cache = None
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Notionブロック検索インデックス
+同期済みブロックから転置インデックスを差分構築し、BM25で質問に関連するブロックを選ぶ
+日本語は文字bigram、英数字は単語をトークンとして扱う（形態素解析器は不要）
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+# 日本語（ひらがな・カタカナ・漢字）の連続と英数字の連続
+CJK_RUN_PATTERN = re.compile(r"[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF\u3005\u3006]+")
+WORD_PATTERN = re.compile(r"[a-z0-9_]+")
+
+# BM25パラメータ
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """日本語は文字bigram、英数字は単語に分割"""
+    normalized = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = WORD_PATTERN.findall(normalized)
+    for run in CJK_RUN_PATTERN.findall(normalized):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+@dataclass
+class SearchHit:
+    """検索結果のブロック"""
+    position: int
+    block_id: str
+    text: str
+    score: float
+
+@dataclass
+class PageIndex:
+    """ページ単位の転置インデックス"""
+    order: List[str] = field(default_factory=list)  # 文書順のブロックID
+    texts: Dict[str, str] = field(default_factory=dict)
+    term_freqs: Dict[str, Counter] = field(default_factory=dict)
+    postings: Dict[str, Dict[str, int]] = field(default_factory=dict)  # term -> {block_id: tf}
+    total_length: int = 0
+
+    def _remove(self, block_id: str) -> None:
+        for term in self.term_freqs.pop(block_id, Counter()):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(block_id, None)
+                if not docs:
+                    del self.postings[term]
+        self.total_length -= len(self.texts.pop(block_id, ""))
+
+    def _add(self, block_id: str, text: str) -> None:
+        term_freq = Counter(tokenize(text))
+        self.term_freqs[block_id] = term_freq
+        self.texts[block_id] = text
+        self.total_length += len(text)
+        for term, count in term_freq.items():
+            self.postings.setdefault(term, {})[block_id] = count
+
+    def update(self, blocks: List[tuple]) -> int:
+        """
+        ブロック一覧 (block_id, text, last_edited_time) と差分同期する
+        Returns: 再トークン化したブロック数
+        """
+        current = {block[0]: block[1] for block in blocks}
+        for block_id in [b for b in self.texts if b not in current]:
+            self._remove(block_id)
+
+        changed = 0
+        for block_id, text in current.items():
+            if self.texts.get(block_id) != text:
+                self._remove(block_id)
+                self._add(block_id, text)
+                changed += 1
+
+        self.order = [block[0] for block in blocks]
+        return changed
+
+    def search(self, query: str, top_k: int, max_chars: int) -> List[SearchHit]:
+        """BM25上位のブロックを文字数予算内で選び、文書順で返す"""
+        doc_count = len(self.texts)
+        if doc_count == 0:
+            return []
+        avg_length = self.total_length / doc_count
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for block_id, tf in docs.items():
+                length_norm = 1 - BM25_B + BM25_B * len(self.texts[block_id]) / max(avg_length, 1)
+                scores[block_id] = scores.get(block_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+
+        selected = []
+        used_chars = 0
+        for block_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if len(selected) >= top_k:
+                break
+            text = self.texts[block_id]
+            if used_chars + len(text) > max_chars:
+                continue
+            selected.append((block_id, score))
+            used_chars += len(text) + 1
+
+        positions = {block_id: position for position, block_id in enumerate(self.order)}
+        hits = [
+            SearchHit(position=positions.get(block_id, -1), block_id=block_id, text=self.texts[block_id], score=score)
+            for block_id, score in selected
+        ]
+        return sorted(hits, key=lambda hit: hit.position)
+
+class NotionSearchIndex:
+    """ページIDごとのインデックスを管理"""
+
+    def __init__(self):
+        self.pages: Dict[str, PageIndex] = {}
+        self.lock = threading.Lock()
+
+        # 統計
+        self.search_count = 0
+        self.empty_result_count = 0
+        self.reindexed_blocks = 0
+
+    def update_page(self, page_id: str, blocks: List[tuple]) -> int:
+        """ページのブロック一覧を反映（変更されたブロックだけ再トークン化）"""
+        with self.lock:
+            index = self.pages.setdefault(page_id, PageIndex())
+            changed = index.update(blocks)
+            self.reindexed_blocks += changed
+            return changed
+
+    def search(self, page_id: str, query: str, top_k: int = 8, max_chars: int = 4000) -> List[SearchHit]:
+        """質問に関連するブロックを検索"""
+        with self.lock:
+            index = self.pages.get(page_id)
+            hits = index.search(query, top_k, max_chars) if index else []
+            self.search_count += 1
+            if not hits:
+                self.empty_result_count += 1
+            return hits
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        with self.lock:
+            return {
+                "pages": {
+                    page_id: {"blocks": len(index.texts), "terms": len(index.postings)}
+                    for page_id, index in self.pages.items()
+                },
+                "searches": self.search_count,
+                "empty_results": self.empty_result_count,
+                "reindexed_blocks": self.reindexed_blocks
+            }
+
+
+# グローバル検索インデックス
+_notion_index: Optional[NotionSearchIndex] = None
+
+def get_notion_index() -> NotionSearchIndex:
+    """Notion検索インデックスを取得（シングルトン）"""
+    global _notion_index
+    if _notion_index is None:
+        _notion_index = NotionSearchIndex()
+    return _notion_index
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Notionブロックストア
+抽出済みブロックテキストをSQLite(WAL)に永続化し、再起動後も差分同期を継続する
+非同期の呼び出し元は *_async メソッドを使う（SQLiteの入出力を専用スレッドで行い、イベントループを止めない）
+"""
+
+import asyncio
+import dataclasses
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+@dataclass
+class StoredPage:
+    """永続化されたページの同期情報"""
+    page_id: str
+    last_block_id: Optional[str]
+    last_edited_time: Optional[str]
+    full_synced_at: float
+    blocks: List[tuple]  # (block_id, text, last_edited_time)
+
+@dataclass
+class RollingSummaryRecord:
+    """ページごとのローリング要約（どのブロックまで反映済みかを保持）"""
+    page_id: str
+    summary: str
+    covered_block_id: Optional[str]  # 反映済みの最後のブロック
+    covered_blocks: int  # 反映済みのブロック数（先頭から）
+    covered_digest: str  # 反映済みブロック本文のハッシュ（途中の編集を検出）
+    section_id: Optional[str] = None  # 対応するKBセクションID
+    updated_at: float = 0.0
+
+class NotionBlockStore:
+    """ページIDをキーにしたブロックテキストの永続ストア"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLiteファイルのパス
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # SQLite入出力用の専用スレッド（1本なので書き込み順が保たれる）
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # 統計
+        self.pages_loaded = 0
+        self.pages_saved = 0
+        self.blocks_written = 0
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """接続を遅延オープン（初回アクセス時にスキーマ作成）"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    page_id TEXT PRIMARY KEY,
+                    last_block_id TEXT,
+                    last_edited_time TEXT,
+                    full_synced_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blocks (
+                    page_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    block_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    last_edited_time TEXT,
+                    PRIMARY KEY (page_id, position)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rolling_summaries (
+                    page_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    covered_block_id TEXT,
+                    covered_blocks INTEGER NOT NULL,
+                    covered_digest TEXT NOT NULL,
+                    section_id TEXT,
+                    updated_at REAL
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+            print(f"✅ Notionブロックストア接続: {self.db_path}")
+        return self._conn
+
+    def open(self) -> None:
+        """ストアを開く（起動時に呼び出す。ページデータは読み込まない）"""
+        with self.lock:
+            self._get_connection()
+
+    def load_page(self, page_id: str) -> Optional[StoredPage]:
+        """ページの同期情報とブロックを読み込む"""
+        with self.lock:
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT last_block_id, last_edited_time, full_synced_at FROM pages WHERE page_id = ?",
+                (page_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            blocks = conn.execute(
+                "SELECT block_id, text, last_edited_time FROM blocks WHERE page_id = ? ORDER BY position",
+                (page_id,)
+            ).fetchall()
+
+        self.pages_loaded += 1
+        print(f"💾 Notionブロックストアから復元: ページ(ID: {page_id}) {len(blocks)}ブロック")
+        return StoredPage(
+            page_id=page_id,
+            last_block_id=row[0],
+            last_edited_time=row[1],
+            full_synced_at=row[2] or 0.0,
+            blocks=[tuple(b) for b in blocks]
+        )
+
+    def save_page(self, page_id: str, blocks: List[tuple], last_block_id: Optional[str],
+                  last_edited_time: Optional[str], full_synced_at: float,
+                  from_position: int = 0) -> None:
+        """
+        ページの同期情報を書き込む
+
+        Args:
+            blocks: (block_id, text, last_edited_time) のリスト（ページ全体）
+            from_position: この位置以降のブロックだけを書き直す（差分同期用）
+        """
+        with self.lock:
+            conn = self._get_connection()
+            changed = [
+                (page_id, position, block[0], block[1], block[2])
+                for position, block in enumerate(blocks)
+                if position >= from_position
+            ]
+            with conn:
+                conn.execute(
+                    "DELETE FROM blocks WHERE page_id = ? AND position >= ?",
+                    (page_id, from_position)
+                )
+                conn.executemany(
+                    "INSERT INTO blocks (page_id, position, block_id, text, last_edited_time) VALUES (?, ?, ?, ?, ?)",
+                    changed
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (page_id, last_block_id, last_edited_time, full_synced_at) VALUES (?, ?, ?, ?)",
+                    (page_id, last_block_id, last_edited_time, full_synced_at)
+                )
+
+        self.pages_saved += 1
+        self.blocks_written += len(changed)
+
+    def load_rolling_summary(self, page_id: str) -> Optional[RollingSummaryRecord]:
+        """ページのローリング要約を読み込む"""
+        with self.lock:
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT summary, covered_block_id, covered_blocks, covered_digest, section_id, updated_at "
+                "FROM rolling_summaries WHERE page_id = ?",
+                (page_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return RollingSummaryRecord(
+            page_id=page_id,
+            summary=row[0],
+            covered_block_id=row[1],
+            covered_blocks=row[2],
+            covered_digest=row[3],
+            section_id=row[4],
+            updated_at=row[5] or 0.0
+        )
+
+    def save_rolling_summary(self, record: RollingSummaryRecord) -> None:
+        """ページのローリング要約を書き込む"""
+        with self.lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rolling_summaries "
+                    "(page_id, summary, covered_block_id, covered_blocks, covered_digest, section_id, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (record.page_id, record.summary, record.covered_block_id, record.covered_blocks,
+                     record.covered_digest, record.section_id, record.updated_at)
+                )
+
+    def delete_page(self, page_id: str) -> None:
+        """ページの永続データを削除"""
+        with self.lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute("DELETE FROM blocks WHERE page_id = ?", (page_id,))
+                conn.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+                conn.execute("DELETE FROM rolling_summaries WHERE page_id = ?", (page_id,))
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- 非同期インターフェース（専用スレッドで実行） ---
+
+    async def _run(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-store")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def load_page_async(self, page_id: str) -> Optional[StoredPage]:
+        return await self._run(self.load_page, page_id)
+
+    async def save_page_async(self, page_id: str, blocks: List[tuple], last_block_id: Optional[str],
+                              last_edited_time: Optional[str], full_synced_at: float,
+                              from_position: int = 0) -> None:
+        # 書き込み中に呼び出し元がブロック一覧を更新しても影響しないようにコピーを渡す
+        await self._run(self.save_page, page_id, list(blocks), last_block_id, last_edited_time,
+                        full_synced_at, from_position=from_position)
+
+    async def load_rolling_summary_async(self, page_id: str) -> Optional[RollingSummaryRecord]:
+        return await self._run(self.load_rolling_summary, page_id)
+
+    async def save_rolling_summary_async(self, record: RollingSummaryRecord) -> None:
+        await self._run(self.save_rolling_summary, dataclasses.replace(record))
+
+    async def delete_page_async(self, page_id: str) -> None:
+        await self._run(self.delete_page, page_id)
+
+    async def close_async(self) -> None:
+        """実行待ちの書き込みを終えてから接続を閉じ、専用スレッドを止める"""
+        if self._executor is None:
+            self.close()
+            return
+        await self._run(self.close)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            "db_path": self.db_path,
+            "pages_loaded": self.pages_loaded,
+            "pages_saved": self.pages_saved,
+            "blocks_written": self.blocks_written
+        }
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+notion_utils のテスト用フェイク
+メモリ上のページを持つ Notion AsyncClient と、そのクライアントを差し込んだ notion_utils を用意する
+（notion_client / httpx / rate_limiter の依存先は sys.modules を一時的に差し替えて読み込む）
+"""
+
+import asyncio
+import sys
+import types
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from unittest import mock
+
+class FakeNotionError(Exception):
+    """APIResponseError 相当（status と headers を持つ）"""
+    def __init__(self, status: int, headers: Optional[dict] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = headers or {}
+
+class FakeNotion:
+    """blocks.children.list / append をメモリ上のブロックで再現するクライアント"""
+
+    def __init__(self, delay: float = 0.0):
+        self.children: Dict[str, List[dict]] = {}
+        self.delay = delay
+        self.list_calls: List[tuple] = []  # (block_id, start_cursor)
+        self.append_calls: List[tuple] = []  # (block_id, 追記ブロック数)
+        self.list_errors: List[Exception] = []  # 次の list で順に送出する例外
+        self.append_errors: List[Exception] = []  # 次の append で順に送出する例外
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._next_id = 0
+        self._clock = 0
+        self.blocks = types.SimpleNamespace(children=types.SimpleNamespace(list=self._list, append=self._append))
+
+    def _tick(self) -> str:
+        self._clock += 1
+        return f"2026-01-01T00:00:{self._clock:02d}.000Z"
+
+    def add_block(self, parent_id: str, text: str, children: Optional[List[str]] = None) -> str:
+        """段落ブロックを追加してIDを返す（children を指定すると子ブロック付き）"""
+        self._next_id += 1
+        block_id = f"block-{self._next_id:03d}"
+        self.children.setdefault(parent_id, []).append({
+            "object": "block", "id": block_id, "type": "paragraph",
+            "paragraph": {"rich_text": [{"plain_text": text}]},
+            "has_children": bool(children), "last_edited_time": self._tick()
+        })
+        for child_text in children or []:
+            self.add_block(block_id, child_text)
+        return block_id
+
+    def edit_block(self, parent_id: str, block_id: str, text: str) -> None:
+        for block in self.children[parent_id]:
+            if block["id"] == block_id:
+                block["paragraph"]["rich_text"] = [{"plain_text": text}]
+                block["last_edited_time"] = self._tick()
+
+    def texts(self, parent_id: str) -> List[str]:
+        return [block["paragraph"]["rich_text"][0]["plain_text"] for block in self.children.get(parent_id, [])]
+
+    async def _list(self, block_id: str, start_cursor: Optional[str] = None, page_size: int = 100) -> dict:
+        self.list_calls.append((block_id, start_cursor))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.list_errors:
+                raise self.list_errors.pop(0)
+            blocks = self.children.get(block_id, [])
+            start = 0
+            if start_cursor:
+                # Notion と同様、start_cursor に渡したブロック自身から返す
+                positions = [i for i, block in enumerate(blocks) if block["id"] == start_cursor]
+                if not positions:
+                    raise FakeNotionError(400)  # 削除済みブロックのカーソル
+                start = positions[0]
+            page = blocks[start:start + page_size]
+            has_more = start + page_size < len(blocks)
+            return {
+                "results": [dict(block) for block in page],
+                "has_more": has_more,
+                "next_cursor": blocks[start + page_size]["id"] if has_more else None
+            }
+        finally:
+            self.in_flight -= 1
+
+    async def _append(self, block_id: str, children: List[dict]) -> dict:
+        self.append_calls.append((block_id, len(children)))
+        if self.append_errors:
+            raise self.append_errors.pop(0)
+        for child in children:
+            self.add_block(block_id, child["paragraph"]["rich_text"][0]["text"]["content"])
+        return {"results": []}
+
+class FakeRateLimiter:
+    """rate_limiter.GlobalRateLimiter の Notion 用インターフェースだけを持つフェイク"""
+
+    def __init__(self):
+        self.deferred: List[float] = []
+        self.outcomes: List[tuple] = []  # (endpoint, outcome)
+
+    async def acquire_request_slot(self, service_name: str, priority: float = 1.0, max_wait_seconds: float = 0.0):
+        return types.SimpleNamespace(allowed=True, message="")
+
+    def defer_service(self, service_name: str, seconds: float) -> None:
+        self.deferred.append(seconds)
+
+    def record_endpoint_call(self, service_name: str, endpoint: str, latency: float, outcome: str) -> None:
+        self.outcomes.append((endpoint, outcome))
+
+def _fake_module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+@contextmanager
+def fake_notion_utils(client: FakeNotion, limiter: Optional[FakeRateLimiter] = None):
+    """FakeNotion を非同期バックエンドとして差し込んだ notion_utils を返す（終了時に元のモジュール構成に戻す）"""
+    limiter = limiter or FakeRateLimiter()
+    modules = {"rate_limiter": _fake_module("rate_limiter", get_rate_limiter=lambda: limiter)}
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        modules["httpx"] = _fake_module("httpx", AsyncClient=object,
+                                        TimeoutException=type("TimeoutException", (Exception,), {}))
+    try:
+        import notion_client  # noqa: F401
+    except ImportError:
+        modules["notion_client"] = _fake_module("notion_client", Client=object, AsyncClient=object)
+
+    with mock.patch.dict(sys.modules, modules):
+        sys.modules.pop("notion_utils", None)
+        import notion_utils
+        notion_utils.notion_async = client
+        notion_utils._notion_semaphore = asyncio.Semaphore(5)
+        notion_utils.notion_store = None
+        notion_utils.notion_write_queue = None
+        yield notion_utils
@@ -2,94 +2,163 @@
 
 import asyncio
 import os
+import random
 import re
 import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
-from notion_client import Client
-from typing import Dict, Tuple, Optional
+import httpx
+from notion_client import Client, AsyncClient
+from typing import Dict, Tuple, Optional, List
+from notion_store import NotionBlockStore
+from notion_cache import get_notion_cache
+from notion_index import get_notion_index, SearchHit
 
 # グローバル変数 (Notionクライアント)
 notion: Client = None
 
-# Notionキャッシュクラス
-class NotionCache:
-    def __init__(self, ttl: int = 300):  # 5分キャッシュ
-        self.cache: Dict[str, Tuple[str, float]] = {}
-        self.ttl = ttl
-        self.lock = asyncio.Lock()
-        self.hit_count = 0
-        self.miss_count = 0
-
-    async def get_cached_page_text(self, page_ids: list) -> str:
-        """キャッシュ付きでNotionページテキストを取得"""
-        cache_key = "_".join(sorted(page_ids))  # ソートして一意性を保証
-        current_time = time.time()
-
-        async with self.lock:
-            # キャッシュヒット確認
-            if cache_key in self.cache:
-                data, timestamp = self.cache[cache_key]
-                if current_time - timestamp < self.ttl:
-                    self.hit_count += 1
-                    print(f"✅ Notionキャッシュヒット: {cache_key[:20]}... (ヒット率: {self.get_hit_rate():.1%})")
-                    return data
-                else:
-                    # 期限切れキャッシュを削除
-                    del self.cache[cache_key]
-
-            # キャッシュミス - 新しいデータを取得
-            self.miss_count += 1
-            print(f"🔄 Notionキャッシュミス: {cache_key[:20]}... データを取得中...")
-
-        # ロック外でAPI呼び出し（パフォーマンス向上）
-        text = await get_notion_page_text_original(page_ids)
-
-        async with self.lock:
-            # キャッシュに保存
-            self.cache[cache_key] = (text, current_time)
-            print(f"💾 Notionキャッシュ保存: {cache_key[:20]}... (サイズ: {len(text)}文字)")
-
-            # 古いキャッシュエントリをクリーンアップ（メモリ効率化）
-            self._cleanup_expired_entries(current_time)
+# 非同期バックエンド（共有コネクションプール + 同時実行数制限）
+notion_async: Optional[AsyncClient] = None
+_notion_http_client: Optional[httpx.AsyncClient] = None
+_notion_semaphore: Optional[asyncio.Semaphore] = None
+NOTION_BACKEND = "sync"
 
-        return text
+def init_notion_client(api_key: str, backend: str = "async", max_concurrency: int = 5):
+    """
+    Notionクライアントを初期化（起動時に bot.py から呼び出す）
+    backend: "async" は共有keep-aliveプールを使うネイティブ非同期クライアント、
+             "sync" は従来の同期クライアント + run_in_executor
+    max_concurrency: 非同期バックエンドの同時リクエスト上限
+    """
+    global notion, notion_async, _notion_http_client, _notion_semaphore, NOTION_BACKEND
 
-    def _cleanup_expired_entries(self, current_time: float):
-        """期限切れのキャッシュエントリを削除"""
-        expired_keys = [
-            key for key, (_, timestamp) in self.cache.items()
-            if current_time - timestamp >= self.ttl
-        ]
-        for key in expired_keys:
-            del self.cache[key]
-
-        if expired_keys:
-            print(f"🗑️ 期限切れキャッシュを{len(expired_keys)}件削除")
-
-    def get_hit_rate(self) -> float:
-        """キャッシュヒット率を計算"""
-        total = self.hit_count + self.miss_count
-        return self.hit_count / total if total > 0 else 0.0
-
-    def get_cache_stats(self) -> dict:
-        """キャッシュ統計を取得"""
-        return {
-            "hit_count": self.hit_count,
-            "miss_count": self.miss_count,
-            "hit_rate": self.get_hit_rate(),
-            "cache_size": len(self.cache),
-            "ttl_seconds": self.ttl
-        }
+    notion = Client(auth=api_key)
+    notion_async = None
+    NOTION_BACKEND = "sync"
+
+    if backend == "async":
+        try:
+            _notion_http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency
+                ),
+                timeout=httpx.Timeout(30.0)
+            )
+            notion_async = AsyncClient(auth=api_key, client=_notion_http_client)
+            _notion_semaphore = asyncio.Semaphore(max_concurrency)
+            NOTION_BACKEND = "async"
+        except Exception as e:
+            print(f"⚠️ 非同期Notionクライアントの初期化に失敗、同期版を使用します: {e}")
+
+    print(f"✅ Notionクライアント初期化完了: backend={NOTION_BACKEND}, 同時実行上限={max_concurrency}")
+
+async def close_notion_client():
+    """非同期バックエンドのコネクションプールを閉じる（シャットダウン時）"""
+    global notion_async, _notion_http_client
+    if _notion_http_client is not None:
+        await _notion_http_client.aclose()
+        print("🔌 Notionコネクションプールをクローズしました")
+    notion_async = None
+    _notion_http_client = None
+
+# Notion APIのリトライ設定（レート制限は rate_limiter の "notion" サービスで管理）
+NOTION_MAX_RETRIES = 3
+NOTION_RETRY_BASE_DELAY = 1.0
+NOTION_MAX_QUEUE_WAIT = 60.0  # 予算超過時に順番待ちする上限（秒）
+RETRYABLE_NOTION_STATUSES = {429, 500, 502, 503, 504}
+
+class NotionThrottledError(Exception):
+    """レート制限の順番待ちが上限を超え、リクエストを送らずに諦めた"""
 
-    async def clear_cache(self):
-        """キャッシュを手動でクリア"""
-        async with self.lock:
-            cleared_count = len(self.cache)
-            self.cache.clear()
-            print(f"🧹 Notionキャッシュを手動クリア: {cleared_count}件削除")
+def _get_notion_retry_delay(error: Exception, attempt: int, idempotent: bool = True) -> Optional[float]:
+    """
+    リトライ可能なエラーなら待機秒数を返す（Retry-Afterを優先し、ジッターを加える）
+    冪等でない呼び出しは、処理前に拒否されたことが確実な429だけをリトライする
+    """
+    status = getattr(error, "status", None)
+    is_timeout = (
+        isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError))
+        or getattr(error, "code", None) == "notionhq_client_request_timeout"
+    )
+    if status not in RETRYABLE_NOTION_STATUSES and not is_timeout:
+        return None
+    if not idempotent and status != 429:
+        # 5xx・タイムアウトは書き込み済みの可能性があり、再送すると重複する
+        return None
+
+    headers = getattr(error, "headers", None)
+    retry_after = headers.get("retry-after") if headers is not None else None
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = NOTION_RETRY_BASE_DELAY * (2 ** attempt)
+    # 同時に待機した呼び出し元が一斉に再送しないようにずらす
+    return delay + random.uniform(0, NOTION_RETRY_BASE_DELAY)
 
-# グローバルキャッシュインスタンス
-notion_cache = NotionCache(ttl=300)  # 5分キャッシュ
+async def _call_notion(endpoint: str, request_func, idempotent: bool = True):
+    """
+    レート制限・リトライ・エンドポイント別統計付きでNotion APIを呼び出す
+    idempotent=False の呼び出し（追記など）は429以外ではリトライしない
+    """
+    from rate_limiter import get_rate_limiter
+    rate_limiter = get_rate_limiter()
+
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        slot = await rate_limiter.acquire_request_slot("notion", max_wait_seconds=NOTION_MAX_QUEUE_WAIT)
+        if not slot.allowed:
+            rate_limiter.record_endpoint_call("notion", endpoint, 0.0, "throttled")
+            raise NotionThrottledError(f"レート制限により拒否: {slot.message}")
+
+        start_time = time.time()
+        try:
+            response = await request_func()
+            rate_limiter.record_endpoint_call("notion", endpoint, time.time() - start_time, "ok")
+            return response
+        except Exception as e:
+            rate_limited = getattr(e, "status", None) == 429
+            rate_limiter.record_endpoint_call(
+                "notion", endpoint, time.time() - start_time, "rate_limited" if rate_limited else "error"
+            )
+            delay = _get_notion_retry_delay(e, attempt, idempotent)
+            if delay is None or attempt >= NOTION_MAX_RETRIES:
+                raise
+
+            if rate_limited:
+                # 429は全呼び出し元に効かせる（後続は limiter で順番待ち）
+                rate_limiter.defer_service("notion", delay)
+            rate_limiter.record_endpoint_call("notion", endpoint, 0.0, "retry")
+            print(f"⏳ Notion API {endpoint} をリトライします({attempt + 1}/{NOTION_MAX_RETRIES}) {delay:.1f}秒後: {e}")
+            await asyncio.sleep(delay)
+
+async def _list_block_children(block_id: str, start_cursor: Optional[str] = None, page_size: int = 100) -> dict:
+    """blocks.children.list をバックエンドに応じて呼び出す"""
+    params = {"block_id": block_id, "page_size": page_size}
+    if start_cursor:
+        params["start_cursor"] = start_cursor
+
+    async def request():
+        if notion_async is not None:
+            async with _notion_semaphore:
+                return await notion_async.blocks.children.list(**params)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: notion.blocks.children.list(**params))
+
+    return await _call_notion("blocks.children.list", request)
+
+async def _append_block_children(block_id: str, children: List[dict]) -> dict:
+    """blocks.children.append をバックエンドに応じて呼び出す"""
+    async def request():
+        if notion_async is not None:
+            async with _notion_semaphore:
+                return await notion_async.blocks.children.append(block_id=block_id, children=children)
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: notion.blocks.children.append(block_id=block_id, children=children))
+
+    # 追記は冪等でないため、5xx・タイムアウトでは再送しない
+    return await _call_notion("blocks.children.append", request, idempotent=False)
 
 # 日本時間の日時フォーマット関数
 def get_jst_timestamp(include_seconds: bool = False) -> str:
@@ -148,91 +217,475 @@ else:
 
 # ▼▼▼ ここからが修正箇所 ▼▼▼
 
-def _sync_find_latest_section_id(page_id: str) -> str:
-    """[同期] Notionページの一番下からブロックを遡って最新のセクションIDを探す"""
-    try:
-        response = notion.blocks.children.list(block_id=page_id, page_size=100)
-        all_blocks = response.get("results", [])
-        for block in reversed(all_blocks):
-            if block["type"] == "paragraph" and block["paragraph"]["rich_text"]:
-                text = block["paragraph"]["rich_text"][0]["plain_text"]
-                match = re.match(r'§(\d+)', text)
-                if match:
-                    last_num = int(match.group(1))
-                    new_num = last_num + 1
-                    return f"§{new_num:03d}"
-        return "§001"
-    except Exception as e:
-        print(f"🚨 最新セクションIDの検索中に同期エラー: {e}")
-        return "§001"
+# KBページごとのセクション番号インデックス（ページID -> 使用済みの最大番号）
+# 初回だけ全件スキャンで確定し、以降は append_summary_to_kb がメモリ上で進める
+SECTION_ID_PATTERN = re.compile(r'§(\d+)')
+_section_counters: Dict[str, int] = {}
+_section_locks: Dict[str, asyncio.Lock] = {}
+
+def _format_section_id(number: int) -> str:
+    return f"§{number:03d}"
+
+def _parse_section_number(section_id: str) -> Optional[int]:
+    match = SECTION_ID_PATTERN.match(section_id or "")
+    return int(match.group(1)) if match else None
+
+async def _scan_latest_section_number(page_id: str) -> int:
+    """ページ全体を走査して使用済みの最大セクション番号を求める（100件を超えるページにも対応）"""
+    latest = 0
+    for block in await _list_all_block_children(page_id):
+        if block.get("type") == "paragraph" and block["paragraph"]["rich_text"]:
+            text = block["paragraph"]["rich_text"][0]["plain_text"]
+            number = _parse_section_number(text)
+            if number is not None:
+                latest = max(latest, number)
+    print(f"🔢 セクション番号インデックスを初期化: ページ(ID: {page_id}) 最新=§{latest:03d}")
+    return latest
 
 async def find_latest_section_id(page_id: str) -> str:
-    """[非同期ラッパー] _sync_find_latest_section_id を呼び出す"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, _sync_find_latest_section_id, page_id)
+    """次に使うセクションIDを返す（インデックス未作成時のみNotionを全件スキャン）"""
+    lock = _section_locks.setdefault(page_id, asyncio.Lock())
+    async with lock:
+        try:
+            if page_id not in _section_counters:
+                _section_counters[page_id] = await _scan_latest_section_number(page_id)
+            return _format_section_id(_section_counters[page_id] + 1)
+        except Exception as e:
+            print(f"🚨 最新セクションIDの検索中にエラー: {e}")
+            return "§001"
 
-def _sync_append_summary_to_kb(page_id: str, section_id: str, summary: str):
-    """[同期] 指定されたNotionページにセクションID付きの要約を追記する"""
-    try:
-        timestamp = get_jst_timestamp()
-        final_text = f"{section_id} {summary.strip()} ({timestamp})"
-        
-        notion.blocks.children.append(
-            block_id=page_id,
-            children=[
-                {"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": final_text}}]}}
-            ]
-        )
-        print(f"✅ ナレッジベースに {section_id} を追記しました。")
-    except Exception as e:
-        print(f"🚨 ナレッジベースへの追記中に同期エラー: {e}")
+def invalidate_section_index(page_id: Optional[str] = None):
+    """セクション番号インデックスを破棄（次回の find_latest_section_id で再スキャン）"""
+    if page_id is None:
+        _section_counters.clear()
+    else:
+        _section_counters.pop(page_id, None)
+
+async def append_summary_to_kb(page_id: str, section_id: str, summary: str) -> Optional[str]:
+    """
+    指定されたNotionページにセクションID付きの要約を追記する
+    並行書き込みで番号が既に使われていた場合は次の番号に振り直し、実際に使ったIDを返す
+    書き込みに失敗した場合は None を返す
+    """
+    lock = _section_locks.setdefault(page_id, asyncio.Lock())
+    async with lock:
+        number = _parse_section_number(section_id)
+        latest = _section_counters.get(page_id)
+        if number is not None and latest is not None and number <= latest:
+            number = latest + 1
+            section_id = _format_section_id(number)
+
+        try:
+            timestamp = get_jst_timestamp()
+            final_text = f"{section_id} {summary.strip()} ({timestamp})"
+
+            await _append_block_children(
+                page_id,
+                children=[
+                    {"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": final_text}}]}}
+                ]
+            )
+            if number is not None and latest is not None:
+                _section_counters[page_id] = number
+            print(f"✅ ナレッジベースに {section_id} を追記しました。")
+            return section_id
+        except Exception as e:
+            # 書き込み結果が不明なため、次回は全件スキャンで番号を取り直す
+            _section_counters.pop(page_id, None)
+            print(f"🚨 ナレッジベースへの追記中にエラー: {e}")
+            return None
 
-async def append_summary_to_kb(page_id: str, section_id: str, summary: str):
-    """[非同期ラッパー] _sync_append_summary_to_kb を呼び出す"""
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _sync_append_summary_to_kb, page_id, section_id, summary)
+def get_section_index_stats() -> Dict[str, str]:
+    """セクション番号インデックスの状態を取得"""
+    return {page_id: _format_section_id(number) for page_id, number in _section_counters.items()}
 
 # ▲▲▲ ここまでが修正箇所 ▲▲▲
 
 
-def _sync_get_notion_page_text(page_id):
-    all_text_blocks = []
-    next_cursor = None
-    print(f" Notionページ(ID: {page_id})の読み込みを開始します...")
+# テキスト抽出対象のブロックタイプ
+TEXT_BLOCK_TYPES = [
+    "paragraph", "heading_1", "heading_2", "heading_3", "bulleted_list_item", "numbered_list_item",
+    "quote", "callout", "toggle", "to_do", "code", "table_row"
+]
+
+# 子ブロック（トグル・表・入れ子リスト等）の展開設定
+MAX_BLOCK_DEPTH = 3  # トップレベルから何階層下まで読むか
+CHILD_FETCH_CONCURRENCY = 4  # 子ブロック取得の同時実行数（ページ単位）
+SKIP_CHILDREN_TYPES = ["child_page", "child_database"]  # 別ページは展開しない
+CHILD_INDENT = "  "
+
+def _rich_text_to_plain(rich_text_list: list) -> str:
+    return "".join([rich_text.get("plain_text", "") for rich_text in rich_text_list])
+
+def _extract_block_text(block: dict) -> str:
+    """ブロックからプレーンテキストを抽出"""
+    block_type = block.get("type")
+    if block_type not in TEXT_BLOCK_TYPES:
+        return ""
+    content = block.get(block_type, {})
+    if block_type == "table_row":
+        return " | ".join(_rich_text_to_plain(cell) for cell in content.get("cells", []))
+
+    text = _rich_text_to_plain(content.get("rich_text", []))
+    if block_type == "to_do":
+        return f"[{'x' if content.get('checked') else ' '}] {text}"
+    if block_type == "code" and text:
+        return f"```{content.get('language', '')}\n{text}\n```"
+    return text
+
+async def _extract_block_tree_text(block: dict, depth: int, semaphore: asyncio.Semaphore) -> str:
+    """ブロックと子孫ブロックのテキストを連結（兄弟の子ブロックは並行取得）"""
+    text = _extract_block_text(block)
+    if (not block.get("has_children") or depth >= MAX_BLOCK_DEPTH
+            or block.get("type") in SKIP_CHILDREN_TYPES):
+        return text
+
+    # セマフォはAPI呼び出しの間だけ保持（再帰中に保持すると深い階層で詰まる）
+    async with semaphore:
+        children = await _list_all_block_children(block["id"])
+    child_texts = await asyncio.gather(*[
+        _extract_block_tree_text(child, depth + 1, semaphore) for child in children
+    ])
+
+    # 自身にテキストがあるブロック（トグル等）の子だけ字下げし、表や列などの入れ物はそのまま並べる
+    indent = CHILD_INDENT if text else ""
+    lines = [text] if text else []
+    for child_text in child_texts:
+        if child_text:
+            lines.append(indent + child_text.replace("\n", "\n" + indent))
+    return "\n".join(lines)
+
+async def _iter_block_texts(blocks: List[dict], known: Optional[Dict[str, Tuple[Optional[str], str]]] = None):
+    """
+    トップレベルブロックを文書順に (block, text) で返す非同期ジェネレータ
+    子ブロックを持つものは先に並行取得を始めておき、前のブロックから順に返していく
+    known: block_id -> (last_edited_time, text)。更新時刻が同じブロックは再取得しない
+    """
+    semaphore = asyncio.Semaphore(CHILD_FETCH_CONCURRENCY)
+    known = known or {}
+    tasks = {}
+    for position, block in enumerate(blocks):
+        cached = known.get(block.get("id"))
+        if block.get("has_children") and not (cached and cached[0] == block.get("last_edited_time")):
+            tasks[position] = asyncio.ensure_future(_extract_block_tree_text(block, 0, semaphore))
+
+    try:
+        for position, block in enumerate(blocks):
+            if position in tasks:
+                yield block, await tasks[position]
+            elif block.get("has_children") and block.get("id") in known:
+                yield block, known[block.get("id")][1]
+            else:
+                yield block, _extract_block_text(block)
+    finally:
+        # 途中で打ち切られた場合は残りの取得を止める
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+
+@dataclass
+class NotionPageSyncState:
+    """ページごとの差分同期カーソル"""
+    page_id: str
+    blocks: List[Tuple[str, str, Optional[str]]] = field(default_factory=list)  # (block_id, text, last_edited_time)
+    last_block_id: Optional[str] = None
+    last_edited_time: Optional[str] = None
+    full_synced_at: float = 0.0
+    full_sync_count: int = 0
+    incremental_sync_count: int = 0
+    tail_sync_count: int = 0
+    fetched_block_count: int = 0
+
+    def get_text(self) -> str:
+        return "\n".join(block[1] for block in self.blocks)
+
+    def tail_start(self, max_chars: int) -> int:
+        """末尾 max_chars 文字を含む最初のブロック位置"""
+        total = 0
+        for position in range(len(self.blocks) - 1, -1, -1):
+            total += len(self.blocks[position][1]) + 1
+            if total > max_chars:
+                return position
+        return 0
+
+    def get_tail_text(self, max_chars: int) -> str:
+        """末尾 max_chars 文字だけを連結して返す（get_text()[-max_chars:] と同じ結果）"""
+        start = self.tail_start(max_chars)
+        return "\n".join(block[1] for block in self.blocks[start:])[-max_chars:]
+
+# 差分同期の状態（ページIDごと）
+_page_sync_states: Dict[str, NotionPageSyncState] = {}
+_page_sync_locks: Dict[str, asyncio.Lock] = {}
+FULL_RESYNC_INTERVAL = 1800  # 30分ごとに全件再同期（既存ブロックの編集を取り込む）
+
+# 永続ブロックストア（任意・init_notion_store で有効化）
+notion_store: Optional[NotionBlockStore] = None
+
+def init_notion_store(db_path: str):
+    """永続ブロックストアを有効化（ページデータは初回アクセス時に遅延読み込み）"""
+    global notion_store
+    if not db_path:
+        return
+    try:
+        store = NotionBlockStore(db_path)
+        store.open()
+        notion_store = store
+    except Exception as e:
+        print(f"⚠️ Notionブロックストアの初期化に失敗、メモリのみで動作します: {e}")
+        notion_store = None
+
+async def close_notion_store():
+    """永続ブロックストアを閉じる（実行待ちの書き込みを終えてから）"""
+    if notion_store is not None:
+        await notion_store.close_async()
+
+async def _restore_page_sync_state(page_id: str) -> Optional[NotionPageSyncState]:
+    """永続ストアから同期状態を復元"""
+    if notion_store is None:
+        return None
+    try:
+        stored = await notion_store.load_page_async(page_id)
+    except Exception as e:
+        print(f"⚠️ Notionブロックストアの読み込みに失敗(ID: {page_id}): {e}")
+        return None
+    if stored is None:
+        return None
+    # 復元直後は差分同期から始める（全件再同期の周期は復元時点から数える）
+    return NotionPageSyncState(
+        page_id=page_id,
+        blocks=list(stored.blocks),
+        last_block_id=stored.last_block_id,
+        last_edited_time=stored.last_edited_time,
+        full_synced_at=time.time()
+    )
+
+async def _persist_page_sync_state(state: NotionPageSyncState, from_position: int = 0):
+    """同期状態を永続ストアへ書き込む（ライトスルー）"""
+    if notion_store is None:
+        return
+    try:
+        await notion_store.save_page_async(
+            state.page_id, state.blocks, state.last_block_id,
+            state.last_edited_time, state.full_synced_at, from_position=from_position
+        )
+    except Exception as e:
+        print(f"⚠️ Notionブロックストアへの書き込みに失敗(ID: {state.page_id}): {e}")
+
+async def _list_all_block_children(block_id: str, start_cursor: Optional[str] = None) -> List[dict]:
+    """start_cursor以降の子ブロックを全ページ分取得"""
+    all_blocks = []
+    next_cursor = start_cursor
     while True:
+        response = await _list_block_children(block_id, start_cursor=next_cursor, page_size=100)
+        all_blocks.extend(response.get("results", []))
+        if response.get("has_more"):
+            next_cursor = response.get("next_cursor")
+        else:
+            break
+    return all_blocks
+
+def _apply_tail_marker(state: NotionPageSyncState, last_block: dict):
+    """最後に読んだブロックのIDと更新時刻を記録"""
+    state.last_block_id = last_block.get("id")
+    state.last_edited_time = last_block.get("last_edited_time")
+
+async def _full_sync_page(page_id: str) -> NotionPageSyncState:
+    """ページ全体を取得して同期状態を作り直す"""
+    print(f" Notionページ(ID: {page_id})の読み込みを開始します...")
+    results = await _list_all_block_children(page_id)
+    if not results:
+        print(f"⚠️ ページ(ID: {page_id})からブロックが1件も返されませんでした。")
+
+    previous = _page_sync_states.get(page_id)
+    state = NotionPageSyncState(page_id=page_id, full_synced_at=time.time())
+    if previous:
+        state.full_sync_count = previous.full_sync_count
+        state.incremental_sync_count = previous.incremental_sync_count
+        state.tail_sync_count = previous.tail_sync_count
+        state.fetched_block_count = previous.fetched_block_count
+
+    async for block, text_content in _iter_block_texts(results):
+        if text_content:
+            state.blocks.append((block.get("id"), text_content, block.get("last_edited_time")))
+    if results:
+        _apply_tail_marker(state, results[-1])
+
+    state.full_sync_count += 1
+    state.fetched_block_count += len(results)
+    return state
+
+async def _incremental_sync_page(state: NotionPageSyncState) -> bool:
+    """
+    最後に読んだブロック以降の末尾だけを取得して追記する
+    カーソルが使えない場合は False を返し、呼び出し側で全件同期する
+    """
+    if not state.last_block_id:
+        return False
+
+    # start_cursorに最後のブロックIDを渡すと、そのブロック自身から結果が返る
+    results = await _list_all_block_children(state.page_id, start_cursor=state.last_block_id)
+    if not results or results[0].get("id") != state.last_block_id:
+        return False
+
+    anchor = results[0]
+    changed_from = len(state.blocks)
+    new_blocks = results[1:]
+    if anchor.get("last_edited_time") != state.last_edited_time:
+        # 最後のブロックが編集されていた場合は差し替え
+        if state.blocks and state.blocks[-1][0] == anchor.get("id"):
+            state.blocks.pop()
+            changed_from = len(state.blocks)
+        new_blocks = results
+
+    async for block, text_content in _iter_block_texts(new_blocks):
+        if text_content:
+            state.blocks.append((block.get("id"), text_content, block.get("last_edited_time")))
+
+    _apply_tail_marker(state, results[-1])
+    state.incremental_sync_count += 1
+    state.fetched_block_count += len(results)
+
+    new_count = len(results) - 1
+    if new_count:
+        print(f"🔄 Notion差分同期: ページ(ID: {state.page_id}) 新規{new_count}ブロック")
+    if changed_from < len(state.blocks) or new_count:
+        await _persist_page_sync_state(state, from_position=changed_from)
+    return True
+
+async def _get_page_sync_state(page_id: str) -> Optional[NotionPageSyncState]:
+    """メモリ上の同期状態を返す（なければ永続ストアから復元）"""
+    state = _page_sync_states.get(page_id)
+    if state is None:
+        state = await _restore_page_sync_state(page_id)
+        if state is not None:
+            _page_sync_states[page_id] = state
+    return state
+
+async def _fetch_notion_page_text(page_id):
+    # 保留中のログ書き込みを先に反映し、読み込み結果に含める
+    if notion_write_queue is not None and notion_write_queue.has_pending(page_id):
+        await notion_write_queue.flush_page(page_id)
+
+    lock = _page_sync_locks.setdefault(page_id, asyncio.Lock())
+    async with lock:
         try:
-            response = notion.blocks.children.list(
-                block_id=page_id,
-                start_cursor=next_cursor,
-                page_size=100
-            )
-            results = response.get("results", [])
-            if not results and not all_text_blocks:
-                print(f"⚠️ ページ(ID: {page_id})からブロックが1件も返されませんでした。")
-            for block in results:
-                block_type = block.get("type")
-                text_content = ""
-                if block_type in ["paragraph", "heading_1", "heading_2", "heading_3", "bulleted_list_item", "numbered_list_item", "quote", "callout"]:
-                    rich_text_list = block.get(block_type, {}).get("rich_text", [])
-                    if rich_text_list:
-                        text_content = "".join([rich_text.get("plain_text", "") for rich_text in rich_text_list])
-                if text_content:
-                    all_text_blocks.append(text_content)
-            if response.get("has_more"):
-                next_cursor = response.get("next_cursor")
-            else:
-                break
+            state = await _get_page_sync_state(page_id)
+            if state and time.time() - state.full_synced_at < FULL_RESYNC_INTERVAL:
+                try:
+                    if await _incremental_sync_page(state):
+                        return state.get_text()
+                except Exception as e:
+                    print(f"⚠️ Notion差分同期に失敗、全件取得に切り替えます(ID: {page_id}): {e}")
+
+            state = await _full_sync_page(page_id)
+            _page_sync_states[page_id] = state
+            await _persist_page_sync_state(state)
+            return state.get_text()
+        except Exception as e:
+            print(f"❌ Notion APIからの読み込み中にエラー(ID: {page_id}): {e}")
+            stale = _page_sync_states.get(page_id)
+            if stale and stale.blocks:
+                # 前回同期分で応答し、エラー文字列を要約対象に混ぜない
+                print(f"⚠️ 前回同期済みの内容で応答します(ID: {page_id}, {len(stale.blocks)}ブロック)")
+                return stale.get_text()
+            return f"ERROR: Notion API Error - {e}"
+
+async def _tail_sync_page(state: NotionPageSyncState, max_chars: int) -> bool:
+    """
+    ブロック位置インデックスを使い、末尾 max_chars 文字を含む範囲だけを読み直す
+    範囲先頭のブロックIDを start_cursor にするため、通常は1回のAPI呼び出しで済む
+    （範囲内の編集・削除と新規追加は反映される。範囲より前の編集は全件同期で取り込む）
+    """
+    if not state.blocks:
+        return False
+
+    start = state.tail_start(max_chars)
+    anchor_id = state.blocks[start][0]
+    results = await _list_all_block_children(state.page_id, start_cursor=anchor_id)
+    if not results or results[0].get("id") != anchor_id:
+        return False
+
+    # 範囲内で更新されていないブロックは子ブロックを取り直さない
+    known = {block_id: (edited_time, text) for block_id, text, edited_time in state.blocks[start:]}
+    tail_blocks = []
+    async for block, text_content in _iter_block_texts(results, known=known):
+        if text_content:
+            tail_blocks.append((block.get("id"), text_content, block.get("last_edited_time")))
+
+    changed = state.blocks[start:] != tail_blocks
+    state.blocks[start:] = tail_blocks
+    _apply_tail_marker(state, results[-1])
+    state.tail_sync_count += 1
+    state.fetched_block_count += len(results)
+    if changed:
+        await _persist_page_sync_state(state, from_position=start)
+    return True
+
+async def _fetch_notion_page_tail(page_id: str, max_chars: int) -> str:
+    """
+    ページ末尾の max_chars 文字を返す（get_notion_page_text([page_id])[-max_chars:] 相当）
+    同期状態があれば末尾の範囲だけを取得し、ページ全体のページネーションを避ける
+    """
+    if notion_write_queue is not None and notion_write_queue.has_pending(page_id):
+        await notion_write_queue.flush_page(page_id)
+
+    lock = _page_sync_locks.setdefault(page_id, asyncio.Lock())
+    async with lock:
+        try:
+            state = await _get_page_sync_state(page_id)
+            if state:
+                try:
+                    if await _tail_sync_page(state, max_chars):
+                        return state.get_tail_text(max_chars)
+                except Exception as e:
+                    print(f"⚠️ Notion末尾同期に失敗、全件取得に切り替えます(ID: {page_id}): {e}")
+
+            # 位置インデックスがない初回のみ全件取得
+            state = await _full_sync_page(page_id)
+            _page_sync_states[page_id] = state
+            await _persist_page_sync_state(state)
+            return state.get_tail_text(max_chars)
         except Exception as e:
             print(f"❌ Notion APIからの読み込み中にエラー(ID: {page_id}): {e}")
+            stale = _page_sync_states.get(page_id)
+            if stale and stale.blocks:
+                # 前回同期分で応答し、エラー文字列を要約対象に混ぜない
+                print(f"⚠️ 前回同期済みの内容で応答します(ID: {page_id}, {len(stale.blocks)}ブロック)")
+                return stale.get_tail_text(max_chars)
             return f"ERROR: Notion API Error - {e}"
-    return "\n".join(all_text_blocks)
+
+def get_page_sync_stats() -> dict:
+    """差分同期の統計を取得"""
+    pages = {
+        page_id: {
+            "blocks": len(state.blocks),
+            "full_syncs": state.full_sync_count,
+            "incremental_syncs": state.incremental_sync_count,
+            "tail_syncs": state.tail_sync_count,
+            "fetched_blocks": state.fetched_block_count,
+            "last_edited_time": state.last_edited_time
+        }
+        for page_id, state in _page_sync_states.items()
+    }
+    return {
+        "pages": pages,
+        "sections": get_section_index_stats(),
+        "store": notion_store.get_stats() if notion_store is not None else None
+    }
 
 async def get_notion_page_text_original(page_ids: list):
     """キャッシュなしの元の実装（内部使用）"""
     if not isinstance(page_ids, list):
         page_ids = [page_ids]
-    tasks = [asyncio.get_event_loop().run_in_executor(None, _sync_get_notion_page_text, pid) for pid in page_ids]
+    tasks = [_fetch_notion_page_text(pid) for pid in page_ids]
     results = await asyncio.gather(*tasks)
+    # 一部のページだけ失敗した場合は取得できたページのみで返す（エラー文字列を本文に混ぜない）
+    succeeded = [text for text in results if not text.startswith("ERROR:")]
+    if succeeded and len(succeeded) < len(results):
+        print(f"⚠️ {len(results) - len(succeeded)}ページの取得に失敗したため、取得できたページのみ使用します")
+        results = succeeded
+    elif not succeeded and results:
+        return results[0]
     separator = "\n\n--- (次のページ) ---\n\n"
     return separator.join(results)
 
@@ -241,24 +694,212 @@ async def get_notion_page_text(page_ids: list):
     if not isinstance(page_ids, list):
         page_ids = [page_ids]
 
-    # キャッシュを使用
-    return await notion_cache.get_cached_page_text(page_ids)
+    # 共有キャッシュを使用（同時ミスは1回の取得に合流）
+    return await get_notion_cache().get_cached_page_text(page_ids, get_notion_page_text_original)
 
-async def log_to_notion(page_id, blocks):
-    if not page_id: 
-        print("⚠️ Notion書き込みスキップ: page_idが空です")
-        return
+async def get_notion_page_tail(page_id: str, max_chars: int = 4000) -> str:
+    """キャッシュ付きNotionページ末尾テキスト取得（公開API）"""
+    return await get_notion_cache().get_cached_page_text(
+        [page_id],
+        lambda page_ids: _fetch_notion_page_tail(page_ids[0], max_chars),
+        extra_params=f"tail:{max_chars}"
+    )
+
+async def get_notion_page_blocks(page_id: str) -> Optional[List[Tuple[str, str, Optional[str]]]]:
+    """
+    差分同期済みのブロック一覧 (block_id, text, last_edited_time) を取得
+    取得できなかった場合は None
+    """
+    text = await get_notion_page_text([page_id])
+    state = _page_sync_states.get(page_id)
+    if text.startswith("ERROR:") or state is None:
+        return None
+    return list(state.blocks)
+
+async def search_notion_page(page_id: str, query: str, top_k: int = 8, max_chars: int = 4000) -> List[SearchHit]:
+    """
+    ページ内で質問に関連するブロックを検索（LLMを使わないローカル検索）
+    同期済みブロックから検索インデックスを差分更新してから検索する
+    """
+    blocks = await get_notion_page_blocks(page_id)
+    if blocks is None:
+        return []
+
+    index = get_notion_index()
+    changed = index.update_page(page_id, blocks)
+    if changed:
+        print(f"🔎 Notion検索インデックス更新: ページ(ID: {page_id}) {changed}ブロック")
+    return index.search(page_id, query, top_k=top_k, max_chars=max_chars)
+
+def _print_notion_write_error(page_id, blocks, error: Exception):
+    print(f"❌ Notion書き込みエラー: {error}")
+    print(f"🔍 問題のページID: {page_id}")
+    print(f"🔍 書き込み予定ブロック数: {len(blocks) if blocks else 0}")
+    # ページIDの形式チェック
+    if not page_id or len(page_id) != 36 or page_id.count('-') != 4:
+        print(f"⚠️ 無効なページID形式: {page_id} (正しい形式: xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx)")
+
+def _is_unsent_write_error(error: Exception) -> bool:
+    """Notionに届いていないことが確実な書き込みエラーか（再送しても重複しない）"""
+    return isinstance(error, NotionThrottledError) or getattr(error, "status", None) == 429
+
+async def _log_to_notion_now(page_id, blocks):
+    """ブロックを即座にNotionへ追記（書き込みキューを経由しない）"""
     try:
         print(f"🔍 Notion書き込み試行: ページID {page_id}")
-        await asyncio.get_event_loop().run_in_executor(None, lambda: notion.blocks.children.append(block_id=page_id, children=blocks))
+        await _append_block_children(page_id, blocks)
         print(f"✅ Notion書き込み成功: ページID {page_id}")
+        return True
     except Exception as e:
-        print(f"❌ Notion書き込みエラー: {e}")
-        print(f"🔍 問題のページID: {page_id}")
-        print(f"🔍 書き込み予定ブロック数: {len(blocks) if blocks else 0}")
-        # ページIDの形式チェック
-        if not page_id or len(page_id) != 36 or page_id.count('-') != 4:
-            print(f"⚠️ 無効なページID形式: {page_id} (正しい形式: xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx)")
+        _print_notion_write_error(page_id, blocks, e)
+        return False
+
+class NotionWriteQueue:
+    """
+    ページIDごとのライトビハインド書き込みキュー
+    キューに積んだブロックを順序どおり最大100件ずつ1回のappendにまとめて書き込む
+    Notionに届いていないことが確実な失敗（429・レート制限待ちの打ち切り）はキューの先頭に戻して再送し、
+    それ以外の失敗（書き込み済みの可能性がある）と再送上限に達したバッチは破棄して記録する
+    """
+
+    MAX_BATCH_BLOCKS = 100  # Notion APIの1リクエストあたりの子ブロック上限
+    MAX_FLUSH_RETRIES = 3  # 同じバッチを戻して再送する回数の上限
+
+    def __init__(self, flush_interval: float = 2.0, max_batch_blocks: int = MAX_BATCH_BLOCKS):
+        self.flush_interval = flush_interval
+        self.max_batch_blocks = min(max_batch_blocks, self.MAX_BATCH_BLOCKS)
+        self.pending: Dict[str, List[dict]] = {}
+        self.flush_tasks: Dict[str, asyncio.Task] = {}
+        self.page_locks: Dict[str, asyncio.Lock] = {}
+        self.background_tasks = set()
+        self.retry_counts: Dict[str, int] = {}  # ページごとの先頭バッチの再送回数
+
+        # 統計
+        self.enqueued_blocks = 0
+        self.append_calls = 0
+        self.failed_batches = 0
+        self.requeued_batches = 0
+        self.dropped_blocks = 0
+
+    def enqueue(self, page_id: str, blocks: List[dict]):
+        """ブロックをキューに積む（待機しない）"""
+        queue = self.pending.setdefault(page_id, [])
+        queue.extend(blocks)
+        self.enqueued_blocks += len(blocks)
+
+        if len(queue) >= self.max_batch_blocks:
+            # サイズ上限に達したら即時フラッシュ（ページロックで順序は保たれる）
+            self._spawn(self.flush_page(page_id))
+            return
+
+        task = self.flush_tasks.get(page_id)
+        if task is None or task.done():
+            self.flush_tasks[page_id] = self._spawn(self._delayed_flush(page_id, self.flush_interval))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    def has_pending(self, page_id: str) -> bool:
+        return bool(self.pending.get(page_id))
+
+    async def _delayed_flush(self, page_id: str, delay: float):
+        await asyncio.sleep(delay)
+        await self.flush_page(page_id)
+
+    async def flush_page(self, page_id: str) -> int:
+        """
+        ページの保留ブロックをすべて書き込む（ページ単位で直列化して順序を保証）
+        書き込めなかったブロック数（破棄した分と再送待ちで残った分）を返す
+        """
+        lock = self.page_locks.setdefault(page_id, asyncio.Lock())
+        async with lock:
+            unwritten = 0
+            queue = self.pending.get(page_id)
+            while queue:
+                batch = queue[:self.max_batch_blocks]
+                del queue[:self.max_batch_blocks]
+                self.append_calls += 1
+                try:
+                    await _append_block_children(page_id, batch)
+                except Exception as e:
+                    _print_notion_write_error(page_id, batch, e)
+                    self.failed_batches += 1
+                    retries = self.retry_counts.get(page_id, 0)
+                    if _is_unsent_write_error(e) and retries < self.MAX_FLUSH_RETRIES:
+                        # 未送信なので先頭に戻し、間隔をあけて再送する（後続のブロックとの順序も保つ）
+                        queue[:0] = batch
+                        self.retry_counts[page_id] = retries + 1
+                        self.requeued_batches += 1
+                        self.flush_tasks[page_id] = self._spawn(self._delayed_flush(page_id, self.flush_interval))
+                        print(f"🔁 Notion書き込みを再送待ちに戻しました({retries + 1}/{self.MAX_FLUSH_RETRIES}): ページID {page_id} {len(batch)}ブロック")
+                        return unwritten + len(queue)
+
+                    self.retry_counts.pop(page_id, None)
+                    self.dropped_blocks += len(batch)
+                    unwritten += len(batch)
+                    print(f"🚨 Notion書き込みを破棄しました: ページID {page_id} {len(batch)}ブロック ({e})")
+                    continue
+                self.retry_counts.pop(page_id, None)
+            self.pending.pop(page_id, None)
+            return unwritten
+
+    async def flush_all(self) -> int:
+        """全ページの保留ブロックを書き込む（シャットダウン時）。書き込めなかったブロック数を返す"""
+        page_ids = [page_id for page_id, blocks in self.pending.items() if blocks]
+        if page_ids:
+            print(f"📤 Notion書き込みキューをフラッシュ: {len(page_ids)}ページ")
+        results = await asyncio.gather(*(self.flush_page(page_id) for page_id in page_ids))
+        return sum(results)
+
+    def get_stats(self) -> dict:
+        """統計情報を取得"""
+        return {
+            "pending_pages": sum(1 for blocks in self.pending.values() if blocks),
+            "pending_blocks": sum(len(blocks) for blocks in self.pending.values()),
+            "enqueued_blocks": self.enqueued_blocks,
+            "append_calls": self.append_calls,
+            "failed_batches": self.failed_batches,
+            "requeued_batches": self.requeued_batches,
+            "dropped_blocks": self.dropped_blocks,
+            "flush_interval": self.flush_interval
+        }
+
+# ライトビハインド書き込みキュー（init_notion_write_queue で有効化）
+notion_write_queue: Optional[NotionWriteQueue] = None
+
+def init_notion_write_queue(enabled: bool = True, flush_interval: float = 2.0):
+    """ライトビハインド書き込みを設定（起動時に bot.py から呼び出す）"""
+    global notion_write_queue
+    notion_write_queue = NotionWriteQueue(flush_interval=flush_interval) if enabled else None
+    print(f"✅ Notion書き込みモード: {'ライトビハインド' if enabled else '同期書き込み'}")
+
+async def flush_notion_writes(page_id: Optional[str] = None) -> int:
+    """
+    保留中のNotion書き込みをフラッシュ（page_id指定時はそのページのみ）
+    書き込めなかったブロック数を返す
+    """
+    if notion_write_queue is None:
+        return 0
+    if page_id:
+        return await notion_write_queue.flush_page(page_id)
+    return await notion_write_queue.flush_all()
+
+def get_write_queue_stats() -> Optional[dict]:
+    """書き込みキューの統計を取得"""
+    return notion_write_queue.get_stats() if notion_write_queue is not None else None
+
+async def log_to_notion(page_id, blocks):
+    if not page_id: 
+        print("⚠️ Notion書き込みスキップ: page_idが空です")
+        return
+    if notion_write_queue is not None:
+        # 応答パスでは待機せず、キューに積んでバックグラウンドで書き込む
+        notion_write_queue.enqueue(page_id, blocks)
+        return
+    await _log_to_notion_now(page_id, blocks)
 
 async def log_user_message(page_id, user_display_name, message_content):
     """ユーザーメッセージを日時付きでNotionにログ記録"""
@@ -286,7 +927,7 @@ async def get_memory_flag_from_notion(thread_id: str) -> bool:
     if not page_ids: return False
     first_page_id = page_ids[0]
     try:
-        response = await asyncio.get_event_loop().run_in_executor(None, lambda: notion.blocks.children.list(block_id=first_page_id, page_size=1))
+        response = await _list_block_children(first_page_id, page_size=1)
         results = response.get("results", [])
         if not results: return False
         first_block = results[0]
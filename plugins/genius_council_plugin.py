@@ -12,11 +12,13 @@ import discord
 from discord.ext import commands
 
 from plugin_system import Plugin, HookResult
-from utils import safe_log, send_long_message, get_notion_context_for_message
+from utils import safe_log, send_long_message
 from notion_utils import NOTION_PAGE_MAP, log_response, log_user_message, find_latest_section_id, append_summary_to_kb
 from async_optimizer import multi_ai_council_parallel
 from ai_clients import ask_gpt5, ask_gpt5_mini, ask_gemini_2_5_pro, ask_rekus, ask_lalah
 from config_manager import get_config_manager
+from rolling_summary import get_rolling_summary, mark_rolling_summary_section, build_council_context, log_rolling_summary
+from bulkhead import bulkhead_pool
 
 class GeniusCouncilPlugin(Plugin):
     """AI評議会プラグイン"""
@@ -92,6 +94,10 @@ class GeniusCouncilPlugin(Plugin):
             if not page_ids:
                 return HookResult(success=False, error="❌ Notion未連携")
 
+            # 2000文字超の応答の送り方（council タスクの設定）
+            from unified_task_engine import get_unified_task_engine
+            long_message_mode = get_unified_task_engine().config_loader.get_task_config(ai_type).long_message_mode
+
             # Phase 0: ユーザーメッセージをログ記録
             await log_user_message(page_ids[0], message.author.display_name, message.content)
 
@@ -100,22 +106,23 @@ class GeniusCouncilPlugin(Plugin):
             if not initial_summary:
                 return HookResult(success=False, error="❌ 初回要約に失敗")
 
-            # 論点サマリーを送信・保存
-            await send_long_message(bot.openai_client, message.channel, f"**{self.summary_engine}による論点サマリー:**\n{initial_summary}")
-            await log_response(page_ids[0], f"論点サマリー:\n{initial_summary}", self.summary_engine)
+            # 論点サマリーを送信・保存（0ページの記録は次回のローリング要約の差分からは除外される）
+            await send_long_message(bot.openai_client, message.channel, f"**{self.summary_engine}による論点サマリー:**\n{initial_summary}", mode=long_message_mode)
+            await log_rolling_summary(page_ids[0], initial_summary, self.summary_engine)
 
-            # Phase 2: AI評議会実行
-            council_reports = await self._execute_council_analysis(bot, message.content, initial_summary)
+            # Phase 2: AI評議会実行（論点に議題の関連ブロックを加える）
+            council_context = await build_council_context(page_ids[0], message.content, initial_summary)
+            council_reports = await self._execute_council_analysis(bot, message.content, council_context)
 
             # Phase 3: 各AI分析を送信・保存
             for ai_name, report in council_reports.items():
-                await send_long_message(bot.openai_client, message.channel, f"**分析 by {ai_name}:**\n{report}")
+                await send_long_message(bot.openai_client, message.channel, f"**分析 by {ai_name}:**\n{report}", mode=long_message_mode)
                 await log_response(page_ids[0], f"分析 by {ai_name}:\n{report}", ai_name)
 
             # Phase 4: 統合レポート作成
             if self.synthesis_required:
                 final_report = await self._create_synthesis_report(bot, council_reports)
-                await send_long_message(bot.openai_client, message.channel, f"**最終統合レポート（by {self.synthesis_engine}）:**\n{final_report}")
+                await send_long_message(bot.openai_client, message.channel, f"**最終統合レポート（by {self.synthesis_engine}）:**\n{final_report}", mode=long_message_mode)
                 await log_response(page_ids[0], f"最終統合レポート:\n{final_report}", self.synthesis_engine)
 
                 self.successful_syntheses += 1
@@ -125,7 +132,7 @@ class GeniusCouncilPlugin(Plugin):
 
             # Phase 5: KB用要約保存
             if len(page_ids) >= 2:
-                await self._save_kb_summary(bot, response_text, page_ids[1])
+                await self._save_kb_summary(bot, response_text, page_ids[1], page_ids[0])
 
             execution_time = time.time() - start_time
             self.total_execution_time += execution_time
@@ -146,7 +153,8 @@ class GeniusCouncilPlugin(Plugin):
     async def _create_initial_summary(self, bot, message, page_id) -> str:
         """初回論点サマリーを作成"""
         try:
-            summary = await get_notion_context_for_message(bot, message, page_id, message.content, self.summary_engine)
+            # 前回以降に追記されたブロックだけを要約して畳み込む
+            summary = await get_rolling_summary(bot, page_id)
             return summary or ""
         except Exception as e:
             safe_log("⚠️ 論点サマリー作成エラー: ", e)
@@ -239,14 +247,19 @@ class GeniusCouncilPlugin(Plugin):
             except Exception as fallback_e:
                 return f"統合レポート作成エラー: {str(e)[:100]}"
 
-    async def _save_kb_summary(self, bot, response_text, log_page_id):
+    async def _save_kb_summary(self, bot, response_text, log_page_id, summary_page_id):
         """KB用要約を保存"""
         try:
             summary_prompt = f"以下のAI評議会最終レポートを150字以内で要約してください。\n\n{response_text}"
-            log_summary = await ask_gpt5_mini(bot.openai_client, summary_prompt)
+            with bulkhead_pool("background"):
+                log_summary = await ask_gpt5_mini(bot.openai_client, summary_prompt)
 
             new_section_id = await find_latest_section_id(log_page_id)
-            await append_summary_to_kb(log_page_id, new_section_id, log_summary)
+            new_section_id = await append_summary_to_kb(log_page_id, new_section_id, log_summary)
+            if not new_section_id:
+                # 書き込めなかったセクションは要約に紐付けない
+                return
+            await mark_rolling_summary_section(summary_page_id, new_section_id)
 
             safe_log("📝 AI評議会KB要約保存完了: ", new_section_id)
 
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+AIプロバイダーのモデル・クライアントハンドルのレジストリ
+(プロバイダー, モデル, 安全設定, 生成設定) ごとにハンドルを1度だけ生成して使い回す
+Gemini の GenerativeModel 等の生成コストをリクエストのたびに払わないようにする
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+def _freeze(value: Any) -> Hashable:
+    """dict/list を含む設定値をキーに使えるハッシュ可能な形に変換"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def make_handle_key(provider: str, model: str, safety: Optional[str] = None,
+                    generation_config: Optional[Dict[str, Any]] = None) -> Tuple:
+    """
+    ハンドルのキーを作成
+    safety は安全設定のプロファイル名（設定オブジェクトそのものはハッシュできないため名前で区別する）
+    """
+    return (provider, model, safety, _freeze(generation_config or {}))
+
+class ProviderRegistry:
+    """生成済みハンドルをキーごとに保持"""
+
+    def __init__(self):
+        self.handles: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()  # _key_locks の保護用
+        self._key_locks: Dict[Tuple, threading.RLock] = {}
+
+        # 統計
+        self.constructed: Dict[Tuple, int] = {}
+        self.reused: Dict[Tuple, int] = {}
+        self.construct_time = 0.0
+        self.failures = 0
+
+    def _key_lock(self, key: Tuple) -> threading.RLock:
+        """キーごとのロック（生成中に別キーを取得しても互いに待たない）"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.RLock()
+            return lock
+
+    def get(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        """キーのハンドルを返す（未生成なら factory で生成して登録）"""
+        handle = self.handles.get(key)
+        if handle is None:
+            # 生成はレジストリ全体のロックの外で行う（factory 内で別キーを get しても詰まらない）
+            with self._key_lock(key):
+                handle = self.handles.get(key)
+                if handle is None:
+                    start_time = time.monotonic()
+                    handle = factory()
+                    self.construct_time += time.monotonic() - start_time
+                    self.handles[key] = handle
+                    self.constructed[key] = self.constructed.get(key, 0) + 1
+                    return handle
+        self.reused[key] = self.reused.get(key, 0) + 1
+        return handle
+
+    def warm_up(self, entries: Iterable[Tuple[Tuple, Callable[[], Any]]]) -> int:
+        """起動時にハンドルを先に生成しておく（失敗したものは初回呼び出し時に再試行される）"""
+        warmed = 0
+        for key, factory in entries:
+            try:
+                self.get(key, factory)
+                warmed += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ プロバイダーハンドルの事前生成に失敗 {key[:2]}: {e}")
+        return warmed
+
+    def clear(self) -> None:
+        """保持しているハンドルを破棄（統計は残す）"""
+        with self._lock:
+            self.handles.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        handles = {}
+        for key in set(self.constructed) | set(self.reused):
+            provider, model, safety, _ = key
+            name = f"{provider}:{model}" + (f":{safety}" if safety else "")
+            entry = handles.setdefault(name, {"constructed": 0, "reused": 0})
+            entry["constructed"] += self.constructed.get(key, 0)
+            entry["reused"] += self.reused.get(key, 0)
+        return {
+            "handles": handles,
+            "cached": len(self.handles),
+            "constructed": sum(self.constructed.values()),
+            "reused": sum(self.reused.values()),
+            "construct_time": f"{self.construct_time:.3f}s",
+            "failures": self.failures
+        }
+
+
+# グローバルプロバイダーレジストリ
+_provider_registry: Optional[ProviderRegistry] = None
+
+def get_provider_registry() -> ProviderRegistry:
+    """プロバイダーレジストリを取得（シングルトン）"""
+    global _provider_registry
+    if _provider_registry is None:
+        _provider_registry = ProviderRegistry()
+    return _provider_registry
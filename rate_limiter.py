@@ -53,6 +53,8 @@ class RateLimitBucket:
         self.burst_reset_time = 0.0
         self.total_requests = 0
         self.denied_requests = 0
+        self.blocked_until = 0.0  # Retry-After等によるサービス側からの待機指示
+        self.endpoint_stats: Dict[str, Dict[str, float]] = {}
 
     def check_rate_limit(self) -> RateLimitResult:
         """レート制限をチェック"""
@@ -66,6 +68,17 @@ class RateLimitBucket:
             self.burst_count = 0
             self.burst_reset_time = current_time
 
+        # サービス側の待機指示（429のRetry-After）チェック
+        if current_time < self.blocked_until:
+            wait_time = self.blocked_until - current_time
+            self.denied_requests += 1
+            return RateLimitResult(
+                status=RateLimitStatus.LIMITED,
+                allowed=False,
+                wait_time=wait_time,
+                message=f"サービス側の待機指示: {wait_time:.1f}秒待機"
+            )
+
         # クールダウンチェック
         if current_time - self.last_request_time < self.config.cooldown_seconds:
             wait_time = self.config.cooldown_seconds - (current_time - self.last_request_time)
@@ -151,6 +164,26 @@ class RateLimitBucket:
         self.burst_count += 1
         self.total_requests += 1
 
+    def defer_until(self, until: float) -> None:
+        """指定時刻まで新規リクエストを止める"""
+        self.blocked_until = max(self.blocked_until, until)
+
+    def record_endpoint(self, endpoint: str, latency: float, outcome: str) -> None:
+        """
+        エンドポイント別の結果を記録
+        outcome: "ok" / "rate_limited" / "error" / "retry" / "throttled"
+        """
+        stats = self.endpoint_stats.setdefault(endpoint, {
+            "calls": 0, "ok": 0, "rate_limited": 0, "error": 0, "retry": 0, "throttled": 0,
+            "total_latency": 0.0
+        })
+        if outcome == "retry":
+            stats["retry"] += 1
+            return
+        stats["calls"] += 1
+        stats[outcome] = stats.get(outcome, 0) + 1
+        stats["total_latency"] += latency
+
     def _cleanup_old_requests(self, current_time: float) -> None:
         """古いリクエスト記録を削除"""
         # 1分より古いものを削除
@@ -183,7 +216,19 @@ class RateLimitBucket:
                 "day": f"{len(self.day_requests)}/{self.config.requests_per_day}",
             },
             "burst_count": self.burst_count,
-            "last_request": self.last_request_time
+            "last_request": self.last_request_time,
+            "endpoints": {
+                endpoint: {
+                    "calls": int(stats["calls"]),
+                    "ok": int(stats["ok"]),
+                    "rate_limited": int(stats["rate_limited"]),
+                    "errors": int(stats["error"]),
+                    "retries": int(stats["retry"]),
+                    "throttled": int(stats["throttled"]),
+                    "avg_latency": f"{stats['total_latency'] / max(stats['calls'], 1):.2f}s"
+                }
+                for endpoint, stats in self.endpoint_stats.items()
+            }
         }
 
 class GlobalRateLimiter:
@@ -260,6 +305,15 @@ class GlobalRateLimiter:
                 cooldown_seconds=2.0,
                 priority_weight=1.2
             ),
+            "notion": RateLimitConfig(
+                service_name="Notion",
+                requests_per_minute=180,  # 平均3リクエスト/秒
+                requests_per_hour=10800,
+                requests_per_day=200000,
+                burst_limit=180,
+                cooldown_seconds=0.34,
+                priority_weight=1.0
+            ),
         }
 
     def get_bucket(self, service_name: str) -> RateLimitBucket:
@@ -282,26 +336,52 @@ class GlobalRateLimiter:
 
             return result
 
-    async def acquire_request_slot(self, service_name: str, priority: float = 1.0) -> RateLimitResult:
-        """リクエストスロットを取得"""
+    async def acquire_request_slot(self, service_name: str, priority: float = 1.0,
+                                   max_wait_seconds: Optional[float] = None) -> RateLimitResult:
+        """
+        リクエストスロットを取得
+        max_wait_seconds: 指定時は3回で諦めず、待機合計がこの秒数に達するまで順番待ちする
+        """
         max_retries = 3
-        for attempt in range(max_retries):
-            result = await self.check_rate_limit(service_name, priority)
+        waited = 0.0
+        attempt = 0
+        while True:
+            async with self.global_lock:
+                bucket = self.get_bucket(service_name)
+                result = bucket.check_rate_limit()
+
+                # 優先度による調整
+                if not result.allowed and priority < 0.5:  # 高優先度リクエスト
+                    result.wait_time *= 0.7  # 待機時間を短縮
 
-            if result.allowed:
-                async with self.global_lock:
-                    bucket = self.get_bucket(service_name)
+                if result.allowed:
+                    # チェックと記録を同じロック内で行い、同時通過を防ぐ
                     bucket.record_request()
                     safe_log(f"🟢 レート制限OK: ", f"{service_name} - 残り{result.remaining_requests}回")
-                return result
+                    return result
+
+            attempt += 1
+            if max_wait_seconds is None:
+                can_wait = attempt < max_retries
             else:
-                if attempt < max_retries - 1:
-                    safe_log(f"🟡 レート制限待機: ", f"{service_name} - {result.wait_time:.1f}秒")
-                    await asyncio.sleep(min(result.wait_time, 30))  # 最大30秒待機
-                else:
-                    safe_log(f"🔴 レート制限拒否: ", f"{service_name} - {result.message}")
+                can_wait = waited + result.wait_time <= max_wait_seconds
+
+            if not can_wait:
+                safe_log(f"🔴 レート制限拒否: ", f"{service_name} - {result.message}")
+                return result
+
+            wait_time = min(result.wait_time, 30)  # 最大30秒待機
+            safe_log(f"🟡 レート制限待機: ", f"{service_name} - {wait_time:.1f}秒")
+            await asyncio.sleep(wait_time)
+            waited += wait_time
+
+    def defer_service(self, service_name: str, seconds: float) -> None:
+        """サービス側から待機を指示された場合に、全呼び出し元の新規リクエストを止める"""
+        self.get_bucket(service_name).defer_until(time.time() + seconds)
 
-        return result
+    def record_endpoint_call(self, service_name: str, endpoint: str, latency: float, outcome: str) -> None:
+        """エンドポイント別の呼び出し結果を記録"""
+        self.get_bucket(service_name).record_endpoint(endpoint, latency, outcome)
 
     def get_all_stats(self) -> Dict[str, Dict]:
         """全サービスの統計を取得"""
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+ヘッジリクエスト
+主AIの応答が観測レイテンシの指定パーセンタイルを過ぎても返らない場合に、同等のバックアップAIへ同じリクエストを送り、
+先に返った応答を採用してもう一方をキャンセルする（テールレイテンシ対策）
+ヘッジ数は予算（通常リクエストの一定割合）で制限し、コストが倍にならないようにする
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+@dataclass
+class HedgePolicy:
+    """タスクタイプごとのヘッジ設定"""
+    backup: str  # バックアップAIタイプ
+    percentile: float = 0.95  # 主AIの観測レイテンシのこのパーセンタイルを過ぎたらヘッジ
+    budget_ratio: float = 0.1  # ヘッジできるリクエストの割合
+    min_samples: int = 20  # これより観測が少ない間はヘッジしない
+    min_delay: float = 1.0  # ヘッジまでの最短待ち（秒）
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["HedgePolicy"]:
+        """task_configs.yaml の hedging 設定から作成（backup がなければ無効）"""
+        if not config or not config.get("backup"):
+            return None
+        return cls(
+            backup=config["backup"],
+            percentile=float(config.get("percentile", 0.95)),
+            budget_ratio=float(config.get("budget_ratio", 0.1)),
+            min_samples=int(config.get("min_samples", 20)),
+            min_delay=float(config.get("min_delay", 1.0))
+        )
+
+class LatencyTracker:
+    """直近のレイテンシを保持してパーセンタイルを返す"""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+class HedgeBudget:
+    """通常リクエストごとに budget_ratio ずつ貯まり、ヘッジ1回で1消費するトークンバケット"""
+
+    def __init__(self, ratio: float, burst: float = 2.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+
+    def deposit(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class RequestHedger:
+    """AIタイプごとのレイテンシ・ヘッジ予算・勝敗を管理"""
+
+    def __init__(self, is_failure: Optional[Callable[[Any], bool]] = None):
+        # 例外を送出せずにエラー文字列を返すクライアントのため、応答が失敗扱いかを判定する関数
+        self.is_failure = is_failure or (lambda result: False)
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.budgets: Dict[str, HedgeBudget] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def record_latency(self, ai_type: str, seconds: float) -> None:
+        self.latencies.setdefault(ai_type, LatencyTracker()).record(seconds)
+
+    def hedge_delay(self, ai_type: str, policy: HedgePolicy) -> Optional[float]:
+        """ヘッジまでの待ち時間（観測が足りない場合は None = ヘッジしない）"""
+        tracker = self.latencies.get(ai_type)
+        if tracker is None or len(tracker.samples) < policy.min_samples:
+            return None
+        return max(policy.min_delay, tracker.percentile(policy.percentile))
+
+    def _failed(self, task: asyncio.Task) -> bool:
+        """完了したタスクが例外またはエラー応答か"""
+        return task.exception() is not None or self.is_failure(task.result())
+
+    def _count(self, ai_type: str, key: str) -> None:
+        entry = self.stats.setdefault(ai_type, {
+            "requests": 0, "hedged": 0, "primary_wins": 0, "backup_wins": 0, "budget_denied": 0
+        })
+        entry[key] += 1
+
+    async def run(self, ai_type: str, policy: HedgePolicy,
+                  primary: Callable[[], Awaitable[Any]], backup: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        主AIを呼び、ヘッジ待ち時間を過ぎたらバックアップも呼んで先に成功した方を返す
+        両方失敗した場合は主AIの例外（またはエラー応答）を返す
+        """
+        self._count(ai_type, "requests")
+        budget = self.budgets.setdefault(ai_type, HedgeBudget(policy.budget_ratio))
+        budget.ratio = policy.budget_ratio
+        budget.deposit()
+
+        delay = self.hedge_delay(ai_type, policy)
+        start_time = time.monotonic()
+        primary_task = asyncio.create_task(primary())
+
+        raced = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary_task}, timeout=delay)
+                if not done:
+                    if budget.try_spend():
+                        raced = True
+                        return await self._race(ai_type, primary_task, backup, start_time)
+                    self._count(ai_type, "budget_denied")
+            return await primary_task
+        finally:
+            if not primary_task.done():
+                primary_task.cancel()
+            elif not raced and not primary_task.cancelled() and not self._failed(primary_task):
+                # エラー応答の速さはレイテンシ分布に入れない（ヘッジ待ち時間が短く偏るため）
+                self.record_latency(ai_type, time.monotonic() - start_time)
+
+    async def _race(self, ai_type: str, primary_task: asyncio.Task, backup: Callable[[], Awaitable[Any]],
+                    start_time: float) -> Any:
+        """主AIとバックアップのうち先に成功した応答を返し、もう一方をキャンセル（エラー応答は勝ちにしない）"""
+        self._count(ai_type, "hedged")
+        backup_task = asyncio.create_task(backup())
+        pending = {primary_task, backup_task}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not self._failed(task):
+                        winner = task
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is None:
+            if primary_task.exception() is not None:
+                raise primary_task.exception()
+            return primary_task.result()
+
+        # バックアップが勝った場合も経過時間を主AIのレイテンシの下限として記録（分布が短い側に偏らないように）
+        self.record_latency(ai_type, time.monotonic() - start_time)
+
+        won_by_primary = winner is primary_task
+        self._count(ai_type, "primary_wins" if won_by_primary else "backup_wins")
+        print(f"🏁 ヘッジ結果 ({ai_type}): {'主AI' if won_by_primary else 'バックアップ'}が先に応答")
+        return winner.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        result = {}
+        for ai_type, entry in self.stats.items():
+            tracker = self.latencies.get(ai_type)
+            p95 = tracker.percentile(0.95) if tracker else None
+            result[ai_type] = dict(
+                entry,
+                hedge_rate=f"{entry['hedged'] / max(entry['requests'], 1):.1%}",
+                backup_win_rate=f"{entry['backup_wins'] / max(entry['hedged'], 1):.1%}",
+                p95_latency=f"{p95:.2f}s" if p95 is not None else None
+            )
+        return result
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+テキスト置換リライターのマイクロベンチマーク（依存関係なし）
+従来の逐次置換（str.replace × N + re.sub）と1回走査のコンパイル済みリライターを比較
+"""
+
+import statistics
+import time
+
+from test_text_rewriter import sequential_rewrite
+from text_rewriter import DEFAULT_RULE_SETS, TextRewriter, parse_rule_sets
+
+# 通常の議事録（置換対象はまれ）と、置換対象が密集したテキスト
+SPARSE_PARAGRAPH = "今日の議事録では、新しい機能の設計方針とテスト計画について話し合った。次回までに資料を準備する。\n" * 40 + "吉川氏の危険な件。\n"
+DENSE_PARAGRAPH = (
+    "吉川英佑氏の件について、計画的に進められた取引の経緯を整理する。"
+    "関係者は違法性はないと主張しているが、危険な兆候や悪質な勧誘の記録も残っている。\n"
+)
+
+def measure(func, text: str, repeat: int) -> float:
+    """中央値の実行時間（ミリ秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def sized(paragraph: str, size_kb: int) -> str:
+    return paragraph * (size_kb * 1024 // len(paragraph.encode("utf-8")) + 1)
+
+def run_benchmark():
+    """テキストサイズ・置換密度・規則数ごとに比較"""
+    rewriter = TextRewriter(parse_rule_sets(DEFAULT_RULE_SETS))
+
+    print("=== Text Rewriter Benchmark ===")
+    print(f"{'テキスト':<8} {'サイズ':>8} {'逐次置換':>10} {'1回走査':>10} {'比率':>8}")
+    for label, paragraph in (("sparse", SPARSE_PARAGRAPH), ("dense", DENSE_PARAGRAPH)):
+        for size_kb in (10, 100, 500):
+            text = sized(paragraph, size_kb)
+            assert rewriter.rewrite(text) == sequential_rewrite(text)
+
+            sequential_ms = measure(sequential_rewrite, text, repeat=20)
+            compiled_ms = measure(rewriter.rewrite, text, repeat=20)
+            print(f"{label:<10} {size_kb:>6}KB {sequential_ms:>8.2f}ms {compiled_ms:>8.2f}ms {sequential_ms / compiled_ms:>7.2f}x")
+
+    # 規則を増やしたとき（逐次置換は規則数に比例して走査回数が増える）
+    extra_literals = {f"用語{i:03d}": f"語{i:03d}" for i in range(100)}
+    rule_sets = DEFAULT_RULE_SETS + [{"name": "extra", "literals": extra_literals}]
+    large_rewriter = TextRewriter(parse_rule_sets(rule_sets))
+
+    def sequential_large(text: str) -> str:
+        text = sequential_rewrite(text)
+        for source, replacement in extra_literals.items():
+            text = text.replace(source, replacement)
+        return text
+
+    text = sized(SPARSE_PARAGRAPH, 500)
+    assert large_rewriter.rewrite(text) == sequential_large(text)
+    sequential_ms = measure(sequential_large, text, repeat=10)
+    compiled_ms = measure(large_rewriter.rewrite, text, repeat=10)
+    print(f"{'rules+100':<10} {500:>6}KB {sequential_ms:>8.2f}ms {compiled_ms:>8.2f}ms {sequential_ms / compiled_ms:>7.2f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
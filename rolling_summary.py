@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+ページごとのローリング要約
+前回要約に反映済みのブロック位置を記録し、新しく追記されたブロック（差分）だけを要約して既存要約に畳み込む
+毎ターンの要約コストを「全チャンク要約 + 統合」から「差分の要約1回」に抑える
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+
+from bulkhead import bulkhead_pool
+from notion_store import NotionBlockStore, RollingSummaryRecord
+
+# 差分を既存要約に畳み込む関数 (既存要約, 差分テキスト) -> 更新後の要約
+FoldFunc = Callable[[str, str], Awaitable[Optional[str]]]
+# テキストを一から要約する関数
+SummarizeFunc = Callable[[str], Awaitable[Optional[str]]]
+
+# 0ページに記録する論点サマリーの見出し（要約自身が次回の差分に混ざらないよう、畳み込み時に除外する）
+SUMMARY_LOG_LABEL = "論点サマリー:"
+_LOG_CHUNK_CHARS = 1900  # notion_utils.log_response の分割単位
+
+def _is_summary_log(text: str) -> bool:
+    """log_response で記録した論点サマリーの先頭ブロック（「🤖 名前 (日時):」の次行が見出し）か"""
+    header, _, body = text.partition("\n")
+    return header.startswith("🤖 ") and body.startswith(SUMMARY_LOG_LABEL)
+
+def strip_summary_logs(blocks: List[tuple]) -> List[tuple]:
+    """
+    論点サマリーの記録ブロックを除いたブロック一覧を返す
+    log_response は 1900 文字ごとに分割するため、満杯のブロックの次は同じ記録の続きとして除く
+    """
+    result = []
+    continuing = False
+    for block in blocks:
+        text = block[1]
+        if continuing:
+            continuing = len(text) >= _LOG_CHUNK_CHARS
+            continue
+        if _is_summary_log(text):
+            continuing = len(text.partition("\n")[2]) >= _LOG_CHUNK_CHARS
+            continue
+        result.append(block)
+    return result
+
+def _digest_blocks(blocks: List[tuple]) -> str:
+    return hashlib.sha256("\n".join(block[1] for block in blocks).encode("utf-8")).hexdigest()
+
+def _is_valid_summary(summary: Optional[str]) -> bool:
+    return bool(summary) and "エラー" not in summary
+
+class RollingSummaryManager:
+    """ページIDごとのローリング要約を管理"""
+
+    def __init__(self, max_delta_chars: int = 12000):
+        """
+        Args:
+            max_delta_chars: これを超える差分は先に単独で要約してから畳み込む
+        """
+        self.max_delta_chars = max_delta_chars
+        self.records: Dict[str, RollingSummaryRecord] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+        # 統計
+        self.unchanged_hits = 0
+        self.delta_updates = 0
+        self.rebuilds = 0
+        self.failures = 0
+
+    async def _load(self, page_id: str, store: Optional[NotionBlockStore]) -> Optional[RollingSummaryRecord]:
+        record = self.records.get(page_id)
+        if record is None and store is not None:
+            try:
+                record = await store.load_rolling_summary_async(page_id)
+            except Exception as e:
+                print(f"⚠️ ローリング要約の読み込みに失敗(ID: {page_id}): {e}")
+            if record is not None:
+                self.records[page_id] = record
+        return record
+
+    async def _save(self, record: RollingSummaryRecord, store: Optional[NotionBlockStore]) -> None:
+        self.records[record.page_id] = record
+        if store is not None:
+            try:
+                await store.save_rolling_summary_async(record)
+            except Exception as e:
+                print(f"⚠️ ローリング要約の書き込みに失敗(ID: {record.page_id}): {e}")
+
+    def covered_position(self, record: RollingSummaryRecord, blocks: List[tuple]) -> Optional[int]:
+        """
+        要約に反映済みのブロック数を返す
+        反映済み範囲が編集・削除されていた場合は None（一から作り直す）
+        """
+        count = record.covered_blocks
+        if count <= 0 or count > len(blocks):
+            return None
+        if blocks[count - 1][0] != record.covered_block_id:
+            return None
+        if _digest_blocks(blocks[:count]) != record.covered_digest:
+            return None
+        return count
+
+    async def update(self, page_id: str, blocks: List[tuple], fold: FoldFunc, summarize: SummarizeFunc,
+                     store: Optional[NotionBlockStore] = None) -> Optional[str]:
+        """
+        ブロック一覧 (block_id, text, last_edited_time) に合わせて要約を更新して返す
+
+        Args:
+            fold: 既存要約に差分を畳み込む（通常はこれ1回で済む）
+            summarize: 要約がない・反映済み範囲が変わった・差分が大きすぎる場合に使う
+        """
+        if not blocks:
+            return None
+
+        lock = self.locks.setdefault(page_id, asyncio.Lock())
+        async with lock:
+            record = await self._load(page_id, store)
+            covered = self.covered_position(record, blocks) if record else None
+
+            if covered is not None and covered == len(blocks):
+                self.unchanged_hits += 1
+                return record.summary
+
+            if covered is not None:
+                delta_text = "\n".join(block[1] for block in blocks[covered:])
+                if len(delta_text) > self.max_delta_chars:
+                    # 大きな差分は単独で要約してから畳み込む
+                    delta_text = await summarize(delta_text)
+                summary = await fold(record.summary, delta_text) if _is_valid_summary(delta_text) else None
+                kind = "差分更新"
+            else:
+                summary = await summarize("\n".join(block[1] for block in blocks))
+                kind = "再構築"
+
+            if not _is_valid_summary(summary):
+                self.failures += 1
+                print(f"⚠️ ローリング要約の{kind}に失敗(ID: {page_id})、前回の要約を使用します")
+                return record.summary if record else None
+
+            if covered is not None:
+                self.delta_updates += 1
+            else:
+                self.rebuilds += 1
+            print(f"📝 ローリング要約を{kind}: ページ(ID: {page_id}) {covered or 0}→{len(blocks)}ブロック")
+
+            await self._save(RollingSummaryRecord(
+                page_id=page_id,
+                summary=summary,
+                covered_block_id=blocks[-1][0],
+                covered_blocks=len(blocks),
+                covered_digest=_digest_blocks(blocks),
+                section_id=record.section_id if record else None,
+                updated_at=time.time()
+            ), store)
+            return summary
+
+    async def mark_section(self, page_id: str, section_id: str, store: Optional[NotionBlockStore] = None) -> None:
+        """append_summary_to_kb が書き込んだセクションIDを要約に紐付ける"""
+        record = await self._load(page_id, store)
+        if record is None:
+            return
+        record.section_id = section_id
+        await self._save(record, store)
+
+    def get_section_id(self, page_id: str) -> Optional[str]:
+        """要約に紐付いた最新のセクションID"""
+        record = self.records.get(page_id)
+        return record.section_id if record else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            "pages": {
+                page_id: {
+                    "covered_blocks": record.covered_blocks,
+                    "section_id": record.section_id,
+                    "summary_chars": len(record.summary),
+                    "updated_at": record.updated_at
+                }
+                for page_id, record in self.records.items()
+            },
+            "unchanged_hits": self.unchanged_hits,
+            "delta_updates": self.delta_updates,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures
+        }
+
+
+# グローバルローリング要約マネージャー
+_rolling_summary_manager: Optional[RollingSummaryManager] = None
+
+def get_rolling_summary_manager() -> RollingSummaryManager:
+    """ローリング要約マネージャーを取得（シングルトン）"""
+    global _rolling_summary_manager
+    if _rolling_summary_manager is None:
+        from unified_task_engine import get_unified_task_engine
+        settings = get_unified_task_engine().config_loader.get_context_strategy("council_optimized")
+        _rolling_summary_manager = RollingSummaryManager(
+            max_delta_chars=settings.get("max_delta_chars", 12000)
+        )
+    return _rolling_summary_manager
+
+async def get_rolling_summary(bot, page_id: str) -> Optional[str]:
+    """
+    Notionページのローリング要約を取得（新しく追記されたブロックだけを要約して畳み込む）
+    要約AIは gpt5mini、差分が大きい場合・初回は summarize_text_chunks で一から要約する
+    """
+    import notion_utils
+    from ai_clients import ask_gpt5_mini
+    from unified_task_engine import get_unified_task_engine
+    from utils import summarize_text_chunks
+
+    settings = get_unified_task_engine().config_loader.get_context_strategy("council_optimized")
+    max_summary_chars = settings.get("max_summary_chars", 2000)
+
+    blocks = await notion_utils.get_notion_page_blocks(page_id)
+    if blocks is None:
+        return None
+    blocks = strip_summary_logs(blocks)
+
+    async def fold(summary: str, delta_text: str) -> Optional[str]:
+        prompt = (f"以下は、あるNotionページの【これまでの要約】と、その後ページに追記された【追加分】です。\n"
+                  f"追加分の内容を反映して要約を更新してください。論点・決定事項・未解決課題を残し、"
+                  f"{max_summary_chars}文字以内で出力してください。\n\n"
+                  f"【これまでの要約】\n{summary}\n\n【追加分】\n{delta_text}")
+        return await ask_gpt5_mini(bot.openai_client, prompt)
+
+    async def summarize(text: str) -> Optional[str]:
+        return await summarize_text_chunks(bot, None, text, "このページの論点・決定事項・未解決課題", "gpt5mini")
+
+    with bulkhead_pool("summary"):
+        return await get_rolling_summary_manager().update(
+            page_id, blocks, fold, summarize, store=notion_utils.notion_store
+        )
+
+async def build_council_context(page_id: str, query: str, summary: str) -> str:
+    """
+    ローリング要約（ページ全体の論点）に、議題に関連するブロックをローカル検索で加えた評議会用コンテキスト
+    関連ブロックがない場合はページ末尾を使う（要約AIは呼ばない）
+    """
+    import notion_utils
+    from unified_task_engine import get_unified_task_engine
+
+    settings = get_unified_task_engine().config_loader.get_context_strategy("council_optimized")
+    top_k = settings.get("relevant_top_k", 6)
+    max_chars = settings.get("relevant_max_chars", 3000)
+
+    hits = await notion_utils.search_notion_page(page_id, query, top_k=top_k, max_chars=max_chars)
+    relevant = "\n".join(hit.text for hit in hits if not _is_summary_log(hit.text))
+    if not relevant:
+        tail_text = await notion_utils.get_notion_page_tail(page_id, max_chars)
+        relevant = "" if tail_text.startswith("ERROR:") else tail_text
+    if not relevant:
+        return summary
+    return f"{summary}\n\n【議題に関連する記録】\n{relevant}"
+
+async def log_rolling_summary(page_id: str, summary: str, bot_name: str) -> None:
+    """論点サマリーを0ページに記録（次回の畳み込みでは strip_summary_logs で除外される）"""
+    import notion_utils
+    await notion_utils.log_response(page_id, f"{SUMMARY_LOG_LABEL}\n{summary}", bot_name)
+
+async def mark_rolling_summary_section(page_id: str, section_id: str) -> None:
+    """ローリング要約にKBセクションIDを紐付ける（永続ストアにも反映）"""
+    import notion_utils
+    await get_rolling_summary_manager().mark_section(page_id, section_id, store=notion_utils.notion_store)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+同一リクエストの合流（single-flight）
+応答キャッシュは保存後にしか効かないため、同じプロンプトが同時に届く（二重投稿・複数プラグインからの同じ要約依頼など）と
+両方がプロバイダーへ送られる。実行中の同一リクエストがあれば新たに送らず、その結果を待って共有する
+完了したリクエストは保持しない（キャッシュではない）
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+def make_flight_key(ai_type: str, prompt: str, system_prompt: Optional[str] = None,
+                    params: Optional[Dict[str, Any]] = None) -> str:
+    """(AIタイプ, システムプロンプト, プロンプトのハッシュ, パラメータ) から合流キーを作成"""
+    prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+    system_hash = hashlib.sha256(system_prompt.encode()).hexdigest()[:8] if system_prompt else "-"
+    params_text = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{ai_type}:{system_hash}:{prompt_hash}:{params_text}"
+
+class _Flight:
+    """実行中の1リクエストと、その結果を待っている呼び出し元の数"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """キーごとに実行中のリクエストを1つにまとめる"""
+
+    def __init__(self):
+        self.flights: Dict[str, _Flight] = {}
+
+        # 統計
+        self.leaders = 0  # 実際にプロバイダーへ送ったリクエスト
+        self.coalesced = 0  # 実行中のリクエストに合流した呼び出し
+        self.abandoned = 0  # 待つ呼び出し元がいなくなりキャンセルしたリクエスト
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        key の実行中リクエストがあればその結果を待ち、なければ func を実行する
+        func は別タスクで実行するため、最初の呼び出し元がキャンセルされても他の呼び出し元には結果が返る
+        （全員がキャンセルした場合のみリクエストもキャンセルする）
+        """
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = _Flight(asyncio.create_task(func()))
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            print(f"🔗 実行中の同一リクエストに合流: {key.split(':', 1)[0]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+                self.abandoned += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        # 完了したリクエストは破棄（後から来た同じキーは新たに送る）
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self.flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesce_rate": f"{self.coalesced / max(total, 1):.1%}",
+            "abandoned": self.abandoned
+        }
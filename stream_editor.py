@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+ストリーミング応答のDiscord表示
+生成途中のテキストを一定間隔でメッセージ編集に反映する（編集回数を抑えてDiscordのレート制限内に収める）
+2000文字を超えた分は message_splitter と同じ境界で次のメッセージに送る
+"""
+
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from message_splitter import DISCORD_MESSAGE_LIMIT, split_message
+
+STREAM_EDIT_INTERVAL = 1.2  # 編集の最小間隔（秒）
+STREAM_CURSOR = " ▌"  # 生成途中であることを示す末尾記号
+
+class ThrottledMessageEditor:
+    """ストリーミングテキストを間引いてDiscordメッセージに反映"""
+
+    def __init__(self, channel, min_interval: float = STREAM_EDIT_INTERVAL,
+                 limit: int = DISCORD_MESSAGE_LIMIT, clock=time.monotonic,
+                 send_func: Optional[Callable[[str], Awaitable[Any]]] = None):
+        """
+        Args:
+            channel: send() を持つ送信先（Discordチャンネル等）
+            min_interval: 編集の最小間隔（秒）
+            clock: 現在時刻（テスト用に差し替え可能）
+            send_func: 新しいメッセージの送信方法（省略時は channel.send。送信キューを通す場合に指定）
+        """
+        self.channel = channel
+        self.send_func = send_func or channel.send
+        self.min_interval = min_interval
+        self.limit = limit
+        self.clock = clock
+
+        self.text = ""
+        self.messages: List[Any] = []
+        self.rendered: List[str] = []
+        self.last_render = 0.0
+
+        # 統計
+        self.sends = 0
+        self.edits = 0
+        self.skipped_renders = 0
+
+    async def _render(self, content: str) -> None:
+        """表示内容をメッセージ群に反映（変化のあったメッセージだけ送信・編集）"""
+        chunks = split_message(content, self.limit)
+        for index, chunk in enumerate(chunks):
+            if index < len(self.messages):
+                if self.rendered[index] != chunk:
+                    await self.messages[index].edit(content=chunk)
+                    self.rendered[index] = chunk
+                    self.edits += 1
+            else:
+                self.messages.append(await self.send_func(chunk))
+                self.rendered.append(chunk)
+                self.sends += 1
+
+        # 最終テキストが短くなった場合の余分なメッセージを削除
+        while len(self.messages) > len(chunks):
+            await self.messages.pop().delete()
+            self.rendered.pop()
+        self.last_render = self.clock()
+
+    async def append(self, text: str) -> None:
+        """テキストを追加し、前回の表示から min_interval 経過していれば反映"""
+        if not text:
+            return
+        self.text += text
+        if self.messages and self.clock() - self.last_render < self.min_interval:
+            self.skipped_renders += 1
+            return
+        await self._render(self.text + STREAM_CURSOR)
+
+    async def finish(self, final_text: Optional[str] = None) -> str:
+        """
+        最終テキストを反映して完了（後処理で追記されたテキストがあれば差し替える）
+        Returns: 表示したテキスト
+        """
+        if final_text is not None:
+            self.text = final_text
+        await self._render(self.text or "（応答が空でした）")
+        return self.text
+
+    def get_stats(self) -> Dict[str, int]:
+        """統計情報を取得"""
+        return {
+            "messages": len(self.messages),
+            "sends": self.sends,
+            "edits": self.edits,
+            "skipped_renders": self.skipped_renders
+        }
+
+async def stream_to_discord(channel, chunks: AsyncIterator[str], min_interval: float = STREAM_EDIT_INTERVAL) -> ThrottledMessageEditor:
+    """
+    ストリーミング応答をDiscordに逐次表示
+    Returns: 表示に使ったエディター（finish で最終テキストを確定させる）
+    """
+    editor = ThrottledMessageEditor(channel, min_interval=min_interval)
+    async for text in chunks:
+        await editor.append(text)
+    return editor
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+要約キャッシュ
+summarize_text_chunks の結果を (ページ内容ハッシュ, 正規化クエリ, 要約モデル) で再利用する
+"""
+
+import time
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Optional, Any
+from dataclasses import dataclass, field
+from collections import OrderedDict
+
+@dataclass
+class SummaryCacheEntry:
+    """要約キャッシュエントリ"""
+    summary: str
+    llm_calls: int  # この要約の生成に使ったLLM呼び出し回数
+    timestamp: float = field(default_factory=time.time)
+    hit_count: int = 0
+
+class SummaryCache:
+    """TTL + LRU の要約キャッシュ"""
+
+    def __init__(self, ttl_seconds: int = 600, max_entries: int = 100):
+        """
+        Args:
+            ttl_seconds: キャッシュの有効期限（秒）
+            max_entries: 最大キャッシュエントリ数
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache: OrderedDict[str, SummaryCacheEntry] = OrderedDict()
+        self.lock = threading.RLock()
+
+        # 統計
+        self.hit_count = 0
+        self.miss_count = 0
+        self.llm_calls_saved = 0
+        self.llm_calls_made = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """全角半角・大文字小文字・空白の違いを吸収"""
+        normalized = unicodedata.normalize("NFKC", query or "").lower()
+        return " ".join(normalized.split())
+
+    def make_key(self, text: str, query: str, model_choice: str) -> str:
+        """キャッシュキーを生成"""
+        content_hash = hashlib.sha256(text.encode()).hexdigest()
+        base_key = f"{content_hash}|{self.normalize_query(query)}|{model_choice}"
+        return hashlib.sha256(base_key.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """有効な要約を返す（なければNone）"""
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and time.time() - entry.timestamp > self.ttl_seconds:
+                del self.cache[key]
+                entry = None
+
+            if entry is None:
+                self.miss_count += 1
+                return None
+
+            entry.hit_count += 1
+            self.hit_count += 1
+            self.llm_calls_saved += entry.llm_calls
+            self.cache.move_to_end(key)
+            return entry.summary
+
+    def set(self, key: str, summary: str, llm_calls: int) -> None:
+        """要約を保存"""
+        with self.lock:
+            self.llm_calls_made += llm_calls
+            while len(self.cache) >= self.max_entries:
+                self.cache.popitem(last=False)
+            self.cache[key] = SummaryCacheEntry(summary=summary, llm_calls=llm_calls)
+
+    def clear(self) -> int:
+        """キャッシュをクリア"""
+        with self.lock:
+            cleared_count = len(self.cache)
+            self.cache.clear()
+            return cleared_count
+
+    def get_detailed_stats(self) -> Dict[str, Any]:
+        """詳細統計を取得"""
+        with self.lock:
+            total_requests = self.hit_count + self.miss_count
+            hit_rate = self.hit_count / total_requests if total_requests > 0 else 0.0
+            return {
+                "hits": self.hit_count,
+                "misses": self.miss_count,
+                "hit_rate": f"{hit_rate:.1%}",
+                "llm_calls_saved": self.llm_calls_saved,
+                "llm_calls_made": self.llm_calls_made,
+                "total_entries": len(self.cache),
+                "config": {
+                    "ttl_seconds": self.ttl_seconds,
+                    "max_entries": self.max_entries
+                }
+            }
+
+
+# グローバル要約キャッシュ
+_summary_cache: Optional[SummaryCache] = None
+
+def get_summary_cache() -> SummaryCache:
+    """要約キャッシュを取得（シングルトン、TTLと容量は config.yaml から）"""
+    global _summary_cache
+    if _summary_cache is None:
+        ttl_seconds, max_entries = 600, 100
+        try:
+            from config_manager import get_config_manager
+            cache_config = get_config_manager().get_cache_config()
+            ttl_seconds = cache_config.summary_ttl
+            max_entries = cache_config.summary_max_entries
+        except Exception as e:
+            print(f"⚠️ 要約キャッシュ設定の読み込み失敗、デフォルト値を使用: {e}")
+        _summary_cache = SummaryCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        print(f"✅ 要約キャッシュ初期化完了 TTL: {ttl_seconds}秒, 最大{max_entries}件")
+    return _summary_cache
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+バルクヘッド（同時実行枠）のテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from bulkhead import BulkheadRegistry, PrioritySemaphore, bulkhead_pool, bulkheaded, get_bulkheads
+
+def test_priority_admission_order():
+    """枠が空いたら優先度の値が小さい待ちリクエストから通すこと"""
+    async def run():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        order = []
+
+        async def waiter(name, priority):
+            await semaphore.acquire(priority)
+            order.append(name)
+            semaphore.release()
+
+        tasks = [
+            asyncio.create_task(waiter("fanout", 1.5)),
+            asyncio.create_task(waiter("background", 3.0)),
+            asyncio.create_task(waiter("channel", 0.5)),
+        ]
+        await asyncio.sleep(0)
+        assert semaphore.get_stats()["waiting"] == 3
+        semaphore.release()
+        await asyncio.gather(*tasks)
+        assert order == ["channel", "fanout", "background"]
+        assert semaphore.get_stats()["queued"] == 3
+
+    asyncio.run(run())
+    print("OK: 優先度順の受け入れ")
+    return True
+
+def test_pool_isolation():
+    """background 枠が埋まっていても interactive の呼び出しは待たされないこと"""
+    async def run():
+        registry = BulkheadRegistry()
+        registry.configure({"openai": {"background": 1, "interactive": 2}})
+        assert registry.get_limit("openai", "background") == 1
+        assert registry.get_limit("claude", "interactive") == 4  # default
+
+        release = asyncio.Event()
+
+        async def hold_background():
+            async with registry.slot("openai", "background"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold_background())
+        await asyncio.sleep(0)
+        # background は満杯だが interactive は即座に取れる
+        async def interactive_call():
+            async with registry.slot("openai", "interactive"):
+                return registry.get_stats()["openai"]
+
+        stats = await asyncio.wait_for(interactive_call(), timeout=0.1)
+        assert stats["background"]["in_flight"] == 1
+        assert stats["interactive"]["in_flight"] == 1
+        assert stats["interactive"]["queued"] == 0
+        release.set()
+        await holder
+
+    asyncio.run(run())
+    print("OK: 処理区分の分離")
+    return True
+
+def test_context_pool_and_reentrancy():
+    """bulkhead_pool の区分がタスクに引き継がれ、同じサービスの入れ子では枠を二重に取らないこと"""
+    async def run():
+        registry = get_bulkheads()
+        registry.configure({"testsvc": {"summary": 1}})
+
+        @bulkheaded("testsvc")
+        async def inner():
+            return registry.get_stats()["testsvc"]["summary"]["in_flight"]
+
+        async def outer():
+            async with registry.slot("testsvc"):
+                return await asyncio.wait_for(inner(), timeout=0.1)
+
+        with bulkhead_pool("summary"):
+            results = await asyncio.gather(outer(), outer())
+        assert results == [1, 1]
+        assert registry.get_stats()["testsvc"]["summary"]["in_flight"] == 0
+        assert "interactive" not in registry.get_stats()["testsvc"]
+
+    asyncio.run(run())
+    print("OK: 区分の引き継ぎと入れ子")
+    return True
+
+def test_cancelled_waiter_does_not_leak():
+    """待機中にキャンセルされたリクエストが枠を消費しないこと"""
+    async def run():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        task = asyncio.create_task(semaphore.acquire(1.0))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        semaphore.release()
+        assert semaphore.in_flight == 0
+        assert await semaphore.acquire() == 0.0
+        assert semaphore.in_flight == 1
+
+    asyncio.run(run())
+    print("OK: 待機中のキャンセル")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Bulkhead Test ===")
+
+    tests = [
+        test_priority_admission_order,
+        test_pool_isolation,
+        test_context_pool_and_reentrancy,
+        test_cancelled_waiter_does_not_leak,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+サーキットブレーカーのテスト（単体）
+"""
+
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerConfig, CircuitBreakerRegistry
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+CONFIG = CircuitBreakerConfig(window=10, min_calls=4, error_rate=0.5, slow_call_seconds=5.0, slow_rate=0.75, open_seconds=30.0)
+
+def test_opens_on_error_rate():
+    """エラー率が閾値を超えると遮断し、遮断中は呼び出しを通さないこと"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("claude", CONFIG, clock=clock)
+    for success in (True, False, True):
+        assert breaker.allow_request()
+        breaker.record(success, 1.0)
+    assert breaker.state == CLOSED  # min_calls 未満
+
+    breaker.record(False, 1.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.is_open()
+    assert breaker.get_stats()["short_circuited"] == 2
+    print("OK: エラー率による遮断")
+    return True
+
+def test_opens_on_slow_calls():
+    """遅延率が閾値を超えると遮断すること"""
+    breaker = CircuitBreaker("perplexity", CONFIG, clock=FakeClock())
+    for latency in (6.0, 7.0, 8.0, 1.0):
+        breaker.record(True, latency)
+    assert breaker.state == OPEN
+    assert breaker.last_reason.startswith("遅延率")
+    print("OK: 遅延率による遮断")
+    return True
+
+def test_half_open_single_trial():
+    """遮断時間後は試行リクエストを1件だけ通し、成功で復帰・失敗で再遮断すること"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("grok", CONFIG, clock=clock)
+    for _ in range(4):
+        breaker.record(False, 1.0)
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # 試行中は他の呼び出しを通さない
+    breaker.record(False, 1.0)
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    assert breaker.allow_request()
+    breaker.record(True, 1.0)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    print("OK: 半開状態の試行リクエスト")
+    return True
+
+def test_registry_configure():
+    """設定から閾値・代替AIを読み込み、サービスごとに独立したブレーカーになること"""
+    registry = CircuitBreakerRegistry()
+    registry.configure({"min_calls": 2, "error_rate": 1.0, "fallbacks": {"claude": "gpt4o"}})
+    assert registry.get_fallback("claude") == "gpt4o"
+    assert registry.get_fallback("grok") is None
+
+    claude = registry.get("claude")
+    claude.record(False)
+    claude.record(False)
+    assert claude.state == OPEN
+    assert registry.get("openai").state == CLOSED
+    assert registry.get_all_stats()["services"]["claude"]["state"] == OPEN
+    print("OK: レジストリの設定")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Circuit Breaker Test ===")
+
+    tests = [
+        test_opens_on_error_rate,
+        test_opens_on_slow_calls,
+        test_half_open_single_trial,
+        test_registry_configure,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
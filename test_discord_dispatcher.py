@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Discord送信ディスパッチャーのテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from discord_dispatcher import MERGE_SEPARATOR, OutboundDispatcher
+
+class FakeChannel:
+    def __init__(self, fail: bool = False):
+        self.sent = []
+        self.fail = fail
+
+    async def send(self, content, **kwargs):
+        if self.fail:
+            raise RuntimeError("送信失敗")
+        self.sent.append((content, kwargs))
+        return f"message-{len(self.sent)}"
+
+def test_short_messages_are_merged():
+    """連続する短いメッセージが1通にまとまり、順序が保たれること"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = OutboundDispatcher()
+        for i in range(5):
+            dispatcher.enqueue("channel:1", f"報告{i}", channel.send)
+        await dispatcher.flush()
+
+        assert len(channel.sent) == 1
+        assert channel.sent[0][0] == MERGE_SEPARATOR.join(f"報告{i}" for i in range(5))
+        stats = dispatcher.get_stats()
+        assert stats["sent"] == 1 and stats["merged"] == 4 and stats["queue_depth"] == {}
+
+    asyncio.run(run())
+    print("OK: 短いメッセージの結合")
+    return True
+
+def test_limit_and_unmergeable_messages():
+    """2000文字を超える結合はせず、send() や添付付きは単独で送られること"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = OutboundDispatcher()
+        dispatcher.enqueue("channel:1", "あ" * 1500, channel.send)
+        dispatcher.enqueue("channel:1", "い" * 1500, channel.send)
+        dispatcher.enqueue("channel:1", "添付", channel.send, file="response.md")
+        result = await dispatcher.send("channel:1", "編集用", channel.send)
+        await dispatcher.flush()
+
+        assert [content for content, _ in channel.sent] == ["あ" * 1500, "い" * 1500, "添付", "編集用"]
+        assert channel.sent[2][1] == {"file": "response.md"}
+        assert result == "message-4"
+
+    asyncio.run(run())
+    print("OK: 結合の上限と単独送信")
+    return True
+
+def test_route_rate_limit():
+    """ルート単位の送信数制限を超えると待機すること（ルートごとに独立）"""
+    async def run():
+        channel = FakeChannel()
+        dispatcher = OutboundDispatcher(route_rate=2, route_period=0.2)
+        started = time.monotonic()
+        for i in range(3):
+            await dispatcher.send("channel:1", f"a{i}", channel.send)
+        elapsed = time.monotonic() - started
+        assert elapsed >= 0.15
+
+        started = time.monotonic()
+        await dispatcher.send("channel:2", "b", channel.send)
+        assert time.monotonic() - started < 0.1
+        assert float(dispatcher.get_stats()["throttle_wait_total"].rstrip("s")) > 0
+
+    asyncio.run(run())
+    print("OK: ルート単位の送信制限")
+    return True
+
+def test_send_failure():
+    """送信失敗は send() の呼び出し元にだけ例外として返り、キューは止まらないこと"""
+    async def run():
+        failing = FakeChannel(fail=True)
+        channel = FakeChannel()
+        dispatcher = OutboundDispatcher()
+        dispatcher.enqueue("channel:1", "失敗", failing.send)
+        try:
+            await dispatcher.send("channel:1", "失敗2", failing.send)
+            raise AssertionError("例外が返されていない")
+        except RuntimeError:
+            pass
+        dispatcher.enqueue("channel:1", "成功", channel.send)
+        await dispatcher.flush()
+
+        assert channel.sent[0][0] == "成功"
+        assert dispatcher.get_stats()["failed"] == 2
+
+    asyncio.run(run())
+    print("OK: 送信失敗の扱い")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Discord Dispatcher Test ===")
+
+    tests = [
+        test_short_messages_are_merged,
+        test_limit_and_unmergeable_messages,
+        test_route_rate_limit,
+        test_send_failure,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+HTTPセッションプールのテスト（単体）
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+import types
+from dataclasses import dataclass
+from typing import Optional
+from unittest import mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+@dataclass
+class _FakeClientTimeout:
+    total: Optional[float] = None
+    connect: Optional[float] = None
+
+def _import_http_pool():
+    """aiohttp が無い環境では ClientTimeout だけを持つダミーで http_pool を読み込む"""
+    try:
+        import aiohttp  # noqa: F401
+        return importlib.import_module("http_pool")
+    except ImportError:
+        fake = types.ModuleType("aiohttp")
+        fake.ClientTimeout = _FakeClientTimeout
+        fake.ClientSession = object
+        with mock.patch.dict(sys.modules, {"aiohttp": fake}):
+            sys.modules.pop("http_pool", None)
+            return importlib.import_module("http_pool")
+
+class _SlowResponse:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self, content_type=None):
+        await asyncio.sleep(self.delay)
+        return {"ok": True}
+
+class _SlowSession:
+    """aiohttp と同様に、渡された timeout を締め切りとして扱うセッション（None は無期限）"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.timeouts = []
+        self.closed = False
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        session = self
+
+        class _Request:
+            async def __aenter__(self):
+                total = getattr(timeout, "total", None)
+                self.response = _SlowResponse(session.delay)
+                if total is not None:
+                    self.response.json = _with_deadline(self.response.json, total)
+                return self.response
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Request()
+
+def _with_deadline(func, seconds):
+    async def wrapper(*args, **kwargs):
+        return await asyncio.wait_for(func(*args, **kwargs), timeout=seconds)
+    return wrapper
+
+def test_default_deadline_enforced():
+    """呼び出しごとの timeout を省略してもプールの締め切りで打ち切られること"""
+    http_pool = _import_http_pool()
+
+    async def run():
+        pool = http_pool.HTTPSessionPool(total_timeout=0.05, connect_timeout=0.01)
+        session = _SlowSession(delay=1.0)
+        with mock.patch.object(pool, "_get_session", return_value=session):
+            try:
+                await pool.post_json("https://api.perplexity.ai/chat/completions", {"q": 1})
+                assert False, "締め切りが効いていない"
+            except asyncio.TimeoutError:
+                pass
+        sent = session.timeouts[0]
+        assert sent is not None and sent.total == 0.05 and sent.connect == 0.01
+        assert pool.get_stats()["timeouts"] == 1
+
+    asyncio.run(run())
+    print("OK: 既定の締め切り")
+    return True
+
+def test_per_call_timeout():
+    """呼び出しごとの timeout はプールの既定値より優先されること"""
+    http_pool = _import_http_pool()
+
+    async def run():
+        pool = http_pool.HTTPSessionPool(total_timeout=0.01)
+        session = _SlowSession(delay=0.02)
+        with mock.patch.object(pool, "_get_session", return_value=session):
+            assert await pool.post_json("https://api.x.ai/v1/chat/completions", {}, timeout=1.0) == {"ok": True}
+        assert session.timeouts[0].total == 1.0
+        assert pool.get_stats()["errors"] == 0
+
+    asyncio.run(run())
+    print("OK: 呼び出しごとの締め切り")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== HTTP Session Pool Test ===")
+
+    tests = [
+        test_default_deadline_enforced,
+        test_per_call_timeout,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Discordメッセージ分割のテスト（単体）
+"""
+
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from message_splitter import DISCORD_MESSAGE_LIMIT, split_message
+
+PARAGRAPH = "これはテスト用の段落です。" * 40
+
+def test_split_on_paragraph_boundaries():
+    """段落の区切りで分割され、内容が欠けないこと"""
+    text = "\n\n".join(f"{i}: {PARAGRAPH}" for i in range(6))
+    chunks = split_message(text)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= DISCORD_MESSAGE_LIMIT for chunk in chunks)
+    # 各メッセージは段落の先頭から始まる
+    assert all(chunk[0].isdigit() for chunk in chunks)
+    assert "\n\n".join(chunks) == text
+    assert split_message("短いメッセージ") == ["短いメッセージ"]
+
+    print("OK: 段落境界での分割")
+    return True
+
+def test_code_fence_is_reopened():
+    """コードブロックをまたぐ場合、各メッセージでフェンスが閉じていること"""
+    code = "```python\n" + "\n".join(f"print({i})  # 行{i}" for i in range(300)) + "\n```"
+    chunks = split_message(f"説明です。\n\n{code}\n\nまとめです。")
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= DISCORD_MESSAGE_LIMIT
+        assert chunk.count("```") % 2 == 0
+    assert chunks[1].startswith("```python\n")
+    assert chunks[-1].endswith("まとめです。")
+
+    print("OK: コードブロックの開き直し")
+    return True
+
+def test_long_line_splits_on_sentences():
+    """改行のない長い文章は文の区切りで分割されること"""
+    text = "長い文章の一文です。" * 500
+    chunks = split_message(text)
+
+    assert all(len(chunk) <= DISCORD_MESSAGE_LIMIT for chunk in chunks)
+    assert all(chunk.endswith("。") for chunk in chunks)
+    assert "".join(chunks) == text
+
+    print("OK: 文単位の分割")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Message Splitter Test ===")
+
+    tests = [
+        test_split_on_paragraph_boundaries,
+        test_code_fence_is_reopened,
+        test_long_line_splits_on_sentences,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
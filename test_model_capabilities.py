@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+モデルのパラメータ対応表のテスト（単体）
+"""
+
+import os
+import sys
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from model_capabilities import CapabilityRegistry
+
+MAX_TOKENS_ERROR = ("Error code: 400 - Unsupported parameter: 'max_tokens' is not supported with this model. "
+                    "Use 'max_completion_tokens' instead.")
+TEMPERATURE_ERROR = ("Error code: 400 - Unsupported value: 'temperature' does not support 0.7 with this model. "
+                     "Only the default (1) value is supported.")
+
+def test_learn_from_rejections():
+    """拒否から学習し、次回は最初から正しいパラメータになること"""
+    registry = CapabilityRegistry()
+    params = {"model": "gpt-5", "messages": [], "temperature": 0.7}
+
+    request = registry.apply("gpt-5", params, max_tokens=2000)
+    assert request["max_tokens"] == 2000 and request["temperature"] == 0.7
+
+    assert registry.learn("gpt-5", Exception(MAX_TOKENS_ERROR), request)
+    request = registry.apply("gpt-5", params, max_tokens=2000)
+    assert "max_tokens" not in request and "max_completion_tokens" not in request
+
+    assert registry.learn("gpt-5", Exception(TEMPERATURE_ERROR), request)
+    request = registry.apply("gpt-5", params, max_tokens=2000)
+    assert "temperature" not in request
+    assert params["temperature"] == 0.7  # 元の dict は変更しない
+
+    # 関係のないエラーは再送しない
+    assert not registry.learn("gpt-5", Exception("Rate limit exceeded"), request)
+    # 他のモデルには影響しない
+    assert registry.apply("gpt-4o", params, max_tokens=2000)["max_tokens"] == 2000
+    print("OK: 拒否からの学習")
+    return True
+
+def test_concurrent_rejection_still_retries():
+    """学習済みの後に届いた同じ拒否（並行リクエスト）も再送扱いになること"""
+    registry = CapabilityRegistry()
+    params = {"model": "o3", "messages": [], "temperature": 0.7}
+    first = registry.apply("o3", params, max_tokens=2000)
+    second = registry.apply("o3", params, max_tokens=2000)
+
+    assert registry.learn("o3", Exception(MAX_TOKENS_ERROR), first)
+    assert registry.learn("o3", Exception(MAX_TOKENS_ERROR), second)
+    assert registry.get_stats()["learned"] == 1
+    print("OK: 並行リクエストの拒否")
+    return True
+
+def test_seed_and_persistence():
+    """設定で初期化でき、学習結果は再起動後も残り、設定より優先されること"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model_capabilities.json")
+        registry = CapabilityRegistry(path)
+        registry.seed("gpt-5-mini", {"token_param": "none", "temperature": False})
+        registry.seed("gpt-4o", {"token_param": "max_completion_tokens"})
+
+        request = registry.apply("gpt-5-mini", {"temperature": 0.7}, max_tokens=500)
+        assert request == {}
+        assert registry.apply("gpt-4o", {"temperature": 0.7}, max_tokens=500) == {
+            "temperature": 0.7, "max_completion_tokens": 500
+        }
+        assert not os.path.exists(path)  # 設定由来の値は保存しない
+
+        sent = registry.apply("o3", {"temperature": 0.7}, max_tokens=2000)
+        registry.learn("o3", Exception(TEMPERATURE_ERROR), sent)
+
+        restarted = CapabilityRegistry(path)
+        assert restarted.get("o3").supports_temperature is False
+        assert restarted.get("o3").source == "learned"
+        restarted.seed("o3", {"temperature": True})
+        assert restarted.get("o3").supports_temperature is False
+    print("OK: 設定による初期化と永続化")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Model Capabilities Test ===")
+
+    tests = [
+        test_learn_from_rejections,
+        test_concurrent_rejection_still_retries,
+        test_seed_and_persistence,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
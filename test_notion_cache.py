@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Notion共有キャッシュのテスト（シングルフライト）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_cache import NotionCache
+
+def test_concurrent_misses_share_one_fetch():
+    """同時ミスが1回の取得に合流すること"""
+    async def run():
+        cache = NotionCache(ttl_seconds=300)
+        calls = []
+
+        async def fetch(page_ids):
+            calls.append(page_ids)
+            await asyncio.sleep(0.05)
+            return "ページ本文"
+
+        results = await asyncio.gather(*[
+            cache.get_cached_page_text(["page-a", "page-b"], fetch) for _ in range(5)
+        ])
+        # 順序違いのページ集合は同じキー → キャッシュヒット
+        cached = await cache.get_cached_page_text(["page-b", "page-a"], fetch)
+        return cache, calls, results, cached
+
+    cache, calls, results, cached = asyncio.run(run())
+    stats = cache.get_cache_stats()
+
+    assert len(calls) == 1
+    assert results == ["ページ本文"] * 5
+    assert cached == "ページ本文"
+    assert (stats.miss_count, stats.coalesced_count, stats.hit_count) == (1, 4, 1)
+    assert not cache.in_flight
+
+    print("OK: 同時ミスの合流")
+    return True
+
+def test_errors_are_not_cached():
+    """エラー結果はキャッシュされず、次回再取得されること"""
+    async def run():
+        cache = NotionCache(ttl_seconds=300)
+        responses = ["ERROR: Notion API Error - timeout", "ページ本文"]
+
+        async def fetch(page_ids):
+            return responses.pop(0)
+
+        first = await cache.get_cached_page_text(["page-a"], fetch)
+        second = await cache.get_cached_page_text(["page-a"], fetch)
+        return cache, first, second
+
+    cache, first, second = asyncio.run(run())
+
+    assert first.startswith("ERROR:")
+    assert second == "ページ本文"
+    assert cache.get_cache_stats().miss_count == 2
+
+    print("OK: エラー結果の非キャッシュ")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Cache Test ===")
+
+    tests = [
+        test_concurrent_misses_share_one_fetch,
+        test_errors_are_not_cached,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
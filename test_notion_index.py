@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Notion検索インデックスのテスト（単体）
+"""
+
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_index import NotionSearchIndex, tokenize
+
+BLOCKS = [
+    ("b1", "今日はカレーを食べた", "t1"),
+    ("b2", "Pythonのasyncioで並行処理を書く", "t1"),
+    ("b3", "明日の会議の議題は予算について", "t1"),
+    ("b4", "カレーのレシピ：玉ねぎを炒めてから煮込む", "t1"),
+]
+
+def test_tokenize_japanese_and_ascii():
+    """日本語はbigram、英数字は単語になること"""
+    tokens = tokenize("ＡＰＩの予算")
+    assert "api" in tokens
+    assert "予算" in tokens and "の予" in tokens
+
+    print("OK: トークン化")
+    return True
+
+def test_search_returns_relevant_blocks_in_document_order():
+    """関連ブロックが文字数予算内・文書順で返ること"""
+    index = NotionSearchIndex()
+    index.update_page("page-a", BLOCKS)
+
+    hits = index.search("page-a", "カレーの作り方", top_k=2, max_chars=200)
+    assert [hit.block_id for hit in hits] == ["b1", "b4"]
+
+    # 予算を超えるブロックは選ばれない
+    hits = index.search("page-a", "カレーの作り方", top_k=2, max_chars=15)
+    assert [hit.block_id for hit in hits] == ["b1"]
+
+    print("OK: 関連ブロック検索")
+    return True
+
+def test_incremental_update_only_reindexes_changed_blocks():
+    """変更・削除されたブロックだけが反映されること"""
+    index = NotionSearchIndex()
+    assert index.update_page("page-a", BLOCKS) == 4
+
+    updated = [BLOCKS[0], BLOCKS[1], ("b3", "来週の予定は未定", "t2")]
+    assert index.update_page("page-a", updated) == 1
+
+    assert index.search("page-a", "カレー レシピ", top_k=5, max_chars=1000)[0].block_id == "b1"
+    assert index.search("page-a", "会議の議題") == []
+
+    print("OK: 差分更新")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Search Index Test ===")
+
+    tests = [
+        test_tokenize_japanese_and_ascii,
+        test_search_returns_relevant_blocks_in_document_order,
+        test_incremental_update_only_reindexes_changed_blocks,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Notion APIリトライ（Retry-After・ジッター）のテスト（フェイクのAsyncClientを使用）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_test_fakes import FakeNotion, FakeNotionError, FakeRateLimiter, fake_notion_utils
+
+PAGE = "page-log"
+ENDPOINT = "blocks.children.list"
+
+def test_rate_limited_call_honours_retry_after():
+    """429はRetry-After＋ジッター分だけ全体を待機させ、リトライで成功すること"""
+    fake = FakeNotion()
+    fake.add_block(PAGE, "one")
+    fake.list_errors.append(FakeNotionError(429, {"retry-after": "0.05"}))
+    limiter = FakeRateLimiter()
+
+    async def run(notion_utils):
+        notion_utils.NOTION_RETRY_BASE_DELAY = 0.01
+        response = await notion_utils._list_block_children(PAGE)
+        assert [block["id"] for block in response["results"]] == [fake.children[PAGE][0]["id"]]
+        assert len(fake.list_calls) == 2
+
+        assert len(limiter.deferred) == 1
+        assert 0.05 <= limiter.deferred[0] <= 0.06  # Retry-After + ジッター（0〜基準遅延）
+        assert limiter.outcomes == [(ENDPOINT, "rate_limited"), (ENDPOINT, "retry"), (ENDPOINT, "ok")]
+
+    with fake_notion_utils(fake, limiter) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 429のRetry-After")
+    return True
+
+def test_server_error_retries_without_deferring():
+    """5xxは指数バックオフでリトライするが、サービス全体の待機は行わないこと"""
+    fake = FakeNotion()
+    fake.add_block(PAGE, "one")
+    fake.list_errors.extend([FakeNotionError(503), FakeNotionError(502)])
+    limiter = FakeRateLimiter()
+
+    async def run(notion_utils):
+        notion_utils.NOTION_RETRY_BASE_DELAY = 0.01
+        await notion_utils._list_block_children(PAGE)
+        assert len(fake.list_calls) == 3
+        assert limiter.deferred == []
+        assert [outcome for _, outcome in limiter.outcomes] == ["error", "retry", "error", "retry", "ok"]
+
+    with fake_notion_utils(fake, limiter) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 5xxのリトライ")
+    return True
+
+def test_non_retryable_and_exhausted_errors_raise():
+    """400は即座に、リトライ上限を超えた429は最後のエラーを送出すること"""
+    fake = FakeNotion()
+    fake.add_block(PAGE, "one")
+    limiter = FakeRateLimiter()
+
+    async def run(notion_utils):
+        notion_utils.NOTION_RETRY_BASE_DELAY = 0.01
+        fake.list_errors.append(FakeNotionError(400))
+        try:
+            await notion_utils._list_block_children(PAGE)
+            raise AssertionError("400 が送出されていない")
+        except FakeNotionError as e:
+            assert e.status == 400
+        assert len(fake.list_calls) == 1
+        assert limiter.outcomes == [(ENDPOINT, "error")]
+
+        fake.list_errors.extend(
+            FakeNotionError(429, {"retry-after": "0"}) for _ in range(notion_utils.NOTION_MAX_RETRIES + 1)
+        )
+        try:
+            await notion_utils._list_block_children(PAGE)
+            raise AssertionError("リトライ上限後に 429 が送出されていない")
+        except FakeNotionError as e:
+            assert e.status == 429
+        assert len(fake.list_calls) == 1 + notion_utils.NOTION_MAX_RETRIES + 1
+        assert len(limiter.deferred) == notion_utils.NOTION_MAX_RETRIES
+
+    with fake_notion_utils(fake, limiter) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: リトライしないエラー・上限超過")
+    return True
+
+def test_append_is_not_retried_after_possible_write():
+    """追記は5xx・タイムアウトでは再送せず（重複防止）、429だけをリトライすること"""
+    fake = FakeNotion()
+    limiter = FakeRateLimiter()
+    children = [{"paragraph": {"rich_text": [{"text": {"content": "ログ"}}]}}]
+
+    async def run(notion_utils):
+        notion_utils.NOTION_RETRY_BASE_DELAY = 0.01
+        for error in (FakeNotionError(503), asyncio.TimeoutError()):
+            fake.append_errors.append(error)
+            try:
+                await notion_utils._append_block_children(PAGE, children)
+                raise AssertionError(f"{error!r} が送出されていない")
+            except (FakeNotionError, asyncio.TimeoutError):
+                pass
+        assert fake.append_calls == [(PAGE, 1), (PAGE, 1)]  # どちらも1回だけ
+        assert "retry" not in [outcome for _, outcome in limiter.outcomes]
+
+        fake.append_errors.append(FakeNotionError(429, {"retry-after": "0"}))
+        await notion_utils._append_block_children(PAGE, children)
+        assert len(fake.append_calls) == 4
+        assert fake.texts(PAGE) == ["ログ"]
+        assert limiter.outcomes[-3:] == [
+            ("blocks.children.append", "rate_limited"), ("blocks.children.append", "retry"),
+            ("blocks.children.append", "ok")
+        ]
+
+    with fake_notion_utils(fake, limiter) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 追記の再送抑止")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Retry Test ===")
+
+    tests = [
+        test_rate_limited_call_honours_retry_after,
+        test_server_error_retries_without_deferring,
+        test_non_retryable_and_exhausted_errors_raise,
+        test_append_is_not_retried_after_possible_write,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+KBセクション番号インデックスのテスト（フェイクのAsyncClientを使用）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_test_fakes import FakeNotion, FakeNotionError, fake_notion_utils
+
+KB_PAGE = "page-kb"
+
+def _make_kb_page() -> FakeNotion:
+    """150ブロックのうち §005 が先頭100件より後ろにあるKBページ"""
+    fake = FakeNotion()
+    sections = {10: "§001", 40: "§002", 80: "§003", 110: "§004", 140: "§005"}
+    for position in range(150):
+        section = sections.get(position)
+        fake.add_block(KB_PAGE, f"{section} 要約 (01/01 00:00)" if section else f"メモ {position}")
+    return fake
+
+def test_scan_covers_whole_page():
+    """先頭100件を超えるページでも最新のセクション番号から続くこと（初回のみ全件スキャン）"""
+    fake = _make_kb_page()
+
+    async def run(notion_utils):
+        assert await notion_utils.find_latest_section_id(KB_PAGE) == "§006"
+        assert len(fake.list_calls) == 2  # 100件 + 残り50件
+        assert await notion_utils.find_latest_section_id(KB_PAGE) == "§006"
+        assert len(fake.list_calls) == 2  # 2回目はインデックスから
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 全件スキャン")
+    return True
+
+def test_lookup_after_append_and_edit():
+    """追記後はAPIを呼ばずに次の番号を返し、外部編集後は再スキャンで取り直すこと"""
+    fake = _make_kb_page()
+
+    async def run(notion_utils):
+        section_id = await notion_utils.find_latest_section_id(KB_PAGE)
+        assert await notion_utils.append_summary_to_kb(KB_PAGE, section_id, "新しい要約") == "§006"
+        assert fake.texts(KB_PAGE)[-1].startswith("§006 新しい要約")
+
+        calls = len(fake.list_calls)
+        assert await notion_utils.find_latest_section_id(KB_PAGE) == "§007"
+        assert len(fake.list_calls) == calls
+
+        # ページが手動で編集された（§010 が追記された）場合はインデックスを破棄して取り直す
+        fake.add_block(KB_PAGE, "§010 手動で追加")
+        notion_utils.invalidate_section_index(KB_PAGE)
+        assert await notion_utils.find_latest_section_id(KB_PAGE) == "§011"
+        assert notion_utils.get_section_index_stats() == {KB_PAGE: "§010"}
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 追記・編集後の番号")
+    return True
+
+def test_concurrent_appends_renumber():
+    """同じ番号で並行して追記した場合、後の書き込みは次の番号に振り直されること"""
+    fake = _make_kb_page()
+
+    async def run(notion_utils):
+        first_id, second_id = await asyncio.gather(
+            notion_utils.find_latest_section_id(KB_PAGE),
+            notion_utils.find_latest_section_id(KB_PAGE)
+        )
+        assert first_id == second_id == "§006"
+        used = [
+            await notion_utils.append_summary_to_kb(KB_PAGE, first_id, "A"),
+            await notion_utils.append_summary_to_kb(KB_PAGE, second_id, "B"),
+        ]
+        assert used == ["§006", "§007"]
+        assert [text.split(" ")[0] for text in fake.texts(KB_PAGE)[-2:]] == ["§006", "§007"]
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 並行追記の振り直し")
+    return True
+
+def test_failed_append_returns_none():
+    """書き込みに失敗した場合は None を返し、次回は全件スキャンで番号を取り直すこと"""
+    fake = _make_kb_page()
+
+    async def run(notion_utils):
+        section_id = await notion_utils.find_latest_section_id(KB_PAGE)
+        fake.append_errors.append(FakeNotionError(503))
+        assert await notion_utils.append_summary_to_kb(KB_PAGE, section_id, "失敗する要約") is None
+        assert not any(text.startswith("§006") for text in fake.texts(KB_PAGE))
+        assert KB_PAGE not in notion_utils.get_section_index_stats()
+
+        calls = len(fake.list_calls)
+        assert await notion_utils.find_latest_section_id(KB_PAGE) == "§006"
+        assert len(fake.list_calls) > calls
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 書き込み失敗時の戻り値")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Section Index Test ===")
+
+    tests = [
+        test_scan_covers_whole_page,
+        test_lookup_after_append_and_edit,
+        test_concurrent_appends_renumber,
+        test_failed_append_returns_none,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Notionブロックストアのテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_store import NotionBlockStore
+
+def _make_store(temp_dir: str) -> NotionBlockStore:
+    store = NotionBlockStore(os.path.join(temp_dir, "notion_blocks.db"))
+    store.open()
+    return store
+
+def test_save_and_load_page():
+    """ページの保存と復元"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _make_store(temp_dir)
+        blocks = [
+            ("block-1", "§001 最初の要約", "2025-01-01T00:00:00.000Z"),
+            ("block-2", "§002 次の要約", "2025-01-01T00:01:00.000Z"),
+        ]
+        store.save_page("page-a", blocks, "block-2", "2025-01-01T00:01:00.000Z", 100.0)
+        store.close()
+
+        # 再オープン（再起動相当）しても内容が残っていること
+        reopened = _make_store(temp_dir)
+        stored = reopened.load_page("page-a")
+        reopened.close()
+
+        assert stored is not None
+        assert stored.blocks == blocks
+        assert stored.last_block_id == "block-2"
+        assert stored.full_synced_at == 100.0
+        assert reopened.load_page("missing-page") is None
+
+    print("OK: ページの保存と復元")
+    return True
+
+def test_incremental_save_rewrites_tail_only():
+    """差分保存で末尾だけが書き換わること"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _make_store(temp_dir)
+        blocks = [("b1", "one", "t1"), ("b2", "two", "t1")]
+        store.save_page("page-b", blocks, "b2", "t1", 1.0)
+
+        # 末尾ブロックの編集 + 新規ブロック追加
+        blocks = [("b1", "one", "t1"), ("b2", "two (edited)", "t2"), ("b3", "three", "t2")]
+        store.save_page("page-b", blocks, "b3", "t2", 1.0, from_position=1)
+
+        stored = store.load_page("page-b")
+        store.close()
+
+        assert stored.blocks == blocks
+        assert stored.last_block_id == "b3"
+        assert store.get_stats()["blocks_written"] == 4
+
+    print("OK: 差分保存")
+    return True
+
+def test_delete_page():
+    """ページ削除"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = _make_store(temp_dir)
+        store.save_page("page-c", [("b1", "text", "t1")], "b1", "t1", 1.0)
+        store.delete_page("page-c")
+        assert store.load_page("page-c") is None
+        store.close()
+
+    print("OK: ページ削除")
+    return True
+
+def test_async_io_runs_off_event_loop():
+    """非同期インターフェースはイベントループのスレッド外で実行され、書き込み順が保たれること"""
+    async def run(temp_dir):
+        store = NotionBlockStore(os.path.join(temp_dir, "notion_blocks.db"))
+        loop_thread = threading.get_ident()
+        io_threads = []
+        original_save = store.save_page
+
+        def recording_save(*args, **kwargs):
+            io_threads.append(threading.get_ident())
+            return original_save(*args, **kwargs)
+
+        store.save_page = recording_save
+        blocks = [("b1", "one", "t1")]
+        # 待たずに続けて投入しても、後の書き込みが最終状態になる
+        first = asyncio.ensure_future(store.save_page_async("page-a", blocks, "b1", "t1", 1.0))
+        blocks.append(("b2", "two", "t2"))  # 投入後の変更は1回目の書き込みに影響しない
+        second = asyncio.ensure_future(store.save_page_async("page-a", blocks, "b2", "t2", 2.0, from_position=1))
+        await asyncio.gather(first, second)
+
+        stored = await store.load_page_async("page-a")
+        assert stored.blocks == [("b1", "one", "t1"), ("b2", "two", "t2")]
+        assert stored.last_block_id == "b2"
+        assert io_threads and loop_thread not in io_threads
+        await store.close_async()
+        assert store._executor is None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        asyncio.run(run(temp_dir))
+    print("OK: 専用スレッドでの入出力")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Block Store Test ===")
+
+    tests = [
+        test_save_and_load_page,
+        test_incremental_save_rewrites_tail_only,
+        test_delete_page,
+        test_async_io_runs_off_event_loop,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
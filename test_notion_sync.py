@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Notionページ差分同期のテスト（フェイクのAsyncClientを使用）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_test_fakes import FakeNotion, fake_notion_utils
+
+PAGE = "page-log"
+
+def test_incremental_append():
+    """2回目以降は最後に読んだブロックをカーソルにして、追記分だけを取得すること"""
+    fake = FakeNotion()
+    for text in ("one", "two", "three"):
+        fake.add_block(PAGE, text)
+
+    async def run(notion_utils):
+        assert await notion_utils._fetch_notion_page_text(PAGE) == "one\ntwo\nthree"
+        last_id = fake.children[PAGE][-1]["id"]
+
+        fake.add_block(PAGE, "four")
+        fake.add_block(PAGE, "five")
+        assert await notion_utils._fetch_notion_page_text(PAGE) == "one\ntwo\nthree\nfour\nfive"
+        assert fake.list_calls == [(PAGE, None), (PAGE, last_id)]
+
+        state = notion_utils._page_sync_states[PAGE]
+        assert state.full_sync_count == 1 and state.incremental_sync_count == 1
+        assert state.last_block_id == fake.children[PAGE][-1]["id"]
+
+        # 変化がなければカーソルのブロック1件だけを読む
+        assert await notion_utils._fetch_notion_page_text(PAGE) == "one\ntwo\nthree\nfour\nfive"
+        assert fake.list_calls[-1] == (PAGE, state.last_block_id)
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 追記分だけの差分同期")
+    return True
+
+def test_edited_last_block_and_lost_cursor():
+    """最後のブロックの編集は差し替え、カーソルのブロックが消えた場合は全件同期に戻ること"""
+    fake = FakeNotion()
+    fake.add_block(PAGE, "one")
+    last_id = fake.add_block(PAGE, "two")
+
+    async def run(notion_utils):
+        await notion_utils._fetch_notion_page_text(PAGE)
+        fake.edit_block(PAGE, last_id, "two (edited)")
+        fake.add_block(PAGE, "three")
+        assert await notion_utils._fetch_notion_page_text(PAGE) == "one\ntwo (edited)\nthree"
+
+        # カーソルのブロックを削除 → 差分同期は失敗し、全件取得で作り直す
+        fake.children[PAGE] = [block for block in fake.children[PAGE] if block["id"] != fake.children[PAGE][-1]["id"]]
+        assert await notion_utils._fetch_notion_page_text(PAGE) == "one\ntwo (edited)"
+        assert fake.list_calls[-1] == (PAGE, None)
+        assert notion_utils._page_sync_states[PAGE].full_sync_count == 2
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 編集・カーソル消失")
+    return True
+
+def test_tail_sync_reads_only_tail_range():
+    """末尾取得は末尾範囲の先頭ブロックをカーソルにして読み、全文の末尾と同じ結果になること"""
+    fake = FakeNotion()
+    for number in range(10):
+        fake.add_block(PAGE, f"entry-{number:02d}")
+
+    async def run(notion_utils):
+        await notion_utils._fetch_notion_page_text(PAGE)
+        fake.add_block(PAGE, "entry-10")
+
+        tail = await notion_utils._fetch_notion_page_tail(PAGE, 20)
+        full_text = "\n".join(fake.texts(PAGE))
+        state = notion_utils._page_sync_states[PAGE]
+        assert fake.list_calls[-1][1] is not None  # 全件ではなく末尾範囲から
+        assert tail == state.get_text()[-20:]
+        assert tail == full_text[-20:]
+        assert state.tail_sync_count == 1
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 末尾範囲の同期")
+    return True
+
+def test_nested_blocks_fetched_concurrently():
+    """子ブロックは兄弟間で並行取得し、結果は文書順に並ぶこと"""
+    fake = FakeNotion(delay=0.02)
+    fake.add_block(PAGE, "toggle-a", children=["a-1", "a-2"])
+    fake.add_block(PAGE, "plain")
+    fake.add_block(PAGE, "toggle-b", children=["b-1"])
+
+    async def run(notion_utils):
+        text = await notion_utils._fetch_notion_page_text(PAGE)
+        assert text == "toggle-a\n  a-1\n  a-2\nplain\ntoggle-b\n  b-1"
+        assert fake.max_in_flight >= 2
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 子ブロックの並行取得")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Sync Test ===")
+
+    tests = [
+        test_incremental_append,
+        test_edited_last_block_and_lost_cursor,
+        test_tail_sync_reads_only_tail_range,
+        test_nested_blocks_fetched_concurrently,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
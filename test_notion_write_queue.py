@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Notionライトビハインド書き込みキューのテスト（フェイクのAsyncClientを使用）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_test_fakes import FakeNotion, FakeNotionError, fake_notion_utils
+
+PAGE = "page-log"
+OTHER_PAGE = "page-other"
+
+def test_appends_are_merged_per_page():
+    """フラッシュ間隔内のログは1回のappendに順序どおりまとめられること"""
+    fake = FakeNotion()
+
+    async def run(notion_utils):
+        notion_utils.init_notion_write_queue(True, flush_interval=0.05)
+        await notion_utils.log_user_message(PAGE, "user", "質問")
+        await notion_utils.log_response(PAGE, "回答1", "GPT-5")
+        await notion_utils.log_response(PAGE, "回答2", "Claude")
+        assert fake.append_calls == []  # 応答パスでは書き込まない
+
+        await asyncio.sleep(0.15)
+        assert fake.append_calls == [(PAGE, 3)]
+        texts = fake.texts(PAGE)
+        assert texts[0].startswith("👤 user") and texts[1].endswith("回答1") and texts[2].endswith("回答2")
+        assert notion_utils.get_write_queue_stats()["pending_blocks"] == 0
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: ページごとの書き込みまとめ")
+    return True
+
+def test_flush_on_shutdown():
+    """シャットダウン時の flush_notion_writes で、間隔を待たずに全ページの保留分が書き込まれること"""
+    fake = FakeNotion()
+
+    async def run(notion_utils):
+        notion_utils.init_notion_write_queue(True, flush_interval=60.0)
+        await notion_utils.log_response(PAGE, "最終レポート", "Gemini")
+        await notion_utils.log_response(OTHER_PAGE, "別ページ", "GPT-5")
+        assert notion_utils.get_write_queue_stats()["pending_pages"] == 2
+
+        await notion_utils.flush_notion_writes()
+        assert sorted(fake.append_calls) == sorted([(PAGE, 1), (OTHER_PAGE, 1)])
+        stats = notion_utils.get_write_queue_stats()
+        assert stats["pending_blocks"] == 0 and stats["dropped_blocks"] == 0
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: シャットダウン時のフラッシュ")
+    return True
+
+def test_read_after_queued_write():
+    """保留中のログがあるページを読む場合は先に書き込み、読み込み結果に含めること"""
+    fake = FakeNotion()
+    fake.add_block(PAGE, "既存")
+
+    async def run(notion_utils):
+        notion_utils.init_notion_write_queue(True, flush_interval=60.0)
+        await notion_utils._fetch_notion_page_text(PAGE)
+        await notion_utils.log_user_message(PAGE, "user", "新しい質問")
+
+        text = await notion_utils._fetch_notion_page_text(PAGE)
+        assert text.startswith("既存\n👤 user") and text.endswith("新しい質問")
+        assert not notion_utils.notion_write_queue.has_pending(PAGE)
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 書き込み後の読み込み")
+    return True
+
+def test_unsent_batch_is_requeued():
+    """429で送れなかったバッチはキューの先頭に戻し、後続のログより先に書き込むこと"""
+    fake = FakeNotion()
+
+    async def run(notion_utils):
+        notion_utils.NOTION_MAX_RETRIES = 0  # _call_notion 内のリトライを省き、キューの再送だけを見る
+        notion_utils.init_notion_write_queue(True, flush_interval=60.0)
+        await notion_utils.log_response(PAGE, "1通目", "GPT-5")
+        fake.append_errors.append(FakeNotionError(429, {"retry-after": "0"}))
+        assert await notion_utils.flush_notion_writes() == 1
+        assert fake.texts(PAGE) == []
+        stats = notion_utils.get_write_queue_stats()
+        assert stats["pending_blocks"] == 1 and stats["requeued_batches"] == 1 and stats["dropped_blocks"] == 0
+
+        await notion_utils.log_response(PAGE, "2通目", "GPT-5")
+        assert await notion_utils.flush_notion_writes() == 0
+        texts = fake.texts(PAGE)
+        assert len(texts) == 2 and texts[0].endswith("1通目") and texts[1].endswith("2通目")
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 未送信バッチの再送")
+    return True
+
+def test_lost_batches_are_reported():
+    """書き込み済みの可能性がある失敗と再送上限に達したバッチは破棄し、書き込めなかった件数を返すこと"""
+    fake = FakeNotion()
+
+    async def run(notion_utils):
+        notion_utils.NOTION_MAX_RETRIES = 0
+        notion_utils.init_notion_write_queue(True, flush_interval=60.0)
+        queue = notion_utils.notion_write_queue
+
+        # 5xxは書き込み済みかもしれないので再送しない（重複防止）
+        await notion_utils.log_response(PAGE, "5xx", "GPT-5")
+        fake.append_errors.append(FakeNotionError(503))
+        assert await notion_utils.flush_notion_writes() == 1
+        assert len(fake.append_calls) == 1 and not queue.has_pending(PAGE)
+
+        # 429が続く場合は再送上限で破棄する
+        await notion_utils.log_response(OTHER_PAGE, "429", "GPT-5")
+        fake.append_errors.extend(FakeNotionError(429) for _ in range(queue.MAX_FLUSH_RETRIES + 1))
+        results = [await notion_utils.flush_notion_writes() for _ in range(queue.MAX_FLUSH_RETRIES + 1)]
+        assert results == [1] * (queue.MAX_FLUSH_RETRIES + 1)
+        assert not queue.has_pending(OTHER_PAGE) and fake.texts(OTHER_PAGE) == []
+
+        stats = notion_utils.get_write_queue_stats()
+        assert stats["dropped_blocks"] == 2 and stats["requeued_batches"] == queue.MAX_FLUSH_RETRIES
+
+    with fake_notion_utils(fake) as notion_utils:
+        asyncio.run(run(notion_utils))
+    print("OK: 書き込めなかったバッチの報告")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Notion Write Queue Test ===")
+
+    tests = [
+        test_appends_are_merged_per_page,
+        test_flush_on_shutdown,
+        test_read_after_queued_write,
+        test_unsent_batch_is_requeued,
+        test_lost_batches_are_reported,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
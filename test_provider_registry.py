@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+プロバイダーレジストリのテスト（単体）
+"""
+
+import os
+import sys
+import threading
+import types
+from unittest import mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from provider_registry import ProviderRegistry, make_handle_key
+
+def test_handles_are_reused():
+    """同じキーのハンドルは1度だけ生成され、以降は使い回されること"""
+    registry = ProviderRegistry()
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    key = make_handle_key("vertex", "gemini-2.5-pro", "block_none", {"temperature": 0.7, "max_output_tokens": 2000})
+    first = registry.get(key, factory)
+    for _ in range(5):
+        assert registry.get(key, factory) is first
+
+    # 生成設定の順序が違っても同じキー
+    same = make_handle_key("vertex", "gemini-2.5-pro", "block_none", {"max_output_tokens": 2000, "temperature": 0.7})
+    assert registry.get(same, factory) is first
+    assert len(created) == 1
+
+    stats = registry.get_stats()
+    assert stats["constructed"] == 1 and stats["reused"] == 6
+    assert stats["handles"]["vertex:gemini-2.5-pro:block_none"] == {"constructed": 1, "reused": 6}
+    print("OK: ハンドルの再利用")
+    return True
+
+def test_distinct_configs():
+    """モデル・生成設定が異なれば別のハンドルになること"""
+    registry = ProviderRegistry()
+    a = registry.get(make_handle_key("genai", "gemini-2.5-flash", "block_none", {"temperature": 0.7}), object)
+    b = registry.get(make_handle_key("genai", "gemini-2.5-flash", "block_none", {"temperature": 0.2}), object)
+    c = registry.get(make_handle_key("genai", "gemini-1.5-pro", "block_none"), object)
+    assert len({id(a), id(b), id(c)}) == 3
+    assert registry.get_stats()["cached"] == 3
+    print("OK: 設定ごとのハンドル")
+    return True
+
+def test_warm_up_failure():
+    """事前生成の失敗は記録され、後の呼び出しで再試行されること"""
+    registry = ProviderRegistry()
+    key_ok = make_handle_key("genai", "ok")
+    key_ng = make_handle_key("genai", "ng")
+
+    def broken():
+        raise RuntimeError("認証エラー")
+
+    assert registry.warm_up([(key_ok, object), (key_ng, broken)]) == 1
+    assert registry.get_stats()["failures"] == 1
+    assert registry.get(key_ng, object) is not None
+    assert registry.get_stats()["constructed"] == 2
+    print("OK: 事前生成の失敗")
+    return True
+
+def test_nested_get_does_not_deadlock():
+    """factory の中で別キーを取得してもロックで詰まらないこと"""
+    registry = ProviderRegistry()
+    inner_key = make_handle_key("genai", "inner")
+    outer_key = make_handle_key("genai", "outer")
+
+    def outer_factory():
+        return ("outer", registry.get(inner_key, object))
+
+    result = []
+    worker = threading.Thread(target=lambda: result.append(registry.get(outer_key, outer_factory)), daemon=True)
+    worker.start()
+    worker.join(timeout=2)
+    assert not worker.is_alive(), "デッドロック"
+    assert result[0][0] == "outer"
+    assert registry.get_stats()["constructed"] == 2
+    print("OK: 入れ子の取得")
+    return True
+
+class _FakeModel:
+    """GenerativeModel の代わり（生成された引数を記録する）"""
+    created = []
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.kwargs = kwargs
+        _FakeModel.created.append(self)
+
+def _fake_module(name, **attrs):
+    """未使用の属性は MagicMock を返すダミーモジュール（SDK未インストール環境での import 用）"""
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__getattr__ = lambda attr: mock.MagicMock(name=f"{name}.{attr}")
+    return module
+
+def _fake_sdk_modules():
+    genai = _fake_module("google.generativeai", GenerativeModel=_FakeModel)
+    return {
+        "openai": _fake_module("openai"),
+        "mistralai": _fake_module("mistralai"),
+        "mistralai.async_client": _fake_module("mistralai.async_client"),
+        "google": _fake_module("google", generativeai=genai),
+        "google.generativeai": genai,
+        "google.generativeai.types": _fake_module("google.generativeai.types"),
+        "vertexai": _fake_module("vertexai", init=lambda **kwargs: None),
+        "vertexai.generative_models": _fake_module("vertexai.generative_models", GenerativeModel=_FakeModel),
+        "aiohttp": _fake_module("aiohttp"),
+    }
+
+def test_warm_up_provider_models():
+    """ai_clients.warm_up_provider_models が詰まらずに全ハンドルを生成し、以降の取得で使い回されること"""
+    import provider_registry
+
+    fresh_registry = ProviderRegistry()
+    _FakeModel.created.clear()
+    with mock.patch.dict(sys.modules, _fake_sdk_modules()), \
+            mock.patch.object(provider_registry, "_provider_registry", fresh_registry):
+        sys.modules.pop("ai_clients", None)
+        import ai_clients
+
+        result = []
+        worker = threading.Thread(target=lambda: result.append(ai_clients.warm_up_provider_models()), daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+        assert not worker.is_alive(), "事前生成がデッドロック"
+        assert result == [len(ai_clients.WARM_UP_MODELS)]
+        assert len(_FakeModel.created) == len(ai_clients.WARM_UP_MODELS)
+
+        # 事前生成したハンドルがそのまま使われる
+        model = ai_clients.get_vertex_model("gemini-2.5-pro", ai_clients.GEMINI_GENERATION_CONFIG)
+        assert model is _FakeModel.created[0]
+        assert model.kwargs["safety_settings"] is ai_clients.vertex_safety_settings
+        assert len(_FakeModel.created) == len(ai_clients.WARM_UP_MODELS)
+        assert fresh_registry.get_stats()["failures"] == 0
+    print("OK: 起動時の事前生成")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Provider Registry Test ===")
+
+    tests = [
+        test_handles_are_reused,
+        test_distinct_configs,
+        test_warm_up_failure,
+        test_nested_get_does_not_deadlock,
+        test_warm_up_provider_models,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+ヘッジリクエストのテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from request_hedger import HedgePolicy, RequestHedger
+
+POLICY = HedgePolicy(backup="gpt4o", percentile=0.9, budget_ratio=0.5, min_samples=5, min_delay=0.02)
+
+def _warm_up(hedger: RequestHedger, seconds: float = 0.02) -> None:
+    for _ in range(10):
+        hedger.record_latency("gpt5mini", seconds)
+
+def _reply(text: str, delay: float, log: list):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+            return text
+        except asyncio.CancelledError:
+            log.append(f"{text}:cancelled")
+            raise
+    return call
+
+def test_backup_wins_slow_primary():
+    """主AIが遅い場合はバックアップの応答を採用し、主AIはキャンセルされること"""
+    async def run():
+        hedger = RequestHedger()
+        _warm_up(hedger)
+        log = []
+        result = await hedger.run("gpt5mini", POLICY, _reply("primary", 1.0, log), _reply("backup", 0.01, log))
+        assert result == "backup"
+        await asyncio.sleep(0)
+        assert log == ["primary:cancelled"]
+        stats = hedger.get_stats()["gpt5mini"]
+        assert stats["hedged"] == 1 and stats["backup_wins"] == 1
+        assert stats["backup_win_rate"] == "100.0%"
+
+    asyncio.run(run())
+    print("OK: バックアップの勝ち")
+    return True
+
+def test_fast_primary_not_hedged():
+    """観測不足の間と、主AIが速い場合はヘッジしないこと"""
+    async def run():
+        hedger = RequestHedger()
+        log = []
+        # 観測不足（ヘッジしない）
+        assert await hedger.run("gpt5mini", POLICY, _reply("primary", 0.05, log), _reply("backup", 0.0, log)) == "primary"
+        _warm_up(hedger, seconds=0.1)
+        assert await hedger.run("gpt5mini", POLICY, _reply("primary", 0.01, log), _reply("backup", 0.0, log)) == "primary"
+        assert hedger.get_stats()["gpt5mini"]["hedged"] == 0
+        assert log == []
+
+    asyncio.run(run())
+    print("OK: ヘッジしないケース")
+    return True
+
+def test_budget_limits_hedges():
+    """予算を使い切るとヘッジせず主AIを待つこと"""
+    async def run():
+        hedger = RequestHedger()
+        _warm_up(hedger)
+        policy = HedgePolicy(backup="gpt4o", percentile=0.9, budget_ratio=0.0, min_samples=5, min_delay=0.02)
+        results = []
+        for _ in range(4):
+            results.append(await hedger.run("gpt5mini", policy, _reply("primary", 0.06, []), _reply("backup", 0.0, [])))
+        stats = hedger.get_stats()["gpt5mini"]
+        assert stats["hedged"] == 2  # 初期バーストの2回のみ
+        assert stats["budget_denied"] == 2
+        assert results.count("primary") == 2
+
+    asyncio.run(run())
+    print("OK: ヘッジ予算")
+    return True
+
+def test_primary_failure_falls_back_to_backup():
+    """ヘッジ後に主AIが失敗した場合はバックアップの応答を待つこと"""
+    async def run():
+        hedger = RequestHedger()
+        _warm_up(hedger)
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("primary down")
+
+        assert await hedger.run("gpt5mini", POLICY, failing, _reply("backup", 0.1, [])) == "backup"
+        assert HedgePolicy.from_config({"percentile": 0.9}) is None
+        assert HedgePolicy.from_config({"backup": "gpt5", "percentile": 0.9}).percentile == 0.9
+
+    asyncio.run(run())
+    print("OK: 主AI失敗時のバックアップ")
+    return True
+
+def _is_error(result) -> bool:
+    return isinstance(result, str) and "エラー:" in result[:80]
+
+def test_error_response_does_not_win():
+    """主AIが即座にエラー文字列を返してもバックアップの応答を待ち、エラー応答のレイテンシは記録しないこと"""
+    async def run():
+        hedger = RequestHedger(is_failure=_is_error)
+        _warm_up(hedger)
+        samples = len(hedger.latencies["gpt5mini"].samples)
+
+        async def slow_error():
+            await asyncio.sleep(0.04)
+            return "GPT-5 miniエラー: 接続失敗"
+
+        result = await hedger.run("gpt5mini", POLICY, slow_error, _reply("backup", 0.1, []))
+        assert result == "backup"
+        assert hedger.get_stats()["gpt5mini"]["backup_wins"] == 1
+
+        # ヘッジ前に返ったエラー応答はそのまま返すが、レイテンシには入れない
+        fast = HedgePolicy(backup="gpt4o", percentile=0.9, budget_ratio=0.5, min_samples=5, min_delay=1.0)
+        assert await hedger.run("gpt5mini", fast, _reply("Grokエラー: 500", 0.0, []), _reply("backup", 0.0, [])) \
+            == "Grokエラー: 500"
+        assert len(hedger.latencies["gpt5mini"].samples) == samples + 1  # バックアップ勝ちの1件のみ
+
+        # 両方がエラー応答なら主AIのエラーを返す
+        assert await hedger.run("gpt5mini", POLICY, slow_error, _reply("GPT-4oエラー: 429", 0.0, [])) \
+            == "GPT-5 miniエラー: 接続失敗"
+
+    asyncio.run(run())
+    print("OK: エラー応答は勝ちにしない")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Request Hedger Test ===")
+
+    tests = [
+        test_backup_wins_slow_primary,
+        test_fast_primary_not_hedged,
+        test_budget_limits_hedges,
+        test_primary_failure_falls_back_to_backup,
+        test_error_response_does_not_win,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
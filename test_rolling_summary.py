@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+ローリング要約のテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from notion_store import NotionBlockStore
+from rolling_summary import SUMMARY_LOG_LABEL, RollingSummaryManager, strip_summary_logs
+
+class FakeSummarizer:
+    """呼び出し内容を記録する要約関数"""
+
+    def __init__(self):
+        self.folds = []
+        self.summaries = []
+
+    async def fold(self, summary: str, delta_text: str) -> str:
+        self.folds.append(delta_text)
+        return f"{summary}+{delta_text.replace(chr(10), '+')}"
+
+    async def summarize(self, text: str) -> str:
+        self.summaries.append(text)
+        return f"S({text.replace(chr(10), '+')})"
+
+def test_only_delta_is_folded():
+    """追記されたブロックだけが畳み込まれ、変化がなければAIを呼ばないこと"""
+    async def run():
+        manager = RollingSummaryManager()
+        fake = FakeSummarizer()
+        blocks = [("b1", "one", "t1"), ("b2", "two", "t1")]
+
+        assert await manager.update("page-a", blocks, fake.fold, fake.summarize) == "S(one+two)"
+        assert await manager.update("page-a", blocks, fake.fold, fake.summarize) == "S(one+two)"
+        assert len(fake.summaries) == 1 and fake.folds == []
+
+        blocks = blocks + [("b3", "three", "t2"), ("b4", "four", "t2")]
+        assert await manager.update("page-a", blocks, fake.fold, fake.summarize) == "S(one+two)+three+four"
+        assert fake.folds == ["three\nfour"]
+        assert len(fake.summaries) == 1
+
+    asyncio.run(run())
+    print("OK: 差分だけの畳み込み")
+    return True
+
+def test_edited_or_large_delta():
+    """反映済みブロックの編集は再構築、大きな差分は先に要約してから畳み込むこと"""
+    async def run():
+        manager = RollingSummaryManager(max_delta_chars=10)
+        fake = FakeSummarizer()
+        await manager.update("page-a", [("b1", "one", "t1")], fake.fold, fake.summarize)
+
+        # 大きな差分
+        blocks = [("b1", "one", "t1"), ("b2", "x" * 20, "t2")]
+        await manager.update("page-a", blocks, fake.fold, fake.summarize)
+        assert fake.summaries[-1] == "x" * 20
+        assert fake.folds == [f"S({'x' * 20})"]
+
+        # 反映済みブロックの編集
+        blocks = [("b1", "one (edited)", "t3"), ("b2", "x" * 20, "t2")]
+        assert await manager.update("page-a", blocks, fake.fold, fake.summarize) == f"S(one (edited)+{'x' * 20})"
+        assert manager.get_stats()["rebuilds"] == 2
+
+    asyncio.run(run())
+    print("OK: 編集時の再構築と大きな差分")
+    return True
+
+def test_summary_survives_restart():
+    """永続ストアから復元して差分更新を続け、セクションIDも残ること"""
+    async def run(temp_dir):
+        store = NotionBlockStore(os.path.join(temp_dir, "notion_blocks.db"))
+        blocks = [("b1", "one", "t1")]
+        await RollingSummaryManager().update("page-a", blocks, FakeSummarizer().fold, FakeSummarizer().summarize, store=store)
+        await RollingSummaryManager().mark_section("page-a", "§004", store=store)
+
+        # 再起動相当（新しいマネージャー）
+        manager = RollingSummaryManager()
+        fake = FakeSummarizer()
+        blocks = blocks + [("b2", "two", "t2")]
+        assert await manager.update("page-a", blocks, fake.fold, fake.summarize, store=store) == "S(one)+two"
+        assert fake.summaries == []
+        assert manager.get_section_id("page-a") == "§004"
+        await store.close_async()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        asyncio.run(run(temp_dir))
+    print("OK: 再起動後の継続")
+    return True
+
+def test_summary_logs_are_excluded():
+    """0ページに記録した論点サマリー（分割された続きのブロックを含む）は差分に含めないこと"""
+    long_summary = "あ" * 2500
+    body = f"{SUMMARY_LOG_LABEL}\n{long_summary}"
+    blocks = [
+        ("b1", "👤 user (2026-01-01):\n質問", "t1"),
+        ("b2", f"🤖 gpt5mini (2026-01-01):\n{body[:1900]}", "t1"),
+        ("b3", body[1900:], "t1"),
+        ("b4", "🤖 Claude (2026-01-01):\n分析 by Claude:\n回答", "t1"),
+        ("b5", f"🤖 gpt5mini (2026-01-02):\n{SUMMARY_LOG_LABEL}\n短い要約", "t1"),
+        ("b6", "👤 user (2026-01-02):\n次の質問", "t1"),
+    ]
+    assert [block[0] for block in strip_summary_logs(blocks)] == ["b1", "b4", "b6"]
+    print("OK: 論点サマリー記録の除外")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Rolling Summary Test ===")
+
+    tests = [
+        test_only_delta_is_folded,
+        test_edited_or_large_delta,
+        test_summary_survives_restart,
+        test_summary_logs_are_excluded,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
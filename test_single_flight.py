@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+同一リクエスト合流（single-flight）のテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from single_flight import SingleFlight, make_flight_key
+
+def _counting_call(calls: list, result: str = "answer", delay: float = 0.02):
+    async def call():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        return result
+    return call
+
+def test_identical_requests_coalesce():
+    """同時に届いた同一リクエストはプロバイダーへ1回だけ送られ、結果を共有すること"""
+    async def run():
+        flight = SingleFlight()
+        calls = []
+        key = make_flight_key("gpt5mini", "要約して", None, {})
+        results = await asyncio.gather(*(flight.run(key, _counting_call(calls)) for _ in range(3)))
+        assert results == ["answer"] * 3
+        assert calls == ["answer"]
+        stats = flight.get_stats()
+        assert stats["leaders"] == 1 and stats["coalesced"] == 2
+        assert stats["in_flight"] == 0
+
+        # 完了後はキャッシュしない
+        await flight.run(key, _counting_call(calls))
+        assert len(calls) == 2
+
+    asyncio.run(run())
+    print("OK: 同一リクエストの合流")
+    return True
+
+def test_key_distinguishes_inputs():
+    """AIタイプ・システムプロンプト・プロンプト・パラメータが違えば別キーになること"""
+    base = make_flight_key("gpt5", "hello", "sys", {"temperature": 0.2})
+    assert base == make_flight_key("gpt5", "hello", "sys", {"temperature": 0.2})
+    assert base != make_flight_key("gpt4o", "hello", "sys", {"temperature": 0.2})
+    assert base != make_flight_key("gpt5", "hello!", "sys", {"temperature": 0.2})
+    assert base != make_flight_key("gpt5", "hello", "other", {"temperature": 0.2})
+    assert base != make_flight_key("gpt5", "hello", "sys", {"temperature": 0.7})
+    print("OK: キーの区別")
+    return True
+
+def test_error_shared_with_waiters():
+    """最初のリクエストが失敗した場合は合流した呼び出し元にも同じ例外が返ること"""
+    async def run():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider down")
+
+        results = await asyncio.gather(flight.run("k", failing), flight.run("k", failing), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.get_stats()["leaders"] == 1
+
+    asyncio.run(run())
+    print("OK: 例外の共有")
+    return True
+
+def test_leader_cancel_keeps_followers():
+    """最初の呼び出し元がキャンセルされても合流した呼び出し元には結果が返り、全員キャンセルでリクエストも止まること"""
+    async def run():
+        flight = SingleFlight()
+        calls = []
+        leader = asyncio.create_task(flight.run("k", _counting_call(calls, delay=0.05)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.run("k", _counting_call(calls)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "answer"
+        assert flight.get_stats()["abandoned"] == 0
+
+        only = asyncio.create_task(flight.run("k2", _counting_call(calls, delay=1.0)))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.gather(only, return_exceptions=True)
+        await asyncio.sleep(0)
+        stats = flight.get_stats()
+        assert stats["abandoned"] == 1 and stats["in_flight"] == 0
+
+    asyncio.run(run())
+    print("OK: キャンセル時の扱い")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Single Flight Test ===")
+
+    tests = [
+        test_identical_requests_coalesce,
+        test_key_distinguishes_inputs,
+        test_error_shared_with_waiters,
+        test_leader_cancel_keeps_followers,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
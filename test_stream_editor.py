@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+ストリーミング表示エディターのテスト（単体）
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from stream_editor import STREAM_CURSOR, ThrottledMessageEditor
+
+class FakeMessage:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.deleted = False
+
+    async def edit(self, content):
+        self.content = content
+        self.channel.edit_count += 1
+
+    async def delete(self):
+        self.deleted = True
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+        self.edit_count = 0
+
+    async def send(self, content):
+        message = FakeMessage(self, content)
+        self.sent.append(message)
+        return message
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_edits_are_throttled():
+    """最小間隔内の追加は編集せず、最後に確定すること"""
+    async def run():
+        channel = FakeChannel()
+        clock = FakeClock()
+        editor = ThrottledMessageEditor(channel, min_interval=1.0, clock=clock)
+
+        await editor.append("こんにちは")
+        assert channel.sent[0].content == "こんにちは" + STREAM_CURSOR
+
+        # 間隔内の追加は表示しない
+        for _ in range(10):
+            clock.now += 0.05
+            await editor.append("。")
+        assert channel.edit_count == 0
+
+        clock.now += 1.0
+        await editor.append("続き")
+        assert channel.edit_count == 1
+
+        await editor.finish()
+        assert channel.sent[0].content == "こんにちは" + "。" * 10 + "続き"
+        assert len(channel.sent) == 1
+
+    asyncio.run(run())
+    print("OK: 編集の間引き")
+    return True
+
+def test_overflow_moves_to_next_message():
+    """2000文字を超えた分は次のメッセージになり、後処理の追記も反映されること"""
+    async def run():
+        channel = FakeChannel()
+        clock = FakeClock()
+        editor = ThrottledMessageEditor(channel, min_interval=0.0, clock=clock)
+
+        paragraph = "これは長い応答の段落です。" * 50
+        for _ in range(4):
+            await editor.append(paragraph + "\n\n")
+        final = await editor.finish(editor.text.strip() + "\n\n---\n*KBに記録されました。*")
+
+        assert len(channel.sent) > 1
+        assert all(len(message.content) <= 2000 for message in channel.sent)
+        assert channel.sent[-1].content.endswith("*KBに記録されました。*")
+        assert "\n\n".join(message.content for message in channel.sent) == final
+
+    asyncio.run(run())
+    print("OK: メッセージの繰り越し")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Stream Editor Test ===")
+
+    tests = [
+        test_edits_are_throttled,
+        test_overflow_moves_to_next_message,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
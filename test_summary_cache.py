@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+要約キャッシュのテスト（SummaryCache 単体と summarize_text_chunks からの利用）
+"""
+
+import asyncio
+import os
+import sys
+import time
+import types
+from unittest import mock
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+import summary_cache
+from summary_cache import SummaryCache
+from utils_test_fakes import FakeSummarizer, fake_utils
+
+BOT = types.SimpleNamespace(openai_client=None, mistral_client=None, perplexity_api_key=None)
+CHUNKS = ["chunk-1", "chunk-2", "chunk-3"]
+
+def test_key_normalization():
+    """クエリの全角半角・大文字小文字・空白の違いは同じキー、内容やモデルが違えば別のキーになること"""
+    cache = SummaryCache()
+    key = cache.make_key("ページ本文", "Notion の 要約", "gemini")
+
+    assert cache.make_key("ページ本文", "ＮＯＴＩＯＮ　の\n 要約 ", "gemini") == key
+    assert cache.make_key("ページ本文", "notion  の\t要約", "gemini") == key
+    assert cache.make_key("ページ本文", "Notion の 要約", "gpt") != key
+    assert cache.make_key("ページ本文（追記）", "Notion の 要約", "gemini") != key
+    print("OK: キーの正規化")
+    return True
+
+def test_ttl_and_lru():
+    """有効期限切れは取得できず、summary_max_entries を超えると最も使われていないものから消えること"""
+    now = [time.time()]  # エントリの作成時刻は実時刻なので、現在時刻だけを進める
+    config = types.SimpleNamespace(summary_ttl=60, summary_max_entries=2)
+    fake_config_manager = types.ModuleType("config_manager")
+    fake_config_manager.get_config_manager = lambda: types.SimpleNamespace(get_cache_config=lambda: config)
+
+    with mock.patch.dict(sys.modules, {"config_manager": fake_config_manager}), \
+            mock.patch.object(summary_cache, "_summary_cache", None), \
+            mock.patch.object(summary_cache.time, "time", lambda: now[0]):
+        cache = summary_cache.get_summary_cache()
+        assert (cache.ttl_seconds, cache.max_entries) == (60, 2)
+
+        cache.set("a", "要約A", llm_calls=3)
+        cache.set("b", "要約B", llm_calls=3)
+        assert cache.get("a") == "要約A"  # a を最近使ったものにする
+        cache.set("c", "要約C", llm_calls=3)
+        assert cache.get("b") is None
+        assert cache.get("a") == "要約A" and cache.get("c") == "要約C"
+
+        now[0] += 61
+        assert cache.get("a") is None and cache.get("c") is None
+        assert len(cache.cache) == 0
+
+    print("OK: 有効期限・LRU")
+    return True
+
+def test_cache_hit_skips_summarizers():
+    """同じ内容・同じ意味のクエリ・同じモデルの2回目は要約AIもMistral統合も呼ばないこと"""
+    chunk_summarizer = FakeSummarizer("Minerva")
+    merger = FakeSummarizer("Lalah")
+
+    async def run(utils):
+        first = await utils.summarize_text_chunks(BOT, None, "本文", "今週の 進捗", "gemini_flash")
+        calls = (len(chunk_summarizer.prompts), len(merger.prompts))
+        assert calls[0] == len(CHUNKS) and calls[1] >= 1
+
+        second = await utils.summarize_text_chunks(BOT, None, "本文", "今週の　進捗 ", "gemini_flash")
+        assert second == first
+        assert (len(chunk_summarizer.prompts), len(merger.prompts)) == calls
+
+        stats = utils.get_summary_cache().get_detailed_stats()
+        assert stats["hits"] == 1 and stats["llm_calls_saved"] == sum(calls)
+
+    with fake_utils(CHUNKS) as utils, \
+            mock.patch.object(utils, "ask_minerva", chunk_summarizer), \
+            mock.patch.object(utils, "ask_lalah", merger):
+        asyncio.run(run(utils))
+    print("OK: キャッシュヒット時の要約省略")
+    return True
+
+def test_failed_summaries_are_not_cached():
+    """チャンク要約・統合のどれかが失敗（例外・エラー応答）した結果はキャッシュしないこと"""
+    async def raising_summarizer(prompt):
+        raise RuntimeError("timeout")
+
+    cases = [
+        ("チャンクのエラー応答", FakeSummarizer("Minerva", failures=[2]), FakeSummarizer("Lalah")),
+        ("チャンクの例外", raising_summarizer, FakeSummarizer("Lalah")),
+        ("統合のエラー応答", FakeSummarizer("Minerva"), FakeSummarizer("Lalah", failures=[1])),
+    ]
+    for label, summarizer, merger in cases:
+        chunk_calls = []
+
+        async def chunk_summarizer(prompt):
+            chunk_calls.append(prompt)
+            return await summarizer(prompt)
+
+        async def run(utils):
+            await utils.summarize_text_chunks(BOT, None, "本文", "進捗", "gemini_flash")
+            assert len(chunk_calls) == len(CHUNKS), label
+            assert len(utils.get_summary_cache().cache) == 0, label
+
+            # キャッシュされていないので2回目も要約し直す
+            await utils.summarize_text_chunks(BOT, None, "本文", "進捗", "gemini_flash")
+            assert len(chunk_calls) == 2 * len(CHUNKS), label
+
+        with fake_utils(CHUNKS) as utils, \
+                mock.patch.object(utils, "ask_minerva", chunk_summarizer), \
+                mock.patch.object(utils, "ask_lalah", merger):
+            asyncio.run(run(utils))
+    print("OK: 失敗した要約はキャッシュしない")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Summary Cache Test ===")
+
+    tests = [
+        test_key_normalization,
+        test_ttl_and_lru,
+        test_cache_hit_skips_summarizers,
+        test_failed_summaries_are_not_cached,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+トークン見積もりチャンカーのテスト（単体）
+"""
+
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from text_chunker import ChunkPlan, estimate_tokens, split_text_by_tokens
+
+def test_estimate_tokens_differs_by_script():
+    """日本語と英語で1文字あたりのトークン数が異なること"""
+    japanese = "日本語の文章" * 100
+    english = "abcdef" * 100
+    assert estimate_tokens(japanese, "openai") > estimate_tokens(english, "openai") * 2
+    assert estimate_tokens(japanese, "mistral") > estimate_tokens(japanese, "gemini")
+
+    print("OK: トークン見積もり")
+    return True
+
+def test_chunks_respect_budget_and_sentence_boundaries():
+    """予算内に収まり、文の途中で切れないこと"""
+    sentence = "これはテスト用の文です。"
+    text = "\n".join(sentence * 5 for _ in range(20))
+    plan = ChunkPlan(max_tokens=200, family="openai")
+
+    chunks = split_text_by_tokens(text, plan)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert estimate_tokens(chunk, "openai") <= plan.max_tokens
+        assert chunk.endswith("。")
+
+    # 小さいテキストは分割しない
+    assert split_text_by_tokens("短い文です。", plan) == ["短い文です。"]
+
+    print("OK: 予算と文境界")
+    return True
+
+def test_overlap_repeats_previous_tail():
+    """重ね合わせで前チャンクの末尾が次チャンクの先頭に入ること"""
+    blocks = [f"ブロック{i}の内容です。" for i in range(40)]
+    plan = ChunkPlan(max_tokens=100, family="openai", overlap_tokens=20)
+
+    chunks = split_text_by_tokens("\n".join(blocks), plan)
+    assert len(chunks) > 1
+    # 1ブロック約9トークンなので、直前の2ブロックが重なる
+    assert chunks[1].split("\n")[:2] == chunks[0].split("\n")[-2:]
+
+    print("OK: チャンクの重ね合わせ")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Text Chunker Test ===")
+
+    tests = [
+        test_estimate_tokens_differs_by_script,
+        test_chunks_respect_budget_and_sentence_boundaries,
+        test_overlap_repeats_previous_tail,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
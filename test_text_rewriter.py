@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+テキスト置換リライターのテスト（単体）
+"""
+
+import os
+import re
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from text_rewriter import DEFAULT_RULE_SETS, TextRewriter, parse_rule_sets
+
+def sequential_rewrite(text: str) -> str:
+    """従来の逐次置換（比較用）"""
+    if '吉川' in text or '英佑' in text:
+        text = text.replace('吉川氏', '対象者').replace('吉川英佑氏', '対象者').replace('吉川英佑', '対象者').replace('吉川', '対象者')
+        text = text.replace('英佑氏', '対象者').replace('英佑', '対象者')
+        text = re.sub(r'A[a-zA-Z\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]+氏?', '対象者', text)
+    for rule_set in DEFAULT_RULE_SETS[1:]:
+        for problematic, neutral in rule_set["literals"].items():
+            text = text.replace(problematic, neutral)
+    return text
+
+def test_matches_sequential_replacement():
+    """既定規則の結果が従来の逐次置換と一致すること"""
+    rewriter = TextRewriter(parse_rule_sets(DEFAULT_RULE_SETS))
+    samples = [
+        "吉川英佑氏は計画的に行動した。\n知能犯とされたが犯罪の証拠はない。",
+        "英佑の件で違法かつ危険な攻撃があった。犯人は悪質な詐欺を否定。",
+        "Aさんは会議に出席した。",
+        "特に問題のない文章です。",
+        "",
+    ]
+    for sample in samples:
+        assert rewriter.rewrite(sample) == sequential_rewrite(sample), sample
+
+    print("OK: 逐次置換との一致")
+    return True
+
+def test_triggers_limit_rule_sets():
+    """triggers を含まないテキストには匿名化規則を適用しないこと"""
+    rewriter = TextRewriter(parse_rule_sets(DEFAULT_RULE_SETS))
+    assert rewriter.rewrite("APIの危険") == "APIのリスク"
+    assert rewriter.rewrite("吉川さんとAPIの危険") == "対象者さんと対象者"
+
+    print("OK: triggers による規則の切り替え")
+    return True
+
+def test_custom_rules_prefer_longest_literal():
+    """設定データから規則を組み立て、長い固定文字列を優先すること"""
+    rewriter = TextRewriter(parse_rule_sets([
+        {"name": "custom", "literals": {"東京": "都市", "東京都庁": "庁舎"},
+         "patterns": [{"pattern": r"\d{3}-\d{4}", "replacement": "[郵便番号]"}]},
+    ]))
+    assert rewriter.rewrite("東京都庁は東京にある（163-8001）") == "庁舎は都市にある（[郵便番号]）"
+
+    print("OK: 最長一致とパターン規則")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Text Rewriter Test ===")
+
+    tests = [
+        test_matches_sequential_replacement,
+        test_triggers_limit_rule_sets,
+        test_custom_rules_prefer_longest_literal,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
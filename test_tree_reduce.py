@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+階層要約（tree_reduce_summaries）のテスト
+"""
+
+import asyncio
+import os
+import sys
+
+# プロジェクトルートをパスに追加
+sys.path.append(os.path.dirname(__file__))
+
+from utils_test_fakes import fake_utils
+
+class FakeReducer:
+    """要約・統合の呼び出しを記録し、入力の順序が結果から読み取れる文字列を返す"""
+
+    def __init__(self, delays=None, failures=None):
+        self.delays = delays or {}
+        self.failures = failures or {}  # 要約対象テキスト -> 返す値（None・エラー応答）
+        self.merges = []
+        self.root_merges = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def summarize(self, text):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(text, 0.0))
+        finally:
+            self.in_flight -= 1
+        if text in self.failures:
+            return self.failures[text]
+        return f"S{text}"
+
+    async def merge(self, parts):
+        self.merges.append(list(parts))
+        if "Sbad" in parts:
+            return "Lalahエラー: 統合に失敗"
+        return "(" + "+".join(parts) + ")"
+
+    async def root_merge(self, parts):
+        self.root_merges.append(list(parts))
+        return "[" + "+".join(parts) + "]"
+
+def _reduce(utils, texts, reducer, fan_in=2, **kwargs):
+    return utils.tree_reduce_summaries(
+        texts, reducer.summarize, reducer.merge,
+        map_summarizer="fake-map", merge_summarizer="fake-merge", fan_in=fan_in, **kwargs
+    )
+
+def _set_limits(utils, map_limit=10, merge_limit=10):
+    # config.yaml を読まずに同時実行数を決める（セマフォは実行中のイベントループ内で作る）
+    utils._summarizer_semaphores["fake-map"] = asyncio.Semaphore(map_limit)
+    utils._summarizer_semaphores["fake-merge"] = asyncio.Semaphore(merge_limit)
+
+def test_grouping_by_fan_in():
+    """fan_in 個以下ずつ統合し、割り切れない件数でも全テキストが1回ずつ使われること"""
+    async def run(utils):
+        _set_limits(utils)
+        reducer = FakeReducer()
+        result = await _reduce(utils, list("abcde"), reducer, fan_in=2)
+        assert result == "(((Sa+Sb)+Sc)+(Sd+Se))"
+        assert all(len(parts) <= 2 for parts in reducer.merges) and len(reducer.merges) == 4
+
+        reducer = FakeReducer()
+        result = await _reduce(utils, list("abcdefg"), reducer, fan_in=3)
+        assert all(len(parts) <= 3 for parts in reducer.merges)
+        assert result.replace("(", "").replace(")", "") == "+".join(f"S{c}" for c in "abcdefg")
+
+        reducer = FakeReducer()
+        assert await _reduce(utils, ["only"], reducer) == "Sonly"
+        assert reducer.merges == []
+        assert await _reduce(utils, [], reducer) is None
+
+    with fake_utils() as utils:
+        asyncio.run(run(utils))
+    print("OK: fan_in ごとの統合")
+    return True
+
+def test_order_is_preserved():
+    """先に終わった要約があっても、統合は元のテキスト順で行われること"""
+    async def run(utils):
+        _set_limits(utils)
+        reducer = FakeReducer(delays={"a": 0.05, "b": 0.04, "c": 0.03, "d": 0.02, "e": 0.0})
+        result = await _reduce(utils, list("abcde"), reducer, fan_in=3)
+        assert result.replace("(", "").replace(")", "") == "Sa+Sb+Sc+Sd+Se"
+
+    with fake_utils() as utils:
+        asyncio.run(run(utils))
+    print("OK: 順序の保持")
+    return True
+
+def test_failed_parts_are_dropped():
+    """None・エラー応答の要約と、失敗した途中の統合は上位の統合に渡らないこと"""
+    async def run(utils):
+        _set_limits(utils)
+        reducer = FakeReducer(failures={"b": None, "d": "Minervaエラー: 安全フィルター"})
+        result = await _reduce(utils, list("abcdef"), reducer, fan_in=2)
+        assert result == "((Sa+Sc)+(Se+Sf))"
+
+        # 途中の統合が失敗した枝は丸ごと除かれる（最上位まで持ち上がらない）
+        reducer = FakeReducer(failures={"a": "Sbad"})
+        result = await _reduce(utils, list("abcd"), reducer, fan_in=2)
+        assert result == "(Sc+Sd)"
+        assert all("エラー" not in part for parts in reducer.merges for part in parts)
+
+        reducer = FakeReducer(failures={"a": None, "b": "Minervaエラー: x"})
+        assert await _reduce(utils, ["a", "b"], reducer) is None
+
+    with fake_utils() as utils:
+        asyncio.run(run(utils))
+    print("OK: 失敗した要約の除外")
+    return True
+
+def test_root_merge_only_at_top():
+    """root_merge_func は最上位の統合でだけ1回呼ばれること"""
+    async def run(utils):
+        _set_limits(utils)
+        utils._summarizer_semaphores["fake-root"] = asyncio.Semaphore(1)
+        reducer = FakeReducer()
+        result = await _reduce(utils, list("abcde"), reducer, fan_in=2,
+                               root_merge_func=reducer.root_merge, root_summarizer="fake-root")
+        assert result == "[((Sa+Sb)+Sc)+(Sd+Se)]"
+        assert reducer.root_merges == [["((Sa+Sb)+Sc)", "(Sd+Se)"]]
+        assert len(reducer.merges) == 3
+
+        # 統合対象が1つしか残らなければ最上位の統合も行わない
+        reducer = FakeReducer(failures={"b": None})
+        assert await _reduce(utils, ["a", "b"], reducer, root_merge_func=reducer.root_merge) == "Sa"
+        assert reducer.root_merges == []
+
+    with fake_utils() as utils:
+        asyncio.run(run(utils))
+    print("OK: 最上位だけの仕上げ統合")
+    return True
+
+def test_summarizer_semaphore_caps_concurrency():
+    """要約AIごとのセマフォの上限を超えて要約が同時実行されないこと"""
+    async def run(utils):
+        _set_limits(utils, map_limit=2)
+        reducer = FakeReducer(delays={str(i): 0.02 for i in range(8)})
+        result = await _reduce(utils, [str(i) for i in range(8)], reducer, fan_in=4)
+        assert reducer.max_in_flight == 2
+        assert result.replace("(", "").replace(")", "") == "+".join(f"S{i}" for i in range(8))
+
+    with fake_utils() as utils:
+        asyncio.run(run(utils))
+    print("OK: 同時実行数の上限")
+    return True
+
+def main():
+    """メインテスト実行"""
+    print("=== Tree Reduce Summaries Test ===")
+
+    tests = [
+        test_grouping_by_fan_in,
+        test_order_is_preserved,
+        test_failed_parts_are_dropped,
+        test_root_merge_only_at_top,
+        test_summarizer_semaphore_caps_concurrency,
+    ]
+
+    results = []
+    for test_func in tests:
+        try:
+            results.append(test_func())
+        except Exception as e:
+            print(f"FAIL: {test_func.__name__}: {e}")
+            results.append(False)
+
+    passed = sum(results)
+    print(f"\n総合結果: {passed}/{len(tests)} テスト通過")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
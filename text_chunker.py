@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+トークン見積もりチャンカー
+モデル系列ごとの較正済み係数でトークン数を見積もり、
+ブロック（改行）→文→文字の順に境界を選んで、モデルのコンテキスト予算いっぱいまでチャンクを詰める
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# 日本語（ひらがな・カタカナ・漢字・全角記号）
+CJK_PATTERN = re.compile(r"[\u3000-\u303F\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF\uFF00-\uFFEF]")
+
+# 文の区切り（句点・感嘆符・疑問符の直後、英文は終止符+空白）
+SENTENCE_PATTERN = re.compile(r"[^。！？!?\n]*(?:[。！？!?]+|\.(?=\s)|$)")
+
+@dataclass(frozen=True)
+class TokenRatio:
+    """1文字あたりのトークン数（実測に基づく較正値）"""
+    cjk: float
+    other: float
+
+# モデル系列ごとの係数（日本語はトークナイザーの語彙で大きく差が出る）
+TOKEN_RATIOS: Dict[str, TokenRatio] = {
+    "openai": TokenRatio(cjk=0.8, other=0.25),
+    "gemini": TokenRatio(cjk=0.6, other=0.25),
+    "mistral": TokenRatio(cjk=1.2, other=0.3),
+    "default": TokenRatio(cjk=1.0, other=0.3),  # 不明なモデルは多めに見積もる
+}
+
+# client_type からモデル系列への対応
+CLIENT_TYPE_FAMILIES = {
+    "openai": "openai",
+    "gemini": "gemini",
+    "mistral": "mistral",
+}
+
+@dataclass
+class ChunkPlan:
+    """チャンク分割の設定"""
+    max_tokens: int
+    family: str = "default"
+    overlap_tokens: int = 0
+
+def estimate_tokens(text: str, family: str = "default") -> int:
+    """モデル系列ごとのトークン数を見積もる"""
+    ratio = TOKEN_RATIOS.get(family, TOKEN_RATIOS["default"])
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return int(cjk_count * ratio.cjk + (len(text) - cjk_count) * ratio.other) + 1
+
+def _split_units(text: str, max_tokens: int, family: str) -> List[str]:
+    """予算に収まる単位（ブロック→文→文字）に分解"""
+    units = []
+    for block in text.split("\n"):
+        if estimate_tokens(block, family) <= max_tokens:
+            units.append(block)
+            continue
+
+        # 長すぎるブロックは文単位に
+        for sentence in SENTENCE_PATTERN.findall(block):
+            if not sentence:
+                continue
+            if estimate_tokens(sentence, family) <= max_tokens:
+                units.append(sentence)
+                continue
+
+            # それでも長い文は文字数で分割（最悪でも予算を超えない長さ）
+            ratio = TOKEN_RATIOS.get(family, TOKEN_RATIOS["default"])
+            step = max(1, int(max_tokens / max(ratio.cjk, ratio.other)) - 1)
+            units.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return units
+
+def split_text_by_tokens(text: str, plan: ChunkPlan) -> List[str]:
+    """
+    テキストをトークン予算ごとのチャンクに分割
+    改行（Notionブロック）と文の境界で区切り、overlap_tokens 分の末尾を次のチャンクの先頭に重ねる
+    """
+    if not text:
+        return []
+    if estimate_tokens(text, plan.family) <= plan.max_tokens:
+        return [text]
+
+    chunks = []
+    current: List[Tuple[str, int]] = []  # (単位, トークン数)
+    current_tokens = 0
+    for unit in _split_units(text, plan.max_tokens, plan.family):
+        unit_tokens = estimate_tokens(unit, plan.family)
+        if current and current_tokens + unit_tokens > plan.max_tokens:
+            chunks.append("\n".join(u for u, _ in current))
+
+            # 直前チャンクの末尾を重ねて文脈を引き継ぐ
+            overlap: List[Tuple[str, int]] = []
+            overlap_tokens = 0
+            for previous in reversed(current):
+                if overlap_tokens + previous[1] > plan.overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_tokens += previous[1]
+            if overlap_tokens + unit_tokens > plan.max_tokens:
+                overlap, overlap_tokens = [], 0
+            current, current_tokens = overlap, overlap_tokens
+
+        current.append((unit, unit_tokens))
+        current_tokens += unit_tokens
+
+    if current:
+        chunks.append("\n".join(u for u, _ in current))
+    return chunks
+
+def get_chunk_plan(ai_type: str) -> ChunkPlan:
+    """config/ai_models.yaml のコンテキスト長からチャンク予算を決める"""
+    from ai_config_loader import get_ai_config, get_special_configs
+
+    chunking = get_special_configs().chunking
+    max_chunk_tokens = chunking.get("max_chunk_tokens", 100000)
+    reserve_tokens = chunking.get("reserve_tokens", 1000)  # プロンプト本文・指示文の分
+    overlap_tokens = chunking.get("overlap_tokens", 0)
+
+    ai_config = get_ai_config(ai_type)
+    if ai_config is None:
+        return ChunkPlan(max_tokens=chunking.get("fallback_chunk_tokens", 8000), overlap_tokens=overlap_tokens)
+
+    budget = ai_config.context_window - ai_config.max_tokens - reserve_tokens
+    return ChunkPlan(
+        max_tokens=max(1000, min(budget, max_chunk_tokens)),
+        family=CLIENT_TYPE_FAMILIES.get(ai_config.client_type, "default"),
+        overlap_tokens=overlap_tokens
+    )
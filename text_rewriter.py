@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+テキスト置換リライター
+匿名化・安全フィルター対策の置換規則を1本の正規表現（選択肢の連結）にコンパイルし、
+長文でも1回の走査ですべての置換を適用する
+規則は config.yaml の text_rewriter セクションから読み込み、ファイル更新時に自動で再構築する
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+@dataclass
+class RewriteRuleSet:
+    """置換規則のまとまり"""
+    name: str
+    literals: Dict[str, str] = field(default_factory=dict)  # 固定文字列 -> 置換後
+    patterns: List[Tuple[str, str]] = field(default_factory=list)  # (正規表現, 置換後)
+    triggers: List[str] = field(default_factory=list)  # いずれかを含むテキストにだけ適用（空なら常に適用）
+
+# config.yaml に設定がない場合の既定規則
+DEFAULT_RULE_SETS: List[Dict[str, Any]] = [
+    {
+        # 人名を匿名化（Gemini安全フィルター対策）
+        "name": "anonymize",
+        "triggers": ["吉川", "英佑"],
+        "literals": {
+            "吉川英佑氏": "対象者",
+            "吉川英佑": "対象者",
+            "吉川氏": "対象者",
+            "吉川": "対象者",
+            "英佑氏": "対象者",
+            "英佑": "対象者",
+        },
+        "patterns": [
+            {"pattern": r"A[a-zA-Z\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]+氏?", "replacement": "対象者"},
+        ],
+    },
+    {
+        # 問題となりやすいキーワードを中性的な表現に置き換え
+        "name": "safety",
+        "literals": {
+            "知能犯": "戦略的人物",
+            "計画的に": "戦略的に",
+            "犯罪": "行為",
+            "違法": "問題行為",
+            "危険": "リスク",
+            "攻撃": "対抗",
+            "犯人": "対象者",
+            "悪質": "問題",
+            "詐欺": "疑問行為",
+        },
+    },
+]
+
+def parse_rule_sets(data: List[Dict[str, Any]]) -> List[RewriteRuleSet]:
+    """設定データから置換規則を生成"""
+    rule_sets = []
+    for rule_data in data or []:
+        rule_sets.append(RewriteRuleSet(
+            name=rule_data.get("name", f"rules_{len(rule_sets)}"),
+            literals={str(k): str(v) for k, v in (rule_data.get("literals") or {}).items() if k},
+            patterns=[
+                (item["pattern"], item.get("replacement", ""))
+                for item in rule_data.get("patterns") or []
+                if item.get("pattern")
+            ],
+            triggers=list(rule_data.get("triggers") or [])
+        ))
+    return rule_sets
+
+class TextRewriter:
+    """置換規則を1回の走査で適用するリライター"""
+
+    def __init__(self, rule_sets: List[RewriteRuleSet]):
+        self.rule_sets = rule_sets
+        # 適用する規則の組み合わせごとのコンパイル済み正規表現
+        self._compiled: Dict[Tuple[str, ...], Tuple[Optional[re.Pattern], Dict[str, str], List[Tuple[re.Pattern, str]]]] = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, active: Tuple[str, ...]) -> Tuple[Optional[re.Pattern], Dict[str, str], List[Tuple[re.Pattern, str]]]:
+        """
+        有効な規則を1本の正規表現にまとめる
+        固定文字列は長いものを優先（「吉川英佑氏」が「吉川」より先に一致）、正規表現規則はその後ろに並べる
+        選択肢をグループで囲まないことで、先頭文字の集合による高速スキップが効くようにしている
+        （正規表現規則も固定の文字で始めると速い）
+        """
+        literals: Dict[str, str] = {}
+        patterns: List[Tuple[str, str]] = []
+        for rule_set in self.rule_sets:
+            if rule_set.name in active:
+                for source, replacement in rule_set.literals.items():
+                    literals.setdefault(source, replacement)
+                patterns.extend(rule_set.patterns)
+
+        alternatives = [re.escape(source) for source in sorted(literals, key=len, reverse=True)]
+        alternatives.extend(f"(?:{pattern})" for pattern, _ in patterns)
+
+        regex = re.compile("|".join(alternatives)) if alternatives else None
+        return regex, literals, [(re.compile(pattern), replacement) for pattern, replacement in patterns]
+
+    def _active_rule_sets(self, text: str) -> Tuple[str, ...]:
+        return tuple(
+            rule_set.name for rule_set in self.rule_sets
+            if not rule_set.triggers or any(trigger in text for trigger in rule_set.triggers)
+        )
+
+    def rewrite(self, text: str) -> str:
+        """すべての置換を1回の走査で適用"""
+        if not text:
+            return text
+
+        active = self._active_rule_sets(text)
+        with self._lock:
+            compiled = self._compiled.get(active)
+            if compiled is None:
+                compiled = self._compile(active)
+                self._compiled[active] = compiled
+        regex, literals, patterns = compiled
+        if regex is None:
+            return text
+
+        def replace(match: re.Match) -> str:
+            matched = match.group()
+            replacement = literals.get(matched)
+            if replacement is not None:
+                return replacement
+            # 正規表現規則はどれに一致したかを一致部分だけで判定（まれな経路）
+            for pattern, pattern_replacement in patterns:
+                if pattern.fullmatch(matched):
+                    return pattern_replacement
+            return matched
+
+        return regex.sub(replace, text)
+
+
+# グローバルリライター（設定が変わったときだけ再構築）
+_rewriter: Optional[TextRewriter] = None
+_rules_source: Optional[Any] = None
+
+def get_text_rewriter() -> TextRewriter:
+    """config.yaml の規則でリライターを取得（設定ファイル更新時は再構築）"""
+    global _rewriter, _rules_source
+    from config_manager import get_config_manager
+
+    rules_data = get_config_manager().get_text_rewriter_rules()
+    if _rewriter is None or rules_data is not _rules_source:
+        _rewriter = TextRewriter(parse_rule_sets(rules_data if rules_data is not None else DEFAULT_RULE_SETS))
+        _rules_source = rules_data
+    return _rewriter
@@ -6,7 +6,7 @@
 import asyncio
 import time
 import hashlib
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 import yaml
@@ -15,17 +15,23 @@ from pathlib import Path
 import discord
 from discord.ext import commands
 
-from utils import safe_log, send_long_message, analyze_attachment_for_gpt5, get_notion_context_for_message
+from utils import safe_log, send_long_message, analyze_attachment_for_gpt5, get_notion_context_for_message, get_send_route
 from enhanced_memory_manager import get_enhanced_memory_manager
 from ai_manager import get_ai_manager
 from enhanced_cache import get_cache_manager
 from notion_utils import (
     NOTION_PAGE_MAP, log_user_message, log_response, get_memory_flag_from_notion,
-    find_latest_section_id, append_summary_to_kb
+    find_latest_section_id, append_summary_to_kb, search_notion_page, get_notion_page_tail
 )
 from async_optimizer import process_with_parallel_context, multi_ai_council_parallel
+from rolling_summary import get_rolling_summary, build_council_context
 from ai_clients import ask_gpt5_mini
 from plugin_system import HookType
+from message_splitter import DEFAULT_LONG_MESSAGE_MODE
+from stream_editor import ThrottledMessageEditor
+from discord_dispatcher import get_outbound_dispatcher
+from request_hedger import HedgePolicy
+from bulkhead import bulkhead_pool
 
 @dataclass
 class TaskConfig:
@@ -42,6 +48,9 @@ class TaskConfig:
     priority: float = 1.0
     timeout: int = 30
     max_retries: int = 2
+    long_message_mode: str = DEFAULT_LONG_MESSAGE_MODE  # 2000文字超の応答: split / file / summarize
+    streaming: bool = False  # 生成途中の応答をメッセージ編集で逐次表示
+    hedging: Optional[HedgePolicy] = None  # 応答が遅い場合にバックアップAIへも送る（ストリーミング時は無効）
 
 @dataclass
 class TaskResult:
@@ -125,7 +134,13 @@ class TaskConfigLoader:
             post_processing=task_type_config.get("post_processing", ["log_response"]),
             priority=ai_config.get("priority", 1.0),
             timeout=ai_config.get("timeout", 30),
-            max_retries=ai_config.get("max_retries", 2)
+            max_retries=ai_config.get("max_retries", 2),
+            long_message_mode=task_type_config.get("long_message_mode", DEFAULT_LONG_MESSAGE_MODE),
+            streaming=task_type_config.get("streaming", False),
+            hedging=HedgePolicy.from_config(
+                dict(task_type_config["hedging"], backup=ai_config.get("hedge_backup"))
+                if task_type_config.get("hedging") else None
+            )
         )
 
     def get_context_strategy(self, strategy_name: str) -> Dict[str, Any]:
@@ -214,18 +229,45 @@ class CouncilOptimizedContextStrategy(ContextStrategy):
         context = {"message_content": message.content}
 
         if page_ids:
-            # 初回要約の取得
-            initial_summary = await get_notion_context_for_message(bot, message, page_ids[0], message.content, "gpt5mini")
+            # ページのローリング要約（前回以降に追記されたブロックだけを要約して畳み込む）に議題の関連ブロックを加える
+            initial_summary = await get_rolling_summary(bot, page_ids[0])
+            if initial_summary:
+                initial_summary = await build_council_context(page_ids[0], message.content, initial_summary)
             context["initial_summary"] = initial_summary or ""
 
         return context
 
+class RetrievalContextStrategy(ContextStrategy):
+    """ローカル検索戦略（要約AIを呼ばず、質問に関連するブロックを選ぶ）"""
+
+    async def get_context(self, bot: commands.Bot, message: discord.Message,
+                         config: TaskConfig, page_ids: List[str]) -> Dict[str, Any]:
+        context = {"message_content": message.content}
+        page_id = page_ids[0] if page_ids else None
+
+        if page_id and config.use_kb:
+            settings = get_unified_task_engine().config_loader.get_context_strategy("retrieval")
+            top_k = settings.get("top_k", 8)
+            max_chars = settings.get("max_chars", 4000)
+
+            hits = await search_notion_page(page_id, message.content, top_k=top_k, max_chars=max_chars)
+            if hits:
+                safe_log("🔎 ローカル検索コンテキスト: ", f"{len(hits)}ブロック ({sum(len(h.text) for h in hits)}文字)")
+                context["notion_context"] = "\n".join(hit.text for hit in hits)
+            else:
+                # 関連ブロックが見つからない場合はページ末尾をそのまま使う
+                tail_text = await get_notion_page_tail(page_id, max_chars)
+                context["notion_context"] = "" if tail_text.startswith("ERROR:") else tail_text
+
+        return context
+
 class ContextStrategyFactory:
     """コンテキスト戦略ファクトリー"""
 
     _strategies = {
         "minimal": MinimalContextStrategy(),
         "cached": CachedContextStrategy(),
+        "retrieval": RetrievalContextStrategy(),
         "parallel_memory": ParallelMemoryContextStrategy(),
         "council_optimized": CouncilOptimizedContextStrategy()
     }
@@ -286,20 +328,23 @@ class KBSummaryProcessor(PostProcessor):
                 summary_prompt = f"以下のテキストをNotion KB用に150字以内で簡潔に要約せよ。\n\n{response}"
                 summary_hash = hashlib.md5(summary_prompt.encode()).hexdigest()[:12]
 
-                official_summary = await cache_manager.get_ai_response_cached(
-                    ai_type="gpt5mini",
-                    prompt_hash=summary_hash,
-                    fetch_func=ask_gpt5_mini,
-                    openai_client=bot.openai_client,
-                    prompt=summary_prompt
-                )
+                # KB要約は後処理なので background 枠で実行（対話の応答枠を使わない）
+                with bulkhead_pool("background"):
+                    official_summary = await cache_manager.get_ai_response_cached(
+                        ai_type="gpt5mini",
+                        prompt_hash=summary_hash,
+                        fetch_func=ask_gpt5_mini,
+                        openai_client=bot.openai_client,
+                        prompt=summary_prompt
+                    )
 
                 if official_summary:
                     kb_page_id = page_ids[1]
                     new_section_id = await find_latest_section_id(kb_page_id)
-                    await append_summary_to_kb(kb_page_id, new_section_id, official_summary)
+                    new_section_id = await append_summary_to_kb(kb_page_id, new_section_id, official_summary)
 
-                    return f"{response}\n\n---\n*この回答はKBに **{new_section_id}** として記録されました。*"
+                    if new_section_id:
+                        return f"{response}\n\n---\n*この回答はKBに **{new_section_id}** として記録されました。*"
 
             except Exception as e:
                 safe_log("⚠️ KB要約処理エラー: ", e)
@@ -446,16 +491,23 @@ class UnifiedTaskEngine:
             if ai_type == "genius_pro" and page_ids:
                 await log_user_message(page_ids[0], message.author.display_name, message.content)
 
-            # 4. AI実行（キャッシュ統合）
-            response = await self._execute_ai(ai_type, prompt, config, bot)
+            # 4. AI実行（キャッシュ統合・ストリーミング時は生成途中から表示）
+            editor = None
+            if config.streaming:
+                response, editor = await self._execute_ai_streaming(ai_type, prompt, config, bot, message.channel)
+            else:
+                response = await self._execute_ai(ai_type, prompt, config, bot)
 
             # 5. 後処理（コマンドパターン）
             final_response = await self._execute_post_processing(
                 bot, message, response, config, context, page_ids
             )
 
-            # 6. 応答送信
-            await send_long_message(bot.openai_client, message.channel, final_response)
+            # 6. 応答送信（ストリーミング表示済みの場合は後処理の追記を反映して確定）
+            if editor is not None:
+                await editor.finish(final_response)
+            else:
+                await send_long_message(bot.openai_client, message.channel, final_response, mode=config.long_message_mode)
 
             return TaskResult(
                 success=True,
@@ -502,7 +554,7 @@ class UnifiedTaskEngine:
                 return cached_response
 
             # キャッシュミス：AI実行
-            response = await self.ai_manager.ask_ai(ai_type, prompt, priority=config.priority)
+            response = await self.ai_manager.ask_ai(ai_type, prompt, priority=config.priority, hedge=config.hedging)
 
             # レスポンスをキャッシュに保存
             if response:
@@ -517,6 +569,52 @@ class UnifiedTaskEngine:
         except Exception as e:
             return f"{ai_type}エラー: {str(e)[:200]}"
 
+    async def _execute_ai_streaming(self, ai_type: str, prompt: str, config: TaskConfig, bot,
+                                    channel) -> Tuple[str, Optional[ThrottledMessageEditor]]:
+        """
+        AI実行（ストリーミング）
+        生成途中のテキストを一定間隔のメッセージ編集で表示する
+        キャッシュヒット・ストリーム開始前の失敗時はエディターなし（通常の送信に任せる）
+        """
+        if not self.ai_manager.initialized and bot:
+            self.ai_manager.initialize(bot)
+
+        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()[:12]
+        cached_response = await self.cache_manager.get_cached(
+            "ai_response",
+            {"ai_type": ai_type, "prompt_hash": prompt_hash},
+            None
+        )
+        if cached_response:
+            safe_log(f"⚡ AI応答キャッシュヒット ({ai_type}): ", f"ハッシュ:{prompt_hash}")
+            return cached_response, None
+
+        # 新しいメッセージは送信キューを通す（先に積まれたメッセージとの順序・送信制限を守る）
+        dispatcher = get_outbound_dispatcher()
+        route = get_send_route(channel)
+        editor = ThrottledMessageEditor(
+            channel, send_func=lambda content: dispatcher.send(route, content, channel.send)
+        )
+        try:
+            async for text in self.ai_manager.stream_ai(ai_type, prompt, priority=config.priority):
+                await editor.append(text)
+        except Exception as e:
+            if not editor.messages:
+                return f"{ai_type}エラー: {str(e)[:200]}", None
+            # 途中まで表示済みの内容は残し、エラーを追記する（キャッシュしない）
+            safe_log(f"🚨 ストリーミング中断 ({ai_type}): ", e)
+            return f"{editor.text}\n\n⚠️ 応答の途中でエラーが発生しました: {str(e)[:200]}", editor
+
+        response = editor.text
+        if response:
+            await self.cache_manager.set_cached(
+                "ai_response",
+                {"ai_type": ai_type, "prompt_hash": prompt_hash},
+                response
+            )
+        safe_log(f"📡 ストリーミング表示完了 ({ai_type}): ", editor.get_stats())
+        return response or f"申し訳ありません。{ai_type}からの応答が空でした。", editor
+
     async def _execute_post_processing(self, bot: commands.Bot, message: discord.Message,
                                      response: str, config: TaskConfig, context: Dict[str, Any],
                                      page_ids: List[str]) -> str:
@@ -8,6 +8,7 @@ import PyPDF2
 import zipfile
 import tempfile
 import os
+from typing import Awaitable, Callable, Dict, List, Optional
 from openai import AsyncOpenAI
 from mistralai.async_client import MistralAsyncClient
 
@@ -15,7 +16,16 @@ from mistralai.async_client import MistralAsyncClient
 from ai_clients import ask_lalah, ask_gpt5, ask_gpt5_mini, ask_gpt4o, ask_gemini_2_5_pro, ask_rekus, ask_minerva
 
 # notion_utils からインポート
-from notion_utils import get_notion_page_text
+from notion_utils import get_notion_page_tail
+from summary_cache import get_summary_cache
+from text_chunker import get_chunk_plan, split_text_by_tokens
+from text_rewriter import get_text_rewriter
+from discord_dispatcher import get_outbound_dispatcher
+from bulkhead import bulkhead_pool
+from message_splitter import (
+    DISCORD_MESSAGE_LIMIT, LONG_MESSAGE_MODES, DEFAULT_LONG_MESSAGE_MODE,
+    MAX_SPLIT_MESSAGES, FILE_PREVIEW_CHARS, split_message
+)
 
 # --- ログ・メッセージ送信 ---
 
@@ -26,58 +36,102 @@ def safe_log(prefix: str, obj):
     except Exception as e:
         print(f"{prefix}(log skipped: {e})")
 
-async def send_long_message(openai_client: AsyncOpenAI, target, text: str, is_followup: bool = False, mention: str = "", primary_ai: str = "gpt5"):
+def get_send_route(target) -> str:
+    """送信ディスパッチャーのルート名（送信先ごとのキュー）"""
+    if isinstance(target, discord.Interaction):
+        return f"followup:{target.id}"
+    return f"channel:{getattr(target, 'id', id(target))}"
+
+def _followup_sender(interaction: discord.Interaction):
+    """フォローアップ送信（失敗時はチャンネルへ送信）"""
+    async def send(content: str, **kwargs):
+        try:
+            return await interaction.followup.send(content, **kwargs)
+        except (discord.errors.InteractionResponded, discord.errors.NotFound) as e:
+            safe_log(f"⚠️ メッセージ送信に失敗（フォールバック）:", e)
+            if interaction.channel: return await interaction.channel.send(content, **kwargs)
+    return send
+
+async def _send_discord_message(target, content: str, is_followup: bool = False, file: Optional[discord.File] = None):
+    """
+    Interaction・チャンネルのどちらにも1通送信
+    元の応答の編集以外は送信先ごとのキューに積み（待機しない）、連続する短いメッセージはまとめて送られる
+    """
+    dispatcher = get_outbound_dispatcher()
+    kwargs = {"file": file} if file else {}
+    if isinstance(target, discord.Interaction):
+        if is_followup or target.response.is_done():
+            dispatcher.enqueue(get_send_route(target), content, _followup_sender(target), **kwargs)
+            return
+        try:
+            await target.edit_original_response(content=content, **({"attachments": [file]} if file else {}))
+        except (discord.errors.InteractionResponded, discord.errors.NotFound) as e:
+            safe_log(f"⚠️ メッセージ送信に失敗（フォールバック）:", e)
+            if target.channel:
+                dispatcher.enqueue(get_send_route(target.channel), content, target.channel.send, **kwargs)
+        return
+    dispatcher.enqueue(get_send_route(target), content, target.send, **kwargs)
+
+async def _summarize_for_discord(openai_client: AsyncOpenAI, text: str, mention: str = "") -> str:
+    """長文をgpt-4oで1800文字以内に要約（long_message_mode: summarize のときのみ）"""
+    summary_prompt = f"以下の文章はDiscordの文字数制限を超えています。内容の要点を最も重要視し、1800文字以内で簡潔に要約してください。\n\n---\n\n{text}"
+    header = f"{mention}\n" if mention else ""
+    try:
+        # 統一AIマネージャーを使用してエラー処理を統一
+        from ai_manager import get_ai_manager
+        ai_manager = get_ai_manager()
+        if ai_manager.initialized:
+            summary = await ai_manager.ask_ai("gpt4o", summary_prompt, system_prompt="あなたは要約専用AIです。簡潔で正確な要約を作成してください。")
+        else:
+            # フォールバック：直接OpenAI APIを使用
+            try:
+                response = await openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": summary_prompt}], max_tokens=2000, temperature=0.2)
+            except Exception as e:
+                if "max_tokens" in str(e) and "max_completion_tokens" in str(e):
+                    response = await openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": summary_prompt}], max_completion_tokens=2000, temperature=0.2)
+                else:
+                    raise e
+            summary = response.choices[0].message.content
+        return f"{header}{summary}"
+    except Exception as e:
+        safe_log("🚨 send_long_messageの要約中にエラー:", e)
+        return f"{header}元の回答は長すぎましたが、要約中にエラーが発生しました。"
+
+async def send_long_message(openai_client: AsyncOpenAI, target, text: str, is_followup: bool = False, mention: str = "", primary_ai: str = "gpt5", mode: Optional[str] = None):
+    """
+    2000文字を超える応答を送信モードに応じて送る
+    split: 段落・コードブロック・文の境界で複数メッセージに分割（既定、追加のAI呼び出しなし）
+    file: 冒頭だけ本文に載せ、全文を添付ファイルで送信
+    summarize: gpt-4oで要約して1通にまとめる（従来の動作、明示的に指定した場合のみ）
+    """
     if not text: text = "（応答が空でした）"
     full_text = f"{mention}\n{text}" if mention and mention not in text else text
+    mode = mode if mode in LONG_MESSAGE_MODES else DEFAULT_LONG_MESSAGE_MODE
 
-    final_content = full_text
-    # デバッグ用：長いテキストをログ出力
-    if len(full_text) > 2000:
-        safe_log(f"🔍 長いレスポンス詳細（{len(full_text)}文字）:", full_text[:3000])
-        summary_prompt = f"以下の文章はDiscordの文字数制限を超えています。内容の要点を最も重要視し、1800文字以内で簡潔に要約してください。\n\n---\n\n{text}"
-
-        # AIの選択ロジック：通常時は primary_ai、2000字超過時は gpt-4o
-        if primary_ai == "gpt5":
-            summarizer_name = "gpt5が要約しました"
-        else:
-            summarizer_name = "gpt-4oが要約しました"
+    if len(full_text) <= DISCORD_MESSAGE_LIMIT:
+        await _send_discord_message(target, full_text, is_followup)
+        return
 
-        try:
-            # 統一AIマネージャーを使用してエラー処理を統一
-            from ai_manager import get_ai_manager
-            ai_manager = get_ai_manager()
-            if ai_manager.initialized:
-                summary = await ai_manager.ask_ai("gpt4o", summary_prompt, system_prompt="あなたは要約専用AIです。簡潔で正確な要約を作成してください。")
-                summarizer_name = "gpt-4oが要約しました"
-            else:
-                # フォールバック：直接OpenAI APIを使用
-                try:
-                    response = await openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": summary_prompt}], max_tokens=2000, temperature=0.2)
-                except Exception as e:
-                    if "max_tokens" in str(e) and "max_completion_tokens" in str(e):
-                        response = await openai_client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": summary_prompt}], max_completion_tokens=2000, temperature=0.2)
-                    else:
-                        raise e
-                summary = response.choices[0].message.content
-                summarizer_name = "gpt-4oが要約しました"
-
-            header = f"{mention}\n" if mention else ""
-            final_content = f"{header}{summary}"
-        except Exception as e:
-            safe_log("🚨 send_long_messageの要約中にエラー:", e)
-            header = f"{mention}\n" if mention else ""
-            final_content = f"{header}元の回答は長すぎましたが、要約中にエラーが発生しました。"
-    
-    try:
-        if isinstance(target, discord.Interaction):
-            if is_followup: await target.followup.send(final_content)
-            else:
-                if not target.response.is_done(): await target.edit_original_response(content=final_content)
-                else: await target.followup.send(final_content)
-        else: await target.send(final_content)
-    except (discord.errors.InteractionResponded, discord.errors.NotFound) as e:
-        safe_log(f"⚠️ メッセージ送信に失敗（フォールバック）:", e)
-        if hasattr(target, 'channel') and target.channel: await target.channel.send(final_content)
+    # デバッグ用：長いテキストをログ出力
+    safe_log(f"🔍 長いレスポンス詳細（{len(full_text)}文字, mode={mode}）:", full_text[:3000])
+
+    chunks = split_message(full_text) if mode == "split" else []
+    if mode == "split" and len(chunks) > MAX_SPLIT_MESSAGES:
+        # 連投しすぎないよう、非常に長い応答は添付ファイルに切り替える
+        mode = "file"
+
+    if mode == "summarize":
+        await _send_discord_message(target, await _summarize_for_discord(openai_client, text, mention), is_followup)
+    elif mode == "file":
+        header = f"{mention}\n" if mention else ""
+        preview = split_message(text, FILE_PREVIEW_CHARS)[0]
+        notice = f"{header}{preview}\n\n📎 全文（{len(text)}文字）を添付ファイルで送信しました。"
+        attachment = discord.File(io.BytesIO(text.encode("utf-8")), filename="response.md")
+        await _send_discord_message(target, notice, is_followup, file=attachment)
+    else:
+        for index, chunk in enumerate(chunks):
+            # 2通目以降はフォローアップとして送る
+            await _send_discord_message(target, chunk, is_followup or index > 0)
 
 # --- 添付ファイル解析 ---
 
@@ -207,34 +261,93 @@ async def analyze_attachment_for_gemini(attachment: discord.Attachment):
 
 # --- テキスト要約とNotionコンテキスト取得 ---
 
+# --- 階層要約（ツリー型map-reduce） ---
+
+_summarizer_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def get_summarizer_semaphore(summarizer_name: str) -> asyncio.Semaphore:
+    """要約AIごとの同時実行数セマフォを取得（上限は config.yaml の summarizer.concurrency）"""
+    if summarizer_name not in _summarizer_semaphores:
+        from config_manager import get_config_manager
+        summarizer_config = get_config_manager().get_summarizer_config()
+        limit = summarizer_config.concurrency.get(summarizer_name, summarizer_config.default_concurrency)
+        _summarizer_semaphores[summarizer_name] = asyncio.Semaphore(max(1, limit))
+    return _summarizer_semaphores[summarizer_name]
+
+async def tree_reduce_summaries(
+    texts: List[str],
+    map_func: Callable[[str], Awaitable[Optional[str]]],
+    merge_func: Callable[[List[str]], Awaitable[Optional[str]]],
+    map_summarizer: str,
+    merge_summarizer: str,
+    fan_in: Optional[int] = None,
+    root_merge_func: Optional[Callable[[List[str]], Awaitable[Optional[str]]]] = None,
+    root_summarizer: Optional[str] = None
+) -> Optional[str]:
+    """
+    テキスト群をツリー状に要約・統合する
+    - 各テキストを map_func で要約（要約AIごとのセマフォで同時実行数を制限）
+    - fan_in 個ずつの兄弟が揃い次第 merge_func で統合し、他の枝の完了は待たない
+    - 最上位の統合だけ root_merge_func を使える（高性能モデルで仕上げる場合など）
+    空・失敗（None・エラー応答）の要約は統合対象から除く。元の順序は保持する
+    """
+    if not texts:
+        return None
+    if fan_in is None:
+        from config_manager import get_config_manager
+        fan_in = get_config_manager().get_summarizer_config().fan_in
+    fan_in = max(2, fan_in)
+
+    map_semaphore = get_summarizer_semaphore(map_summarizer)
+    merge_semaphore = get_summarizer_semaphore(merge_summarizer)
+    root_semaphore = get_summarizer_semaphore(root_summarizer or merge_summarizer)
+
+    async def reduce_range(start: int, end: int, is_root: bool) -> Optional[str]:
+        if end - start == 1:
+            async with map_semaphore:
+                return await map_func(texts[start])
+
+        step = -(-(end - start) // fan_in)  # 切り上げ
+        parts = await asyncio.gather(*[
+            reduce_range(i, min(i + step, end), False) for i in range(start, end, step)
+        ])
+        # 失敗した枝（None・「〇〇エラー: ...」の応答）は上位の統合に持ち込まない
+        parts = [part for part in parts if part and "エラー" not in part]
+        if len(parts) <= 1:
+            return parts[0] if parts else None
+
+        if is_root and root_merge_func:
+            async with root_semaphore:
+                return await root_merge_func(parts)
+        async with merge_semaphore:
+            return await merge_func(parts)
+
+    return await reduce_range(0, len(texts), True)
+
+# summarize_text_chunks の model_choice と config/ai_models.yaml のAIタイプの対応
+SUMMARIZER_AI_TYPES = {
+    "gpt": "gpt4o",
+    "gpt5mini": "gpt5mini",
+    "gemini": "gemini",
+    "gemini_flash": "gemini",
+    "perplexity": "perplexity"
+}
+
 async def summarize_text_chunks(bot: commands.Bot, channel, text: str, query: str, model_choice: str):
-    # 要約前に匿名化処理（Gemini安全フィルター対策）
-    import re
-    if '吉川' in text or '英佑' in text:
-        # 人名を匿名化
-        text = text.replace('吉川氏', '対象者').replace('吉川英佑氏', '対象者').replace('吉川英佑', '対象者').replace('吉川', '対象者')
-        text = text.replace('英佑氏', '対象者').replace('英佑', '対象者')
-        text = re.sub(r'A[a-zA-Z\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]+氏?', '対象者', text)
-    
-    # 問題となりやすいキーワードを中性的な表現に置き換え
-    safety_replacements = {
-        '知能犯': '戦略的人物',
-        '計画的に': '戦略的に',
-        '犯罪': '行為',
-        '違法': '問題行為',
-        '危険': 'リスク',
-        '攻撃': '対抗',
-        '犯人': '対象者',
-        '悪質': '問題',
-        '詐欺': '疑問行為'
-    }
-    
-    for problematic, neutral in safety_replacements.items():
-        if problematic in text:
-            text = text.replace(problematic, neutral)
-    
-    chunk_size = 12000
-    text_chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    # 同じページ内容・質問・モデルの要約は再利用（要約AIとMistral統合を丸ごと省略）
+    summary_cache = get_summary_cache()
+    cache_key = summary_cache.make_key(text, query, model_choice)
+    cached_summary = summary_cache.get(cache_key)
+    if cached_summary is not None:
+        safe_log("⚡ 要約キャッシュヒット: ", f"{model_choice} / {query[:30]}")
+        return cached_summary
+
+    # 要約前に匿名化・安全フィルター対策の置換（config.yaml の規則を1回の走査で適用）
+    text = get_text_rewriter().rewrite(text)
+
+    # 要約モデルのコンテキスト予算に合わせ、ブロック・文の境界でチャンク分割
+    chunk_plan = get_chunk_plan(SUMMARIZER_AI_TYPES.get(model_choice, "gemini"))
+    text_chunks = split_text_by_tokens(text, chunk_plan)
 
     summarizer_map = {
         "gpt": lambda p: ask_gpt4o(bot.openai_client, p),
@@ -245,44 +358,62 @@ async def summarize_text_chunks(bot: commands.Bot, channel, text: str, query: st
     }
     summarizer_func = summarizer_map.get(model_choice, ask_gemini_2_5_pro)
 
+    llm_calls = 0
+    failed_calls = 0
+
     async def summarize_chunk(chunk):
+        nonlocal llm_calls, failed_calls
         prompt = (f"ユーザーの質問は「{query}」です。この質問との関連性を考慮し、以下のテキストを構造化して要約してください。\n"
                   f"要約には以下のタグを付けて分類してください：[背景情報], [定義・前提], [事実経過], [未解決課題], [補足情報]\n\n{chunk}")
+        llm_calls += 1
         try:
-            return await summarizer_func(prompt)
+            summary = await summarizer_func(prompt)
         except Exception as e:
             safe_log(f"⚠️ チャンクの要約中にエラー:", e)
-            return None
-    tasks = [summarize_chunk(chunk) for chunk in text_chunks]
-    chunk_summaries = [s for s in await asyncio.gather(*tasks) if s]
-    if not chunk_summaries: return None
-    if len(chunk_summaries) == 1: return chunk_summaries[0]
-    
-    combined = "\n---\n".join(chunk_summaries)
-    final_prompt = (f"ユーザーの質問は「{query}」です。この質問への回答となるように、以下の複数の要約群を一つのレポートに統合してください。\n\n{combined}")
-    return await ask_lalah(bot.mistral_client, final_prompt)
+            summary = None
+        if not summary or "エラー" in summary:
+            failed_calls += 1
+        return summary
+
+    async def merge_summaries(summaries):
+        nonlocal llm_calls, failed_calls
+        combined = "\n---\n".join(summaries)
+        merge_prompt = (f"ユーザーの質問は「{query}」です。この質問への回答となるように、以下の複数の要約群を一つのレポートに統合してください。\n\n{combined}")
+        llm_calls += 1
+        merged = await ask_lalah(bot.mistral_client, merge_prompt)
+        if not merged or "エラー" in merged:
+            failed_calls += 1
+        return merged
+
+    with bulkhead_pool("summary"):
+        final_summary = await tree_reduce_summaries(
+            text_chunks, summarize_chunk, merge_summaries,
+            map_summarizer=model_choice, merge_summarizer="mistral"
+        )
+    # 一部のチャンクが失敗した要約・エラー応答を含む要約はキャッシュしない
+    if final_summary and failed_calls == 0:
+        summary_cache.set(cache_key, final_summary, llm_calls=llm_calls)
+    return final_summary
 
 # ▼▼▼【修正】抜け落ちていた関数を追加 ▼▼▼
 async def get_notion_context(bot: commands.Bot, interaction: discord.Interaction, page_id: str, query: str, model_choice: str = "gpt"):
     await interaction.edit_original_response(content="...Notionページを読み込んでいます…")
-    notion_text = await get_notion_page_text([page_id])
+    # 4000文字制限を適用（末尾だけを取得）
+    notion_text = await get_notion_page_tail(page_id, 4000)
     if notion_text.startswith("ERROR:") or not notion_text.strip():
         await interaction.edit_original_response(content="❌ Notionページからテキストを取得できませんでした。")
         return None
-    # 4000文字制限を適用
-    notion_text = notion_text[-4000:]
     return await summarize_text_chunks(bot, interaction.channel, notion_text, query, model_choice)
 
 async def get_notion_context_for_message(bot: commands.Bot, message: discord.Message, page_id: str, query: str, model_choice: str):
     from utils import safe_log
     safe_log(f"🔍 Notion取得開始: ", f"ページID={page_id}, クエリ={query[:50]}...")
-    notion_text = await get_notion_page_text([page_id])
+    # 4000文字制限を適用（末尾だけを取得）
+    notion_text = await get_notion_page_tail(page_id, 4000)
     safe_log(f"🔍 Notion取得結果: ", f"テキスト長={len(notion_text)}, エラーチェック={notion_text.startswith('ERROR:')}")
     if notion_text.startswith("ERROR:") or not notion_text.strip():
         await message.channel.send(f"❌ Notionページからテキストを取得できませんでした。詳細: {notion_text[:100]}")
         return None
-    # 4000文字制限を適用
-    notion_text = notion_text[-4000:]
     return await summarize_text_chunks(bot, message.channel, notion_text, query, model_choice)
 # ▲▲▲ ここまで追加 ▲▲▲
 
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+utils の要約まわりのテスト用フェイク
+discord / SDK / ai_clients / notion_utils を sys.modules 上のダミーに差し替えて utils を読み込み、
+要約AI（ask_*）の代わりにプロンプトを記録する FakeSummarizer を提供する
+"""
+
+import sys
+import types
+from contextlib import contextmanager
+from typing import List, Optional
+from unittest import mock
+
+from summary_cache import SummaryCache
+
+def _fake_module(name: str, **attrs) -> types.ModuleType:
+    """未使用の属性は MagicMock を返すダミーモジュール（SDK未インストール環境での import 用）"""
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__getattr__ = lambda attr: mock.MagicMock(name=f"{name}.{attr}")
+    return module
+
+def _fake_dependency_modules() -> dict:
+    return {
+        "discord": _fake_module("discord"),
+        "discord.ext": _fake_module("discord.ext"),
+        "discord.ext.commands": _fake_module("discord.ext.commands"),
+        "PyPDF2": _fake_module("PyPDF2"),
+        "openai": _fake_module("openai"),
+        "mistralai": _fake_module("mistralai"),
+        "mistralai.async_client": _fake_module("mistralai.async_client"),
+        "ai_clients": _fake_module("ai_clients"),
+        "notion_utils": _fake_module("notion_utils"),
+    }
+
+class FakeSummarizer:
+    """要約AIの代わり（プロンプトを記録し、failures に含まれる番号の呼び出しはエラー文字列を返す）"""
+
+    def __init__(self, name: str, failures: Optional[List[int]] = None):
+        self.name = name
+        self.prompts: List[str] = []
+        self.failures = set(failures or [])
+
+    async def __call__(self, *args) -> str:
+        prompt = args[-1]  # ask_lalah(client, prompt) / ask_minerva(prompt)
+        self.prompts.append(prompt)
+        if len(self.prompts) in self.failures:
+            return f"{self.name}エラー: 失敗({len(self.prompts)})"
+        return f"{self.name}({len(self.prompts)})"
+
+@contextmanager
+def fake_utils(chunks: Optional[List[str]] = None):
+    """
+    ダミー依存で読み込んだ utils を返す（終了時に元のモジュール構成に戻す）
+    chunks を指定すると split_text_by_tokens はその分割結果を返す。要約キャッシュは空の新しいものを使う
+    """
+    with mock.patch.dict(sys.modules, _fake_dependency_modules()):
+        for name in ("utils", "config_manager"):
+            sys.modules.pop(name, None)
+        import utils
+        utils._summarizer_semaphores.clear()
+        summary_cache = SummaryCache()
+        with mock.patch.object(utils, "get_summary_cache", lambda: summary_cache), \
+                mock.patch.object(utils, "get_chunk_plan", lambda ai_type: None), \
+                mock.patch.object(utils, "get_text_rewriter", lambda: types.SimpleNamespace(rewrite=lambda text: text)):
+            if chunks is not None:
+                with mock.patch.object(utils, "split_text_by_tokens", lambda text, plan: list(chunks)):
+                    yield utils
+            else:
+                yield utils